@@ -13,6 +13,7 @@ from Analysis.Clustering.matchTeamToCluster import match_team_to_cluster_weights
 from Analysis.Clustering.matchPlayerToCluster import get_player_stats, match_player_to_cluster_weights, match_player_cluster_to_label
 from Analysis.Benchmark.benchmark import get_benchmark_info
 from Analysis.Helpers import queries
+from Analysis.Helpers.transferPool import get_transfer_pool
 import pandas as pd
 
 class InitBenchmarkPlayer:
@@ -284,6 +285,21 @@ class InitBenchmarkPlayer:
     def vocbp_bmark_values(self):
         return self.vocbp_bmark_srs().values
     
+    def transfer_pool(self):
+        """
+        Get the transfer candidates for this benchmark's season and position.
+
+        The pool carries both the FS and VOCBP statistics and is shared by every
+        benchmark of the same season and position.
+
+        Returns:
+            TransferPool: Cached pool; use .frame(query) for a scoring-ready DataFrame
+        """
+        return get_transfer_pool(self.conn,
+                                 self.season_year,
+                                 self.replaced_plyr_pos,
+                                 (InitBenchmarkPlayer.fs_query(), InitBenchmarkPlayer.vocbp_query()))
+
     def successful_transfer_query(pos : str):
         return queries.stats_query(pos)
 
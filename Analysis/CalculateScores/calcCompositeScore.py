@@ -1,36 +1,62 @@
+import copy
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
-from Analysis.CalculateScores.calcFitScore import calculate_fit_score_from_transfers
-from Analysis.CalculateScores.calcVOCRP import calculate_vocbp_from_transfers
+from Analysis.CalculateScores.calcVOCRP import position_weight_vector
+from Analysis.CalculateScores.sosAdjustmentFactor import get_sos_adjustment_arrays
+from Analysis.Helpers.similarity import cosine_similarity_to_vector
+from Analysis.Helpers.ranking import top_n_indices, ranked_slice, rank_of
 from Analysis.Benchmark.init import InitBenchmarkPlayer
+from scipy.stats import rankdata
 import numpy as np
 
-def _robust_z(series: pd.Series, cap: float = 3.5) -> pd.Series:
+def _robust_z_unclipped(values: np.ndarray) -> np.ndarray:
     """
-    Median–MAD z‑score with winsorising (clipping) at ±cap SD.
+    Median–MAD z‑score (no clipping) of a float array.
     Uses 1.4826 scaling factor to make MAD comparable to standard deviation.
     """
-    med = series.median()
-    mad = np.median(np.abs(series - med))
+    med = np.nanmedian(values) if (~np.isnan(values)).any() else np.nan
+    mad = np.median(np.abs(values - med))
     if mad == 0:
         mad = 1e-9  # avoid divide‑by‑zero
     # Scale MAD to be comparable to standard deviation for normal distributions
     mad_scaled = mad * 1.4826
-    z = (series - med) / mad_scaled
+    return (values - med) / mad_scaled
+
+def _robust_z(series: pd.Series, cap: float = 3.5) -> pd.Series:
+    """
+    Median–MAD z‑score with winsorising (clipping) at ±cap SD.
+    """
+    z = pd.Series(_robust_z_unclipped(series.values.astype(float)), index=series.index)
     return z.clip(lower=-cap, upper=cap)
 
+def _pct_rank(values: np.ndarray) -> np.ndarray:
+    """
+    Percentile rank of a float array, like Series.rank(pct=True):
+    ties get their average rank and NaN stays NaN.
+    """
+    pct = np.full(len(values), np.nan)
+    valid = ~np.isnan(values)
+    if valid.any():
+        pct[valid] = rankdata(values[valid], method='average') / valid.sum()
+    return pct
+
 def composite_ranking_robust(fs_df: pd.DataFrame,
                              vocrp_df: pd.DataFrame,
                              fs_w: float = 0.6,
                              v_w: float = 0.4,
                              cap: float = 3.5,
                              t_scale: bool = True,
-                             debug: bool = False) -> pd.DataFrame:
+                             debug: bool = False,
+                             top_n: int = None) -> pd.DataFrame:
     """
     Robust composite ranking:
     1. Robust z‑score each metric (median/MAD) and winsorise at ±cap SD.
     2. Linear blend with weights fs_w & v_w.
     3. Optionally convert to a 0‑100 T‑score for interpretability.
+    With top_n set, only the best top_n rows are returned (partial selection, no full sort).
     """
     df = fs_df.merge(vocrp_df, on="player_name")
 
@@ -53,7 +79,10 @@ def composite_ranking_robust(fs_df: pd.DataFrame,
     else:
         sort_col = "comp_raw"
 
-    result = df.sort_values(sort_col, ascending=False).reset_index(drop=True)
+    if top_n is not None:
+        result = df.iloc[top_n_indices(df[sort_col].values, top_n)].reset_index(drop=True)
+    else:
+        result = df.sort_values(sort_col, ascending=False).reset_index(drop=True)
     
     if debug:
         analyze_composite_metrics(result)
@@ -138,16 +167,253 @@ def composite_ranking_percentiles(fs_df, vocrp_df, fs_w = 0.6, v_w = 0.4, sortBy
     return df_sorted
 
 
-def composite_score(conn, team_name, season_year, player_id_to_replace, debug=False, specific_name=None):
+# --- Fused pipeline (single candidate matrix keyed by player_id) ---
+def _candidate_components(bmark_plyr: InitBenchmarkPlayer) -> dict:
+    """
+    Fit and value scores of every transfer candidate in one vectorized pass.
+
+    Works directly on the cached transfer pool of the benchmark's season and position; each
+    candidate appears once (keyed by player_id).
+
+    Returns:
+        dict: Aligned arrays 'player_name', 'player_id', 'prev_team_name', 'sim_score',
+            'vocbp_raw', 'sos_adj_factor', 'sos_z', 'vocbp', the unclipped robust z-scores
+            'fit_z', 'value_z' and the percentiles 'fit_pct', 'value_pct'
+    """
+    pool = bmark_plyr.transfer_pool()
+    table = pool.table
+    keep = np.flatnonzero(table.first_occurrences())
+
+    # Fit score: cosine similarity of the scaled FS stats to the FS benchmark
+    # (any null in the candidate's FS row scores -1, as in calculate_fit_score)
+    fs_query = InitBenchmarkPlayer.fs_query()
+    fs_scaler = bmark_plyr.fs_scalar()
+    fs_cols = list(bmark_plyr.fs_benchmark_indices())
+    valid = ~(table.missing_metadata()[keep] |
+              np.isnan(table.matrix(pool.fragment_cols[fs_query], keep)).any(axis=1))
+    sim_score = np.full(len(keep), -1.0)
+    fs_scaled = (table.matrix(fs_cols, keep[valid]) - fs_scaler.mean_) / fs_scaler.scale_
+    sim_score[valid] = cosine_similarity_to_vector(fs_scaled, bmark_plyr.fs_benchmark_values())
+
+    # Value score: position-weighted mean z deviation from the VOCBP benchmark, plus SOS bump
+    v_scaler = bmark_plyr.vocbp_scalar()
+    v_cols = list(bmark_plyr.vocbp_benchmark_indices())
+    vec_diff = (table.matrix(v_cols, keep) - v_scaler.mean_) / v_scaler.scale_ - bmark_plyr.vocbp_bmark_values()
+    vec_diff = np.nan_to_num(vec_diff, nan=0.0)
+    norm_weights, weights_sum = position_weight_vector(bmark_plyr.replaced_plyr_pos, v_cols)
+    vocbp_raw = (vec_diff * norm_weights).sum(axis=1) / weights_sum
+
+    # Names are only decoded here, for the output columns
+    prev_team_name = table.team_names(keep)
+    sos_adj_factor, sos_z = get_sos_adjustment_arrays(prev_team_name, bmark_plyr.season_year - 1)
+    vocbp = vocbp_raw + sos_adj_factor
+
+    return {
+        'player_name': table.player_names(keep),
+        'player_id': table.player_ids[keep],
+        'prev_team_name': prev_team_name,
+        'sim_score': sim_score,
+        'vocbp_raw': vocbp_raw,
+        'sos_adj_factor': sos_adj_factor,
+        'sos_z': sos_z,
+        'vocbp': vocbp,
+        'fit_z': _robust_z_unclipped(sim_score),
+        'value_z': _robust_z_unclipped(vocbp),
+        'fit_pct': _pct_rank(sim_score),
+        'value_pct': _pct_rank(vocbp),
+    }
+
+def _blend_components(components: dict,
+                      fs_w: float = 0.6,
+                      v_w: float = 0.4,
+                      cap: float = 3.5,
+                      t_scale: bool = True) -> tuple:
+    """
+    Blend precomputed candidate components into the composite columns.
+
+    Returns:
+        tuple: (columns dict in output order, values the ranking sorts by)
+    """
+    fit_z = np.clip(components['fit_z'], -cap, cap)
+    value_z = np.clip(components['value_z'], -cap, cap)
+    comp_raw = fs_w * fit_z + v_w * value_z
+
+    columns = {
+        'player_name': components['player_name'],
+        'player_id': components['player_id'],
+        'sim_score': components['sim_score'],
+        'prev_team_name': components['prev_team_name'],
+        'vocbp_raw': components['vocbp_raw'],
+        'sos_adj_factor': components['sos_adj_factor'],
+        'sos_z': components['sos_z'],
+        'vocbp': components['vocbp'],
+        'fit_z': fit_z,
+        'value_z': value_z,
+        'comp_raw': comp_raw,
+        'fit_pct': components['fit_pct'],
+        'value_pct': components['value_pct'],
+        'composite_pct': components['fit_pct'] * fs_w + components['value_pct'] * v_w,
+    }
+
+    sort_vals = comp_raw
+    if t_scale:
+        mu, sd = (np.nanmean(comp_raw), np.nanstd(comp_raw) or 1e-9) if len(comp_raw) else (np.nan, 1e-9)
+        columns['comp_T'] = 50 + 10 * (comp_raw - mu) / sd
+        sort_vals = columns['comp_T']
+
+    return columns, sort_vals
+
+def _rank_components(components: dict,
+                     fs_w: float = 0.6,
+                     v_w: float = 0.4,
+                     cap: float = 3.5,
+                     t_scale: bool = True,
+                     top_n: int = None) -> pd.DataFrame:
+    """
+    Composite ranking of precomputed candidate components (best first, NaN last).
+
+    Same columns and semantics as composite_ranking_robust, plus player_id.
+    """
+    columns, sort_vals = _blend_components(components, fs_w, v_w, cap, t_scale)
+    if top_n is not None:
+        order = top_n_indices(sort_vals, top_n)
+    else:
+        order = np.argsort(-sort_vals, kind='stable')
+    return pd.DataFrame({col: vals[order] for col, vals in columns.items()})
+
+def fused_composite_ranking(bmark_plyr: InitBenchmarkPlayer,
+                            fs_w: float = 0.6,
+                            v_w: float = 0.4,
+                            cap: float = 3.5,
+                            t_scale: bool = True,
+                            debug: bool = False,
+                            specific_name: str = None,
+                            top_n: int = None) -> pd.DataFrame:
+    """
+    Fit score, VOCBP and robust composite of every transfer candidate in one pass.
+    With top_n set, only the best top_n rows are materialized.
+
+    Equivalent to composite_ranking_robust(calculate_fit_score_from_transfers(...),
+    calculate_vocbp_from_transfers(...)), but candidates are keyed by player_id instead of
+    merged on player_name, and a DataFrame is only built for the final ranking.
+    """
+    if debug:
+        print("Fit Score BMark Player")
+        print(bmark_plyr.fs_benchmark_unscaled())
+        print("VOCBP Benchmark Raw")
+        print(bmark_plyr.vocbp_benchmark_unscaled())
+
+    result = _rank_components(_candidate_components(bmark_plyr), fs_w, v_w, cap, t_scale, top_n)
+
+    if debug:
+        if specific_name is not None:
+            print("Specific player:", specific_name)
+            print(result[result['player_name'] == specific_name])
+        analyze_composite_metrics(result)
+
+    return result
+
+class ScenarioRanking:
+    """
+    Candidate components of one scenario (team, season, replaced player), kept so the
+    composite can be re-ranked with new weights, cap or T-scaling without recomputing
+    fit scores, VOCBP, robust z-scores or percentiles.
+    """
+
+    def __init__(self, bmark_plyr: InitBenchmarkPlayer):
+        self.bmark_plyr = bmark_plyr
+        self.components = _candidate_components(bmark_plyr)
+
+    def rerank(self, fs_w: float = 0.6, v_w: float = 0.4, cap: float = 3.5, t_scale: bool = True,
+               top_n: int = None) -> pd.DataFrame:
+        """Composite ranking for the given blend (same columns as fused_composite_ranking)."""
+        return _rank_components(self.components, fs_w, v_w, cap, t_scale, top_n)
+
+    def rank_of(self, player_id, fs_w: float = 0.6, v_w: float = 0.4, cap: float = 3.5, t_scale: bool = True):
+        """
+        0-based composite rank of one candidate, without sorting or building a DataFrame.
+
+        Returns:
+            int or None: Row the candidate would have in rerank(...), None if not a candidate
+        """
+        matches = np.flatnonzero(self.components['player_id'] == player_id)
+        if not len(matches):
+            return None
+        _, sort_vals = _blend_components(self.components, fs_w, v_w, cap, t_scale)
+        return rank_of(sort_vals, matches[0])
+
+    def rows(self, start, stop, fs_w: float = 0.6, v_w: float = 0.4, cap: float = 3.5, t_scale: bool = True) -> pd.DataFrame:
+        """
+        Rows start..stop-1 of rerank(...), indexed by rank, without sorting the whole pool.
+        """
+        columns, sort_vals = _blend_components(self.components, fs_w, v_w, cap, t_scale)
+        order = ranked_slice(sort_vals, start, stop)
+        return pd.DataFrame({col: vals[order] for col, vals in columns.items()},
+                            index=pd.RangeIndex(max(start, 0), max(start, 0) + len(order)))
+
+    def __len__(self):
+        return len(self.components['player_id'])
+
+SCENARIO_CACHE_SIZE = 64
+SCENARIO_CACHE_TTL = 15 * 60  # seconds a cached scenario may serve re-ranks after being computed
+_SCENARIOS = OrderedDict()
+_SCENARIOS_LOCK = threading.Lock()
+
+def get_scenario_ranking(conn, team_name, season_year, player_id_to_replace, compute=True, refresh=False):
+    """
+    Get the ScenarioRanking of a scenario from an in-process LRU cache.
+
+    Entries expire SCENARIO_CACHE_TTL seconds after they were computed, so a long-running
+    process picks up database refreshes; call clear_scenario_rankings to drop them at once.
+    Cached entries keep only the candidate components (their bmark_plyr is None), not the
+    benchmark and its connection.
+
+    Args:
+        conn: Database connection (only used when the scenario has to be computed)
+        compute (bool): Compute and cache the scenario if it is missing
+        refresh (bool): Always recompute, replacing the cached entry
+
+    Returns:
+        ScenarioRanking or None: None if the scenario is not cached and compute=False. A
+            freshly computed ranking carries its bmark_plyr, a cached one does not.
+    """
+    key = (team_name, int(season_year), int(player_id_to_replace))
+    if not refresh:
+        with _SCENARIOS_LOCK:
+            entry = _SCENARIOS.get(key)
+            if entry is not None:
+                ranking, computed_at = entry
+                if time.monotonic() - computed_at < SCENARIO_CACHE_TTL:
+                    _SCENARIOS.move_to_end(key)
+                    return ranking
+                del _SCENARIOS[key]
+    if not compute:
+        return None
+
+    ranking = ScenarioRanking(InitBenchmarkPlayer(conn, team_name, season_year, player_id_to_replace))
+    cached = copy.copy(ranking)
+    cached.bmark_plyr = None
+    with _SCENARIOS_LOCK:
+        _SCENARIOS[key] = (cached, time.monotonic())
+        _SCENARIOS.move_to_end(key)
+        while len(_SCENARIOS) > SCENARIO_CACHE_SIZE:
+            _SCENARIOS.popitem(last=False)
+    return ranking
+
+def clear_scenario_rankings():
+    """Drop every cached scenario."""
+    with _SCENARIOS_LOCK:
+        _SCENARIOS.clear()
+
+def composite_score(conn, team_name, season_year, player_id_to_replace, debug=False, specific_name=None,
+                    fs_w=0.6, v_w=0.4, cap=3.5, t_scale=True, top_n=None):
     """
     Returns the benchmark player information and the rankings from the players inputted.
     Generates a benchmark mark player and computes fit scores and value over clustered replacement player scores using robust median‑MAD scaling.
     """
     bmark_plyr = InitBenchmarkPlayer(conn, team_name, season_year, player_id_to_replace)
 
-    fs_df = calculate_fit_score_from_transfers(bmark_plyr, sort=False, debug=debug, specific_name=specific_name)
-    vocbp_df = calculate_vocbp_from_transfers(bmark_plyr, sort=False, debug=debug, specific_name=specific_name)
-    cs_df = composite_ranking_robust(fs_df, vocbp_df, debug=debug)
+    cs_df = fused_composite_ranking(bmark_plyr, fs_w, v_w, cap, t_scale, debug=debug, specific_name=specific_name, top_n=top_n)
     
     return bmark_plyr, cs_df
 
@@ -1,70 +1,113 @@
 import sqlite3
-import numpy as np
 import pandas as pd
-from Analysis.Helpers.dataLoader import get_transfers
-from Analysis.Helpers.similarity import get_player_similarity_score
+from Analysis.Helpers.similarity import get_players_similarity_scores
+from Analysis.Helpers.candidateIndex import CandidateIndex
+from Analysis.Helpers.ranking import top_n_indices
 from Analysis.Benchmark.init import InitBenchmarkPlayer
-from Analysis.config import Config
 
 
+def _print_debug(bmark_plyr: InitBenchmarkPlayer, iter_players_df, specific_name: str = None):
+    print("Fit Score BMark Player")
+    print(bmark_plyr.fs_benchmark_unscaled())
+
+    if specific_name is not None:
+        print(specific_name)
+        print(iter_players_df.loc[iter_players_df['player_name'] == specific_name, bmark_plyr.fs_bmark_srs().index])
+
 def _calculate_fit_scores(bmark_plyr : InitBenchmarkPlayer, 
                           iter_players_df, 
                           sort: bool,
                           debug: bool, 
-                          specific_name: str = None):
-    df = pd.DataFrame(columns=['player_name', 'sim_score'])
+                          specific_name: str = None,
+                          top_n: int = None):
     # pull scalar and benchmark DataFrame (1×N) back out
-    bmark_srs   = bmark_plyr.fs_bmark_srs()
     scalar = bmark_plyr.fs_scalar()
     indices = bmark_plyr.fs_benchmark_indices()
     values = bmark_plyr.fs_benchmark_values()
 
     if debug:
-        print("Fit Score BMark Player")
-        print(bmark_plyr.fs_benchmark_unscaled())
+        _print_debug(bmark_plyr, iter_players_df, specific_name)
 
+    # Score the whole candidate block at once (rows with nulls get -1)
+    scores = get_players_similarity_scores(iter_players_df, scalar, indices, values)
+    df = pd.DataFrame({'player_name': iter_players_df['player_name'].values, 'sim_score': scores})
 
-    for _, plyr in iter_players_df.iterrows():
-        name = plyr['player_name']
-
-        if debug and name == specific_name:
-            print(specific_name)
-            print(plyr[bmark_srs.index])  # use Series index instead of columns
-            
-        score = get_player_similarity_score(
-            plyr,
-            scalar,
-            indices,  # use Series index
-            values  # use Series values
-        )
-        df.loc[len(df)] = [name, score]
+    # Only the best top_n rows (partial selection instead of a full sort)
+    if top_n is not None:
+        return df.iloc[top_n_indices(scores, top_n)].reset_index(drop=True)
 
     if sort:
         df = df.sort_values('sim_score', ascending=False).reset_index(drop=True)
     return df
 
-def calculate_fit_score(conn, team_name, season_year, player_id_to_replace, sort=True, debug=False, specific_name=None):
+def calculate_fit_score(conn, team_name, season_year, player_id_to_replace, sort=True, debug=False, specific_name=None, top_n=None):
     bmark = InitBenchmarkPlayer(conn, team_name, season_year, player_id_to_replace)
-    transfers = get_transfers(
-        conn,
-        season_year,
-        bmark.replaced_plyr_pos,
-        InitBenchmarkPlayer.fs_query()
-    )
-    return _calculate_fit_scores(bmark, transfers, sort, debug, specific_name=specific_name)
-
-def calculate_fit_score_from_players(bmark_plyr: InitBenchmarkPlayer, iter_players_df, sort=True, debug=False, specific_name=None):
-    return _calculate_fit_scores(bmark_plyr, iter_players_df, sort, debug, specific_name=specific_name)
-
-def calculate_fit_score_from_transfers(bmark_plyr: InitBenchmarkPlayer, sort=True, debug=False, specific_name=None):
-    transfers = get_transfers(
-        bmark_plyr.conn,
-        bmark_plyr.season_year,
-        bmark_plyr.replaced_plyr_pos,
-        InitBenchmarkPlayer.fs_query()
-    )
-
-    return _calculate_fit_scores(bmark_plyr, transfers, sort, debug, specific_name=specific_name)
+    transfers = bmark.transfer_pool().frame(InitBenchmarkPlayer.fs_query())
+    return _calculate_fit_scores(bmark, transfers, sort, debug, specific_name=specific_name, top_n=top_n)
+
+def _top_k_fit_scores(bmark_plyr: InitBenchmarkPlayer, iter_players_df, index: CandidateIndex, top_k: int,
+                      sort: bool = True, debug: bool = False, specific_name: str = None):
+    if debug:
+        _print_debug(bmark_plyr, iter_players_df, specific_name)
+
+    positions, _ = index.top_k(bmark_plyr.fs_scalar(), bmark_plyr.fs_benchmark_values(), k=top_k)
+    if not sort:
+        # The selected candidates in source row order
+        positions.sort()
+
+    # Rescore the selected candidates from the source rows so values match the full computation
+    selected_df = iter_players_df.iloc[positions]
+    df = pd.DataFrame({
+        'player_name': selected_df['player_name'].values,
+        'sim_score': get_players_similarity_scores(selected_df,
+                                                   bmark_plyr.fs_scalar(),
+                                                   bmark_plyr.fs_benchmark_indices(),
+                                                   bmark_plyr.fs_benchmark_values()),
+    })
+    if sort:
+        df = df.sort_values('sim_score', ascending=False, kind='stable').reset_index(drop=True)
+    return df
+
+def calculate_fit_score_from_players(bmark_plyr: InitBenchmarkPlayer, iter_players_df, sort=True, debug=False, specific_name=None,
+                                     top_k=None, index=None, top_n=None):
+    """
+    Fit scores of the given candidates.
+
+    With top_n set, every candidate is scored but only the top_n best rows are returned.
+
+    With top_k set, only the top_k most similar candidates are returned (best first, or in
+    source row order with sort=False) using an exact blocked CandidateIndex; pass a prebuilt
+    index to reuse it across benchmarks. Candidates with missing stats are never returned in
+    that mode. The returned scores are the full float64 scores, but the candidates are selected
+    on float32 scores: when several candidates are within float32 rounding (~1e-7) of the k-th
+    best score, which of them make the cut can differ from the first top_k rows of the full
+    ranking. top_n cannot be combined with top_k.
+    """
+    if top_k is None:
+        return _calculate_fit_scores(bmark_plyr, iter_players_df, sort, debug, specific_name=specific_name, top_n=top_n)
+    if top_n is not None:
+        raise ValueError("top_n and top_k cannot be combined")
+
+    if index is None:
+        index = CandidateIndex.from_frame(iter_players_df, bmark_plyr.fs_benchmark_indices())
+    return _top_k_fit_scores(bmark_plyr, iter_players_df, index, top_k, sort, debug, specific_name)
+
+def calculate_fit_score_from_transfers(bmark_plyr: InitBenchmarkPlayer, sort=True, debug=False, specific_name=None, top_k=None, top_n=None):
+    """
+    Fit scores of the benchmark's transfer pool; top_n / top_k as in calculate_fit_score_from_players
+    (including the float32 selection near ties at the k-th position).
+    """
+    pool = bmark_plyr.transfer_pool()
+    transfers = pool.frame(InitBenchmarkPlayer.fs_query())
+
+    if top_k is None:
+        return _calculate_fit_scores(bmark_plyr, transfers, sort, debug, specific_name=specific_name, top_n=top_n)
+    if top_n is not None:
+        raise ValueError("top_n and top_k cannot be combined")
+
+    # The pool's index is shared by every benchmark of the season and position
+    index = pool.candidate_index(InitBenchmarkPlayer.fs_query(), bmark_plyr.fs_benchmark_indices())
+    return _top_k_fit_scores(bmark_plyr, transfers, index, top_k, sort, debug, specific_name)
 
 # run
 def test():
@@ -2,9 +2,9 @@ import sqlite3
 import numpy as np
 import pandas as pd
 from Analysis.Helpers.standardization import scale_player_stats
-from Analysis.Helpers.dataLoader import get_transfers
 from Analysis.Benchmark.init import InitBenchmarkPlayer
 from Analysis.CalculateScores.sosAdjustmentFactor import apply_sos_bonus_to_value_df
+from Analysis.Helpers.ranking import top_n_indices
 
 # Position-specific stat weights; adjust values as needed
 POSITION_STAT_WEIGHTS = {
@@ -50,63 +50,80 @@ def player_difference(player_stats_df,
 def avg_zScore_deviation(diff_vec):    
     return diff_vec.iloc[0].sum() / len(diff_vec.iloc[0])
 
+_POSITION_WEIGHT_VECTORS = {}
+
+def position_weight_vector(pos, columns):
+    """
+    Position stat weights aligned to columns and normalized to mean 1.
+
+    Computed once per (position, columns) and cached.
+
+    Returns:
+        tuple: (weights, weights_sum) with weights a read-only np.ndarray
+    """
+    key = (pos, tuple(columns))
+    if key not in _POSITION_WEIGHT_VECTORS:
+        stat_weights = POSITION_STAT_WEIGHTS.get(pos, {})
+        weights = np.array([stat_weights.get(stat, 1.0) for stat in columns], dtype=float)
+        w_mean = float(weights.mean()) if len(weights) else 1.0
+        if w_mean == 0.0:
+            w_mean = 1.0
+        norm_weights = weights / w_mean
+        norm_weights.setflags(write=False)
+        _POSITION_WEIGHT_VECTORS[key] = (norm_weights, norm_weights.sum())
+    return _POSITION_WEIGHT_VECTORS[key]
+
 def _calculate_vocbp_scores(bmark_plyr : InitBenchmarkPlayer, 
                             iter_players_df,
                             season_year : str, 
                             sort: bool,
                             debug: bool,
                             adjustment_factor : bool = True, 
-                            specific_name: str = None):
-    df = pd.DataFrame(columns=['player_name', 'prev_team_name', 'vocbp_raw'])
-
+                            specific_name: str = None,
+                            top_n: int = None):
     # pull scalar and benchmark DataFrame (1×N) back out
     scaler     = bmark_plyr.vocbp_scalar()
     bmark_vals = bmark_plyr.vocbp_bmark_values()  # This should return the benchmark values
+    indices = bmark_plyr.vocbp_benchmark_indices()
 
     if debug:
         print("VOCBP Benchmark Raw")
         print(bmark_plyr.vocbp_benchmark_unscaled())
 
-    for _, plyr in iter_players_df.iterrows():
-        name = plyr['player_name']
-        prev_team_name = plyr.get('prev_team_name', None)
-        indices = bmark_plyr.vocbp_benchmark_indices()
+        # Print specific player stats if requested
+        if specific_name is not None:
+            print("Specific player:", specific_name)
+            print("Player Stats:")
+            print(iter_players_df.loc[iter_players_df['player_name'] == specific_name, indices])
 
-        # Use raw player stats; SOS bonus will be applied at the very end to the VALUE score
-        plyr_adjusted = plyr[indices]
-            
-        # Calculate the vector difference between player stats and benchmark stats (global z-units)
-        vec_diff = player_difference(plyr_adjusted, scaler, indices, bmark_vals)
+    # Scale and difference the whole candidate block at once (global z-units).
+    # Use raw player stats; SOS bonus will be applied at the very end to the VALUE score
+    if len(iter_players_df):
+        vec_diff = np.subtract(scaler.transform(iter_players_df[indices]), bmark_vals)
+    else:
+        vec_diff = np.empty((0, len(indices)))
 
-        # Keep unweighted diff for correct aggregation
-        raw_vec_diff = vec_diff.astype(float).copy()
+    # Missing stats contribute nothing to the weighted sum (as a skipna sum did per player)
+    vec_diff = np.nan_to_num(vec_diff, nan=0.0)
 
-        # Build position weights aligned to indices and normalize to mean=1
-        pos = plyr.get('position', bmark_plyr.replaced_plyr_pos)
-        stat_weights = POSITION_STAT_WEIGHTS.get(pos, {})
-        weights_series = pd.Series(
-            {stat: stat_weights.get(stat, 1.0) for stat in indices},
-            index=indices,
-            dtype=float,
-        )
-        w_mean = float(weights_series.mean()) if len(weights_series) else 1.0
-        if w_mean == 0.0:
-            w_mean = 1.0
-        norm_weights = weights_series / w_mean
+    # Weighted average z-score deviation per position present. The row sum is used instead of
+    # a BLAS matrix-vector product so scores stay bit-for-bit identical to the per-player version
+    if 'position' in iter_players_df.columns:
+        positions = iter_players_df['position'].fillna(bmark_plyr.replaced_plyr_pos).values
+    else:
+        positions = np.full(len(iter_players_df), bmark_plyr.replaced_plyr_pos, dtype=object)
 
-        # Print specific player stats if requested
-        if debug and name == specific_name:
-            print("Specific player:", specific_name)
-            print("Player Stats:")
-            print(plyr_adjusted)
-            # print("Position Weights (normalized, mean=1):")
-            # print(norm_weights)
-            # print("Vector Diff (position-weighted, for display only):")
-            # print(raw_vec_diff * norm_weights)
+    vocbp = np.empty(len(iter_players_df))
+    for pos in pd.unique(positions):
+        rows = positions == pos
+        norm_weights, weights_sum = position_weight_vector(pos, indices)
+        vocbp[rows] = (vec_diff[rows] * norm_weights).sum(axis=1) / weights_sum
 
-        # Compute weighted average z-score deviation (apply weights once)
-        vocbp = float((raw_vec_diff * norm_weights).sum() / norm_weights.sum())
-        df.loc[len(df)] = [name, prev_team_name, vocbp]
+    df = pd.DataFrame({
+        'player_name': iter_players_df['player_name'].values,
+        'prev_team_name': iter_players_df['prev_team_name'].values if 'prev_team_name' in iter_players_df.columns else None,
+        'vocbp_raw': vocbp,
+    })
 
     # Apply the SOS additive bump at the end (one-sided, precomputed per team-season)
     if adjustment_factor:
@@ -120,32 +137,26 @@ def _calculate_vocbp_scores(bmark_plyr : InitBenchmarkPlayer,
         )
     else:
         df['vocbp'] = df['vocbp_raw']
-    
+
+    # Only the best top_n rows (partial selection instead of a full sort)
+    if top_n is not None:
+        return df.iloc[top_n_indices(df['vocbp'].values, top_n)].reset_index(drop=True)
+
     if sort:
         df = df.sort_values('vocbp', ascending=False).reset_index(drop=True)
 
     return df
 
 
-def calculate_vocbp_score(conn, team_name, incoming_season_year, player_id_to_replace, sort=True, debug=False, specific_name=None):
+def calculate_vocbp_score(conn, team_name, incoming_season_year, player_id_to_replace, sort=True, debug=False, specific_name=None, top_n=None):
     bmark = InitBenchmarkPlayer(conn, team_name, incoming_season_year, player_id_to_replace)
-    transfers = get_transfers(
-            conn,
-            incoming_season_year,
-            bmark.replaced_plyr_pos,
-            InitBenchmarkPlayer.vocbp_query()
-        )
-    return _calculate_vocbp_scores(bmark, transfers, incoming_season_year - 1, sort, debug, specific_name=specific_name)
-
-def calculate_vocbp_from_transfers(bmark_plyr: InitBenchmarkPlayer, sort=True, debug=False, specific_name=None):
-    transfers = get_transfers(
-            bmark_plyr.conn,
-            bmark_plyr.season_year,
-            bmark_plyr.replaced_plyr_pos,
-            InitBenchmarkPlayer.vocbp_query()
-        )
+    transfers = bmark.transfer_pool().frame(InitBenchmarkPlayer.vocbp_query())
+    return _calculate_vocbp_scores(bmark, transfers, incoming_season_year - 1, sort, debug, specific_name=specific_name, top_n=top_n)
+
+def calculate_vocbp_from_transfers(bmark_plyr: InitBenchmarkPlayer, sort=True, debug=False, specific_name=None, top_n=None):
+    transfers = bmark_plyr.transfer_pool().frame(InitBenchmarkPlayer.vocbp_query())
 
-    return _calculate_vocbp_scores(bmark_plyr, transfers, bmark_plyr.season_year - 1, sort, debug, specific_name=specific_name)
+    return _calculate_vocbp_scores(bmark_plyr, transfers, bmark_plyr.season_year - 1, sort, debug, specific_name=specific_name, top_n=top_n)
 
 
 def testing():
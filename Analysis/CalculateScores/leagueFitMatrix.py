@@ -0,0 +1,259 @@
+"""
+League-Wide Fit and Value Matrices
+
+Scores every transfer of a season against every team need (scenario) of that season at once.
+
+A scenario is a (team, season, replaced player) row of availTransferTeams.csv. Each scenario has
+its own fitted scalers and benchmark vectors, so instead of re-scaling the candidates per scenario
+the scaling is folded into the scenario side and both scores become BLAS matrix products:
+
+    fit:   cos(s, t) = (X @ (b/σ)ᵀ - Σ m·b/σ) / (‖b‖ · sqrt(X² @ (1/σ²)ᵀ - 2 X @ (m/σ²)ᵀ + Σ m²/σ²))
+    value: vocbp_raw(s, t) = (X @ (w/σ)ᵀ - valid @ (w·(m/σ + b))ᵀ) / Σw
+
+with m, σ the scenario scaler, b its benchmark and w the position stat weights. Missing stats are
+handled like the per-scenario code (a null FS row scores -1, a null VOCBP stat adds nothing).
+
+Results are stored per season and position as float32 matrices for lookups both ways:
+best transfers for a team need, and best team needs for a transfer.
+
+Usage:
+    python -m Analysis.CalculateScores.leagueFitMatrix [--season 2024] [--scenarios CSV] [--db rosteriq.db]
+"""
+
+import argparse
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from Analysis.Benchmark.init import InitBenchmarkPlayer
+from Analysis.CalculateScores.calcVOCRP import position_weight_vector
+from Analysis.CalculateScores.sosAdjustmentFactor import get_sos_adjustment_arrays
+from Analysis.Helpers.fileCache import load_cached
+from Analysis.Helpers.transferPool import get_transfer_pool
+
+scenarios_path = 'Analysis/Helpers/CSV/availTransferTeams.csv'
+
+# Lambda function to generate file paths for league matrices by season and position
+league_matrix_path = lambda season, pos : f"Analysis/CalculateScores/LeagueMatrices/{season}/fit_value_{pos}.npz"
+
+def fit_score_matrix(X, means, scales, bmarks):
+    """
+    Cosine similarity of every transfer to every scenario benchmark in scaled space.
+
+    Args:
+        X (np.ndarray): (t, m) raw FS stats of the transfers (rows with NaN score -1)
+        means, scales (np.ndarray): (s, m) scaler mean_ / scale_ of each scenario
+        bmarks (np.ndarray): (s, m) scaled benchmark vector of each scenario
+
+    Returns:
+        np.ndarray: (s, t) similarity scores
+    """
+    invalid = np.isnan(X).any(axis=1)
+    X = np.where(invalid[:, None], 0.0, X)
+
+    inv_scale = 1.0 / scales
+    dot = X @ (bmarks * inv_scale).T - np.sum(means * bmarks * inv_scale, axis=1)
+    sq_norm = ((X * X) @ (inv_scale ** 2).T
+               - 2.0 * X @ (means * inv_scale ** 2).T
+               + np.sum((means * inv_scale) ** 2, axis=1))
+    row_norms = np.sqrt(np.maximum(sq_norm, 0.0))
+    row_norms[row_norms == 0] = 1.0
+    bmark_norms = np.linalg.norm(bmarks, axis=1)
+    bmark_norms[bmark_norms == 0] = 1.0
+
+    scores = dot / (row_norms * bmark_norms)
+    scores[invalid] = -1.0
+    return scores.T
+
+def vocbp_raw_matrix(X, means, scales, bmarks, weights):
+    """
+    Position-weighted mean z deviation of every transfer from every scenario benchmark.
+
+    Args:
+        X (np.ndarray): (t, m) raw VOCBP stats of the transfers (NaN stats contribute 0)
+        means, scales, bmarks (np.ndarray): (s, m) scaler and benchmark of each scenario
+        weights (np.ndarray): (s, m) mean-normalized position weights of each scenario
+
+    Returns:
+        np.ndarray: (s, t) raw VOCBP (before the SOS bump)
+    """
+    valid = ~np.isnan(X)
+    X = np.where(valid, X, 0.0)
+    weighted = (X @ (weights / scales).T
+                - valid.astype(float) @ (weights * (means / scales + bmarks)).T)
+    return (weighted / weights.sum(axis=1)).T
+
+class LeagueMatrix:
+    """
+    Fit and value scores of every (scenario, transfer) pair of one season and position.
+
+    Attributes:
+        scenarios (pd.DataFrame): team_name, player_id (replaced player) of each row
+        transfers (pd.DataFrame): player_id, player_name, prev_team_name of each column
+        sim_score (np.ndarray): (scenarios, transfers) float32 fit scores
+        vocbp (np.ndarray): (scenarios, transfers) float32 VOCBP scores (SOS bump included)
+    """
+
+    def __init__(self, season_year, pos, scenarios, transfers, sim_score, vocbp):
+        self.season_year = int(season_year)
+        self.pos = pos
+        self.scenarios = scenarios.reset_index(drop=True)
+        self.transfers = transfers.reset_index(drop=True)
+        self.sim_score = np.asarray(sim_score, dtype=np.float32)
+        self.vocbp = np.asarray(vocbp, dtype=np.float32)
+        self._scenario_row = {(team, int(pid)): i for i, (team, pid) in
+                              enumerate(zip(self.scenarios['team_name'], self.scenarios['player_id']))}
+        self._transfer_col = {int(pid): i for i, pid in enumerate(self.transfers['player_id'])}
+
+    def _scores(self, by):
+        if by not in ('sim_score', 'vocbp'):
+            raise ValueError(f"by must be 'sim_score' or 'vocbp', got {by!r}")
+        return getattr(self, by)
+
+    def best_transfers(self, team_name, player_id_to_replace, top_n=10, by='sim_score'):
+        """
+        Best transfers for one team need.
+
+        Returns:
+            pd.DataFrame: Transfer metadata with sim_score and vocbp, best first
+        """
+        row = self._scenario_row[(team_name, int(player_id_to_replace))]
+        order = np.argsort(-self._scores(by)[row], kind='stable')[:top_n]
+        result = self.transfers.iloc[order].reset_index(drop=True)
+        result['sim_score'] = self.sim_score[row, order]
+        result['vocbp'] = self.vocbp[row, order]
+        return result
+
+    def best_teams(self, transfer_player_id, top_n=10, by='sim_score'):
+        """
+        Best team needs for one transfer.
+
+        Returns:
+            pd.DataFrame: Scenario team_name and replaced player_id with sim_score and vocbp, best first
+        """
+        col = self._transfer_col[int(transfer_player_id)]
+        order = np.argsort(-self._scores(by)[:, col], kind='stable')[:top_n]
+        result = self.scenarios.iloc[order].reset_index(drop=True)
+        result['sim_score'] = self.sim_score[order, col]
+        result['vocbp'] = self.vocbp[order, col]
+        return result
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path,
+                 season_year=np.array(self.season_year),
+                 pos=np.array(self.pos),
+                 scenario_teams=self.scenarios['team_name'].values.astype(str),
+                 scenario_player_ids=self.scenarios['player_id'].values.astype(np.int64),
+                 transfer_player_ids=self.transfers['player_id'].values.astype(np.int64),
+                 transfer_names=self.transfers['player_name'].values.astype(str),
+                 transfer_prev_teams=self.transfers['prev_team_name'].values.astype(str),
+                 sim_score=self.sim_score,
+                 vocbp=self.vocbp)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            scenarios = pd.DataFrame({'team_name': data['scenario_teams'],
+                                      'player_id': data['scenario_player_ids']})
+            transfers = pd.DataFrame({'player_id': data['transfer_player_ids'],
+                                      'player_name': data['transfer_names'],
+                                      'prev_team_name': data['transfer_prev_teams']})
+            return cls(int(data['season_year']), str(data['pos']), scenarios, transfers,
+                       data['sim_score'], data['vocbp'])
+
+    def __len__(self):
+        return len(self.scenarios)
+
+def load_league_matrix(season_year, pos):
+    """Load (once) the stored league matrix of a season and position."""
+    return load_cached(league_matrix_path(season_year, pos), LeagueMatrix.load)
+
+def build_league_matrices(conn, season_year, scenarios_df):
+    """
+    Compute the league matrices of one season.
+
+    Args:
+        conn: Database connection
+        season_year (int): Incoming season of the scenarios
+        scenarios_df (pd.DataFrame): Scenarios with team_name and player_id (replaced player)
+
+    Returns:
+        tuple: (dict pos -> LeagueMatrix, list of (team_name, player_id, error) for the scenarios
+            skipped because their benchmark raised a ValueError, as the backtest skips them)
+    """
+    fs_query, vocbp_query = InitBenchmarkPlayer.fs_query(), InitBenchmarkPlayer.vocbp_query()
+    by_pos = {}
+    skipped = []
+
+    # Scenario side: one scaler and benchmark per team need
+    for team_name, player_id in scenarios_df[['team_name', 'player_id']].drop_duplicates().itertuples(index=False):
+        try:
+            bmark = InitBenchmarkPlayer(conn, team_name, season_year, int(player_id))
+            fs_scaler, v_scaler = bmark.fs_scalar(), bmark.vocbp_scalar()
+        except ValueError as e:
+            skipped.append((team_name, int(player_id), str(e)))
+            continue
+
+        entry = by_pos.setdefault(bmark.replaced_plyr_pos, {
+            'fs_cols': list(bmark.fs_benchmark_indices()),
+            'v_cols': list(bmark.vocbp_benchmark_indices()),
+            'scenarios': [], 'fs': [], 'v': []})
+        entry['scenarios'].append((team_name, int(player_id)))
+        entry['fs'].append((fs_scaler.mean_, fs_scaler.scale_, bmark.fs_benchmark_values()))
+        entry['v'].append((v_scaler.mean_, v_scaler.scale_, bmark.vocbp_bmark_values()))
+
+    matrices = {}
+    for pos, entry in by_pos.items():
+        pool = get_transfer_pool(conn, season_year, pos, (fs_query, vocbp_query))
+        table = pool.table
+        keep = np.flatnonzero(table.first_occurrences())
+        transfers = pd.DataFrame({'player_id': table.player_ids[keep],
+                                  'player_name': table.player_names(keep),
+                                  'prev_team_name': table.team_names(keep)})
+
+        fs_means, fs_scales, fs_bmarks = (np.vstack(a) for a in zip(*entry['fs']))
+        X_fs = table.matrix(entry['fs_cols'], keep)
+        # Null metadata also scores -1 in the per-scenario fit score
+        X_fs[table.missing_metadata()[keep]] = np.nan
+        sim_score = fit_score_matrix(X_fs, fs_means, fs_scales, fs_bmarks)
+
+        v_means, v_scales, v_bmarks = (np.vstack(a) for a in zip(*entry['v']))
+        weights = np.tile(position_weight_vector(pos, entry['v_cols'])[0], (len(v_means), 1))
+        vocbp_raw = vocbp_raw_matrix(table.matrix(entry['v_cols'], keep), v_means, v_scales, v_bmarks, weights)
+
+        sos_adj_factor, _ = get_sos_adjustment_arrays(transfers['prev_team_name'].values, season_year - 1)
+
+        scenarios = pd.DataFrame(entry['scenarios'], columns=['team_name', 'player_id'])
+        matrices[pos] = LeagueMatrix(season_year, pos, scenarios, transfers,
+                                     sim_score, vocbp_raw + sos_adj_factor)
+
+    return matrices, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description="Build league-wide scenario x transfer fit and value matrices.")
+    parser.add_argument('--season', type=int, action='append', help="Season(s) to build (default: every season in the scenarios CSV)")
+    parser.add_argument('--scenarios', default=scenarios_path, help=f"Scenario CSV (default: {scenarios_path})")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    scenarios_df = pd.read_csv(args.scenarios)
+    seasons = args.season or sorted(scenarios_df['season_year'].unique())
+
+    for season_year in seasons:
+        season_df = scenarios_df[scenarios_df['season_year'] == season_year]
+        matrices, skipped = build_league_matrices(conn, int(season_year), season_df)
+        for pos, matrix in matrices.items():
+            matrix.save(league_matrix_path(season_year, pos))
+            print(f"{season_year} {pos}: {len(matrix.scenarios)} scenarios x {len(matrix.transfers)} transfers "
+                  f"-> {league_matrix_path(season_year, pos)}")
+        for team_name, player_id, error in skipped:
+            print(f"{season_year}: skipped ({team_name}, {player_id}): {error}")
+        if skipped:
+            print(f"{season_year}: skipped {len(skipped)} scenarios without a benchmark")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,7 @@ from __future__ import annotations
 import os
 import numpy as np
 import pandas as pd
+from Analysis.Helpers.fileCache import load_cached
 
 
 REQUIRED_COLS = {'team_name', 'season_year', 'sos'}
@@ -130,7 +131,7 @@ def get_sos_adjustment_year(
     -------
     pd.DataFrame with columns: ['team_name','season_year','sos_adj_factor', ('sos_z')]
     """
-    df = pd.read_csv(csv_path)
+    df = load_cached(csv_path, pd.read_csv)
     season_df = df[df['season_year'] == int(season_year)].copy()
     cols = ['team_name', 'season_year', 'sos_adj_factor'] + (['sos_z'] if include_z and 'sos_z' in season_df.columns else [])
     return season_df[cols]
@@ -159,6 +160,97 @@ def get_sos_adjustment_team_year(
     return out
 
 
+class SosAdjustmentTable:
+    """
+    In-memory SOS value adjustments keyed by integer team codes.
+
+    Attributes
+    ----------
+    teams : pd.Index
+        Team names; a team's code is its position in this index.
+    first_season : int
+        Season of row 0 of the dense arrays.
+    factors, sos_z, present : np.ndarray
+        (n_seasons, n_teams) arrays; missing (season, team) pairs hold 0.0 / NaN / False.
+    """
+
+    def __init__(self, sos_df: pd.DataFrame):
+        sos_df = sos_df.drop_duplicates(['season_year', 'team_name'])
+        self.teams = pd.Index(sos_df['team_name'].unique())
+        seasons = sos_df['season_year'].astype(int).values
+        self.first_season = int(seasons.min()) if len(seasons) else 0
+        n_seasons = int(seasons.max()) - self.first_season + 1 if len(seasons) else 0
+
+        rows = seasons - self.first_season
+        cols = self.teams.get_indexer(sos_df['team_name'])
+        self.factors = np.zeros((n_seasons, len(self.teams)))
+        self.factors[rows, cols] = sos_df['sos_adj_factor'].values
+        self.sos_z = np.full((n_seasons, len(self.teams)), np.nan)
+        if 'sos_z' in sos_df.columns:
+            self.sos_z[rows, cols] = sos_df['sos_z'].values
+        self.present = np.zeros((n_seasons, len(self.teams)), dtype=bool)
+        self.present[rows, cols] = True
+
+    def team_codes(self, team_names) -> np.ndarray:
+        """Integer code of each team name (-1 for teams without adjustments)."""
+        return self.teams.get_indexer(pd.Index(team_names))
+
+    def lookup(self, season_year: int, team_codes) -> tuple:
+        """
+        (sos_adj_factor, sos_z, found) arrays for team codes in a season;
+        missing pairs get 0.0 / NaN / False.
+        """
+        team_codes = np.asarray(team_codes, dtype=int)
+        factor = np.zeros(len(team_codes))
+        sos_z = np.full(len(team_codes), np.nan)
+        found = np.zeros(len(team_codes), dtype=bool)
+
+        row = int(season_year) - self.first_season
+        if 0 <= row < len(self.factors):
+            known = team_codes >= 0
+            factor[known] = self.factors[row, team_codes[known]]
+            sos_z[known] = self.sos_z[row, team_codes[known]]
+            found[known] = self.present[row, team_codes[known]]
+        return factor, sos_z, found
+
+
+def _load_sos_adjustment_table(csv_path: str) -> SosAdjustmentTable:
+    return SosAdjustmentTable(pd.read_csv(csv_path))
+
+
+def load_sos_adjustment_table(
+    csv_path: str = "Analysis/CalculateScores/CSV/sos_value_adjustment.csv",
+) -> SosAdjustmentTable:
+    """Load (once, re-read only when the CSV changes) the SOS value adjustment table."""
+    return load_cached(csv_path, _load_sos_adjustment_table)
+
+
+def get_sos_adjustment_arrays(
+    team_names,
+    season_year: int,
+    csv_path: str = "Analysis/CalculateScores/CSV/sos_value_adjustment.csv",
+) -> tuple:
+    """
+    Look up the SOS value adjustment of many teams at once.
+
+    Parameters
+    ----------
+    team_names : array-like
+        Team of each row (e.g., previous team of each transfer).
+    season_year : int
+        Season for which to fetch the team SOS adjustments.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (sos_adj_factor, sos_z) aligned with team_names; teams without an entry get
+        a 0.0 factor and a NaN sos_z.
+    """
+    table = load_sos_adjustment_table(csv_path)
+    factor, sos_z, _ = table.lookup(season_year, table.team_codes(team_names))
+    return factor, sos_z
+
+
 def apply_sos_bonus_to_value(
     vocbp_raw: float,
     team_name: str,
@@ -203,23 +295,23 @@ def apply_sos_bonus_to_value_df(
     Returns
     -------
     pd.DataFrame
-        Copy of value_df with 'sos_adj_factor' merged and a new/updated `out_col` = `in_col` + sos_adj_factor.
+        Copy of value_df with 'sos_adj_factor' and 'sos_z' attached (looked up by integer team
+        code, no merge) and a new/updated `out_col` = `in_col` + sos_adj_factor.
     """
-    out = value_df.copy()
-    sos_df = get_sos_adjustment_year(season_year, csv_path=csv_path, include_z=True)
-
-    # Prepare merge frame keyed by team
-    merge_cols = ['team_name', 'sos_adj_factor'] + (['sos_z'] if 'sos_z' in sos_df.columns else [])
-    sos_keyed = sos_df[merge_cols].rename(columns={'team_name': team_col})
+    out = value_df.reset_index(drop=True)
+    table = load_sos_adjustment_table(csv_path)
+    factor, sos_z, found = table.lookup(season_year, table.team_codes(out[team_col].values))
 
-    out = out.merge(sos_keyed, on=team_col, how='left')
+    out['sos_adj_factor'] = factor
+    out['sos_z'] = sos_z
 
-    # If the raw value column is missing, just return with the factor merged
+    # If the raw value column is missing, just return with the factor attached
+    # (NaN for teams without an adjustment)
     if in_col not in out.columns:
+        out.loc[~found, 'sos_adj_factor'] = np.nan
         return out
 
-    # Fill missing sos_adj_factor with 0.0 (no bump) and compute final value
-    out['sos_adj_factor'] = out['sos_adj_factor'].fillna(0.0)
+    # Missing teams get a 0.0 sos_adj_factor (no bump); compute final value
     out[out_col] = out[in_col] + out['sos_adj_factor']
 
     return out
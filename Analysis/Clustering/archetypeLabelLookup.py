@@ -0,0 +1,80 @@
+"""
+Archetype Label Lookup Module
+
+Serves the human-readable archetype labels of player and team clusters
+(archetypeLables.json / archetypeLabels.json) from memory.
+
+Both files are parsed once into dense arrays indexed by cluster id, so many ids can be
+mapped with a single numpy take, and are re-parsed automatically when either file changes.
+"""
+
+import json
+import numpy as np
+from Analysis.Helpers.fileCache import load_cached
+
+player_labels_path = 'Analysis/Clustering/Players/archetypeLables.json'
+team_labels_path = 'Analysis/Clustering/Teams/archetypeLabels.json'
+
+def _dense_labels(clusters):
+    """Turn {"id": {"label", "rationale"}} into (labels, rationales) object arrays indexed by id."""
+    size = max(int(i) for i in clusters) + 1 if clusters else 0
+    labels = np.full(size, None, dtype=object)
+    rationales = np.full(size, None, dtype=object)
+    for id_s, clu in clusters.items():
+        labels[int(id_s)] = clu['label']
+        rationales[int(id_s)] = clu['rationale']
+    return labels, rationales
+
+def _load_player_labels(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {(int(year_s), pos): _dense_labels(clusters)
+            for year_s, positions in data.items()
+            for pos, clusters in positions.items()}
+
+def _load_team_labels(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {int(year_s): _dense_labels(clusters) for year_s, clusters in data.items()}
+
+def _take(table, ids, rationale):
+    labels, rationales = table
+    ids = np.asarray(ids, dtype=int)
+    in_range = (ids >= 0) & (ids < len(labels))
+    found = np.zeros(ids.shape, dtype=bool)
+    found[in_range] = labels[ids[in_range]] != None
+    if not found.all():
+        raise KeyError(f"Unknown cluster id(s): {sorted(set(ids[~found].tolist()))}")
+
+    if rationale:
+        return labels[ids], rationales[ids]
+    return labels[ids]
+
+def player_archetype_labels(year, pos, ids, rationale=False):
+    """
+    Map player cluster ids to archetype labels.
+
+    Args:
+        year (int): Season year of the cluster model
+        pos (str): Player position ("G", "F", "C")
+        ids (array-like): Cluster ids (any shape)
+        rationale (bool): Also return the rationale array
+
+    Returns:
+        np.ndarray or tuple: Object array of labels with the shape of ids,
+            or (labels, rationales) if rationale=True
+
+    Raises:
+        KeyError: If the year/position or any id has no label
+    """
+    table = load_cached(player_labels_path, _load_player_labels)[(int(year), str(pos))]
+    return _take(table, ids, rationale)
+
+def team_archetype_labels(year, ids, rationale=False):
+    """
+    Map team cluster ids to archetype labels.
+
+    Same contract as `player_archetype_labels`, without the position.
+    """
+    table = load_cached(team_labels_path, _load_team_labels)[int(year)]
+    return _take(table, ids, rationale)
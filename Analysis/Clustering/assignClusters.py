@@ -0,0 +1,326 @@
+"""
+Bulk Cluster Assignment Module
+
+Computes player and team cluster assignments, with soft weights, for every player-season
+and team-season covered by the clustering artifacts and writes them back to the database
+in a single transaction.
+
+The model for year Y is fit on the lookback window [Y - LOOKBACK_YEAR, Y), so a season is
+covered by several models. Every (season, model year) pair is stored in the
+Player_Cluster_Assignments / Team_Cluster_Assignments tables, and the canonical assignment is
+copied onto Player_Seasons.player_cluster / Team_Seasons.team_cluster, which is what
+`load_players` reads:
+    - players: the earliest model covering the season
+    - teams:   the latest model covering the season
+This is the same rule the columns were originally populated with (Database/addClusterNumToDB.ipynb).
+
+Every written row records the artifact version (a hash of the PCA and profile files) so the
+database can be checked against the artifacts it was computed from.
+
+Usage:
+    python -m Analysis.Clustering.assignClusters [--db rosteriq.db] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from Analysis.Clustering import matchPlayerToCluster as plyr_clu
+from Analysis.Clustering import matchTeamToCluster as team_clu
+from Analysis.Clustering import pcaPlayers
+from Analysis.config import Config
+
+# Number of nearest clusters kept in the soft weights
+PLAYER_K = 2
+TEAM_K = 2
+
+def artifact_files():
+    """Paths of every PCA/profile file the assignments depend on, in a stable order."""
+    paths = []
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        for pos in Config.POSITIONS:
+            paths += [pcaPlayers.params_path(year, pos),
+                      pcaPlayers.rotation_path(year, pos),
+                      plyr_clu.profiles_path(year, pos)]
+        paths += [team_clu.scaling_path(year),
+                  team_clu.rot_path(year),
+                  team_clu.profiles_path(year)]
+    return paths
+
+def artifact_version():
+    """
+    Short content hash of the clustering artifacts.
+
+    Returns:
+        str: First 12 hex characters of the SHA-1 over all artifact files
+    """
+    sha = hashlib.sha1()
+    for path in artifact_files():
+        sha.update(path.encode())
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()[:12]
+
+def _top_k(cluster_ids, dists, k):
+    """Return (nearest ids, nearest distances) for the k closest clusters of every row."""
+    k = min(k, dists.shape[1])
+    order = np.argsort(dists, axis=1)[:, :k]
+    return cluster_ids[order], np.take_along_axis(dists, order, axis=1)
+
+def _weights_json(top_ids, weights):
+    """Serialize each row's {cluster_id: weight} mapping as JSON."""
+    return [json.dumps({str(int(c)): round(float(w), 6) for c, w in zip(ids, ws)})
+            for ids, ws in zip(top_ids, weights)]
+
+def assign_player_clusters(conn, k=PLAYER_K):
+    """
+    Assign every player-season in each model's lookback window to its player clusters.
+
+    Weights use the same inverse-power transform as `match_player_to_cluster_weights`.
+
+    Returns:
+        pd.DataFrame: player_id, team_name, season_year, model_year, position,
+            player_cluster, distance, cluster_weights
+    """
+    all_players_df = plyr_clu.get_all_player_stats(conn,
+                                                   Config.START_YEAR - Config.LOOKBACK_YEAR,
+                                                   Config.END_YEAR_EXCLUDE)
+    all_players_df = all_players_df.dropna(subset=plyr_clu.PLAYER_FEATURE_COLS)
+
+    frames = []
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        in_window = ((all_players_df['season_year'] >= year - Config.LOOKBACK_YEAR) &
+                     (all_players_df['season_year'] < year))
+        for pos in Config.POSITIONS:
+            pos_df = all_players_df[in_window & (all_players_df['position'] == pos)]
+            if pos_df.empty:
+                continue
+
+            cluster_ids, dists = plyr_clu.cluster_distances(pos_df[plyr_clu.PLAYER_FEATURE_COLS].values, year, pos)
+            top_ids, top_dists = _top_k(cluster_ids, dists, k)
+            weights = plyr_clu.similarity_weights(top_dists)
+
+            frames.append(pd.DataFrame({
+                'player_id': pos_df['player_id'].values,
+                'team_name': pos_df['team_name'].values,
+                'season_year': pos_df['season_year'].values,
+                'model_year': year,
+                'position': pos,
+                'player_cluster': top_ids[:, 0],
+                'distance': top_dists[:, 0],
+                'cluster_weights': _weights_json(top_ids, weights),
+            }))
+
+    return pd.concat(frames, ignore_index=True)
+
+def assign_team_clusters(conn, k=TEAM_K):
+    """
+    Assign every team-season in each model's lookback window to its team clusters.
+
+    Weights use the same RBF transform as `match_team_to_cluster_weights`.
+
+    Returns:
+        pd.DataFrame: team_name, season_year, model_year, team_cluster, distance, cluster_weights
+    """
+    all_teams_df = team_clu.get_all_team_stats(conn,
+                                               Config.START_YEAR - Config.LOOKBACK_YEAR,
+                                               Config.END_YEAR_EXCLUDE)
+    all_teams_df = all_teams_df.replace([np.inf, -np.inf], np.nan).dropna(subset=team_clu.TEAM_FEATURE_COLS)
+
+    frames = []
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        year_df = all_teams_df[(all_teams_df['season_year'] >= year - Config.LOOKBACK_YEAR) &
+                               (all_teams_df['season_year'] < year)]
+        if year_df.empty:
+            continue
+
+        cluster_ids, dists = team_clu.team_cluster_distances(year_df[team_clu.TEAM_FEATURE_COLS].values, year)
+        top_ids, top_dists = _top_k(cluster_ids, dists, k)
+        weights = team_clu.team_similarity_weights(top_dists)
+
+        frames.append(pd.DataFrame({
+            'team_name': year_df['team_name'].values,
+            'season_year': year_df['season_year'].values,
+            'model_year': year,
+            'team_cluster': top_ids[:, 0],
+            'distance': top_dists[:, 0],
+            'cluster_weights': _weights_json(top_ids, weights),
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+def _ensure_column(cursor, table, column, decl):
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def write_cluster_assignments(conn, player_df, team_df, version):
+    """
+    Replace all stored cluster assignments in one transaction.
+
+    Rebuilds the assignment tables, updates the canonical cluster columns on
+    Player_Seasons / Team_Seasons and records the artifact version used.
+    Rolls back everything if any statement fails.
+    """
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        cursor.execute("BEGIN")
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Player_Cluster_Assignments (
+                player_id INTEGER,
+                team_name VARCHAR(30),
+                season_year INTEGER,
+                model_year INTEGER,
+                position VARCHAR(5),
+                player_cluster INT,
+                distance FLOAT,
+                cluster_weights TEXT,
+                artifact_version VARCHAR(12),
+                PRIMARY KEY (player_id, team_name, season_year, model_year)
+            )""")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Team_Cluster_Assignments (
+                team_name VARCHAR(30),
+                season_year INTEGER,
+                model_year INTEGER,
+                team_cluster INT,
+                distance FLOAT,
+                cluster_weights TEXT,
+                artifact_version VARCHAR(12),
+                PRIMARY KEY (team_name, season_year, model_year)
+            )""")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Cluster_Artifact_Versions (
+                artifact_version VARCHAR(12) PRIMARY KEY,
+                model_years TEXT,
+                player_rows INT,
+                team_rows INT,
+                created_at TEXT
+            )""")
+        _ensure_column(cursor, "Player_Seasons", "player_cluster", "INT")
+        _ensure_column(cursor, "Player_Seasons", "player_cluster_weights", "TEXT")
+        _ensure_column(cursor, "Player_Seasons", "cluster_version", "VARCHAR(12)")
+        _ensure_column(cursor, "Team_Seasons", "team_cluster", "INT")
+        _ensure_column(cursor, "Team_Seasons", "team_cluster_weights", "TEXT")
+        _ensure_column(cursor, "Team_Seasons", "cluster_version", "VARCHAR(12)")
+
+        cursor.execute("DELETE FROM Player_Cluster_Assignments")
+        cursor.execute("DELETE FROM Team_Cluster_Assignments")
+        cursor.executemany("""
+            INSERT OR REPLACE INTO Player_Cluster_Assignments
+            (player_id, team_name, season_year, model_year, position, player_cluster, distance, cluster_weights, artifact_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(int(r.player_id), r.team_name, int(r.season_year), int(r.model_year), r.position,
+              int(r.player_cluster), float(r.distance), r.cluster_weights, version)
+             for r in player_df.itertuples(index=False)])
+        cursor.executemany("""
+            INSERT OR REPLACE INTO Team_Cluster_Assignments
+            (team_name, season_year, model_year, team_cluster, distance, cluster_weights, artifact_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [(r.team_name, int(r.season_year), int(r.model_year), int(r.team_cluster),
+              float(r.distance), r.cluster_weights, version)
+             for r in team_df.itertuples(index=False)])
+
+        # Canonical assignment per season (see module docstring)
+        canon_players = (player_df.sort_values('model_year')
+                         .drop_duplicates(['player_id', 'team_name', 'season_year'], keep='first'))
+        canon_teams = (team_df.sort_values('model_year')
+                       .drop_duplicates(['team_name', 'season_year'], keep='last'))
+        cursor.executemany("""
+            UPDATE Player_Seasons
+            SET player_cluster = ?, player_cluster_weights = ?, cluster_version = ?
+            WHERE player_id = ? AND team_name = ? AND season_year = ?""",
+            [(int(r.player_cluster), r.cluster_weights, version,
+              int(r.player_id), r.team_name, int(r.season_year))
+             for r in canon_players.itertuples(index=False)])
+        cursor.executemany("""
+            UPDATE Team_Seasons
+            SET team_cluster = ?, team_cluster_weights = ?, cluster_version = ?
+            WHERE team_name = ? AND season_year = ?""",
+            [(int(r.team_cluster), r.cluster_weights, version,
+              r.team_name, int(r.season_year))
+             for r in canon_teams.itertuples(index=False)])
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO Cluster_Artifact_Versions
+            (artifact_version, model_years, player_rows, team_rows, created_at)
+            VALUES (?, ?, ?, ?, ?)""",
+            (version,
+             json.dumps(list(range(Config.START_YEAR, Config.END_YEAR_EXCLUDE))),
+             len(player_df),
+             len(team_df),
+             datetime.now(timezone.utc).isoformat(timespec='seconds')))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def load_cluster_assignments(conn, model_year, position=None):
+    """
+    Load the stored player and team cluster assignments of one model year.
+
+    Args:
+        conn: Database connection object
+        model_year (int): Cluster model year (its lookback window is returned)
+        position (str, optional): Restrict to one position
+
+    Returns:
+        pd.DataFrame: player_name, player_id, team_name, position, season_year,
+            Cluster (player cluster), team_cluster
+    """
+    query = """
+    SELECT
+        p.player_name,
+        pca.player_id,
+        pca.team_name,
+        pca.position,
+        pca.season_year,
+        pca.player_cluster AS Cluster,
+        tca.team_cluster
+    FROM Player_Cluster_Assignments pca
+    JOIN Players p
+        ON p.player_id = pca.player_id
+    LEFT JOIN Team_Cluster_Assignments tca
+        ON tca.team_name = pca.team_name
+       AND tca.season_year = pca.season_year
+       AND tca.model_year = pca.model_year
+    WHERE pca.model_year = ?
+    """
+    params = [model_year]
+    if position is not None:
+        query += " AND pca.position = ?"
+        params.append(position)
+
+    return pd.read_sql(query, conn, params=params)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write cluster assignments for every player-season and team-season to the database.")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    parser.add_argument('--dry-run', action='store_true', help="Compute assignments and print a summary without writing")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise FileNotFoundError(f"Database not found: {args.db}")
+
+    conn = sqlite3.connect(args.db)
+    version = artifact_version()
+
+    player_df = assign_player_clusters(conn)
+    team_df = assign_team_clusters(conn)
+    print(f"Artifact version: {version}")
+    print(f"Player-season assignments: {len(player_df)}")
+    print(f"Team-season assignments: {len(team_df)}")
+
+    if not args.dry_run:
+        write_cluster_assignments(conn, player_df, team_df, version)
+        print(f"Wrote cluster assignments to {args.db}")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
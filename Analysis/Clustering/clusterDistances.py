@@ -0,0 +1,166 @@
+"""
+Precomputed Player-to-Centroid Distance Tables
+
+`match_player_to_cluster_weights` re-projects a player and recomputes the distances to every
+centroid on each call, for one weighting configuration. This module stores, per model year and
+position, the full distance vector of every player-season to every centroid so that any
+weighting method / k / alpha / power can be derived with array operations only.
+
+A table for model year Y covers seasons [Y - LOOKBACK_YEAR, Y]: the lookback window the model
+was fit on plus season Y itself, which is the season benchmark players are projected from.
+
+Usage:
+    python -m Analysis.Clustering.clusterDistances [--db rosteriq.db]
+"""
+
+import argparse
+import sqlite3
+import numpy as np
+from Analysis.Clustering import matchPlayerToCluster as plyr_clu
+from Analysis.Clustering.assignClusters import artifact_version
+from Analysis.Helpers.fileCache import load_cached
+from Analysis.config import Config
+
+# Lambda function to generate file paths for distance tables by year and position
+distances_path = lambda year, pos : f"Analysis/Clustering/Players/{year}/KClustering/centroid_distances_{pos}.npz"
+
+class DistanceTable:
+    """
+    Distances of every player-season to every centroid of one (model year, position).
+
+    Attributes:
+        player_ids (np.ndarray): (n,) player id of each row
+        season_years (np.ndarray): (n,) season of each row
+        cluster_ids (np.ndarray): (c,) cluster id of each column
+        distances (np.ndarray): (n, c) Euclidean distances in PCA space
+        version (str): Artifact version the table was computed from
+    """
+
+    def __init__(self, player_ids, season_years, cluster_ids, distances, version):
+        self.player_ids = player_ids
+        self.season_years = season_years
+        self.cluster_ids = cluster_ids
+        self.distances = distances
+        self.version = version
+        self._row_index = {(int(p), int(s)): i for i, (p, s) in enumerate(zip(player_ids, season_years))}
+
+    def rows(self, player_ids, season_years):
+        """Row positions of the given (player_id, season_year) pairs (KeyError if missing)."""
+        return np.array([self._row_index[(int(p), int(s))] for p, s in zip(player_ids, season_years)], dtype=int)
+
+    def __len__(self):
+        return len(self.player_ids)
+
+def build_distance_tables(conn, version=None):
+    """
+    Compute and save the distance table of every model year and position.
+
+    Args:
+        conn: Database connection object
+        version (str, optional): Artifact version to record (computed if None)
+
+    Returns:
+        dict: (year, pos) -> number of player-seasons written
+    """
+    version = version or artifact_version()
+    all_players_df = plyr_clu.get_all_player_stats(conn,
+                                                   Config.START_YEAR - Config.LOOKBACK_YEAR,
+                                                   Config.END_YEAR_EXCLUDE)
+    all_players_df = all_players_df.dropna(subset=plyr_clu.PLAYER_FEATURE_COLS)
+
+    written = {}
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        in_window = ((all_players_df['season_year'] >= year - Config.LOOKBACK_YEAR) &
+                     (all_players_df['season_year'] <= year))
+        for pos in Config.POSITIONS:
+            pos_df = (all_players_df[in_window & (all_players_df['position'] == pos)]
+                      .drop_duplicates(['player_id', 'season_year']))
+
+            cluster_ids, dists = plyr_clu.cluster_distances(pos_df[plyr_clu.PLAYER_FEATURE_COLS].values, year, pos)
+            np.savez(distances_path(year, pos),
+                     player_ids=pos_df['player_id'].values.astype(np.int64),
+                     season_years=pos_df['season_year'].values.astype(np.int64),
+                     cluster_ids=cluster_ids,
+                     distances=dists,
+                     version=np.array(version))
+            written[(year, pos)] = len(pos_df)
+
+    return written
+
+def _load_distance_table(path):
+    with np.load(path) as data:
+        return DistanceTable(data['player_ids'], data['season_years'], data['cluster_ids'],
+                             data['distances'], str(data['version']))
+
+def load_distance_table(year, pos):
+    """Load (once) the precomputed distance table of a model year and position."""
+    return load_cached(distances_path(year, pos), _load_distance_table)
+
+def weights_from_distances(distances, k=2, method='inverse_pow', alpha=None, power=1.5):
+    """
+    Soft cluster weights for many players at once.
+
+    Keeps the k nearest centroids of every row and transforms their distances with
+    `similarity_weights`, exactly like `match_player_to_cluster_weights` does for one player.
+
+    Args:
+        distances (np.ndarray): (n, c) distances to every centroid
+        k (int): Number of nearest clusters that get a weight
+        method, alpha, power: See `similarity_weights`
+
+    Returns:
+        np.ndarray: (n, c) weights aligned with the distance columns; each row sums to 1
+            and has at most k non-zero entries
+    """
+    distances = np.atleast_2d(distances)
+    k = min(k, distances.shape[1])
+    order = np.argsort(distances, axis=1)[:, :k]
+    top = np.take_along_axis(distances, order, axis=1)
+
+    weights = np.zeros_like(distances, dtype=float)
+    np.put_along_axis(weights, order, plyr_clu.similarity_weights(top, method=method, alpha=alpha, power=power), axis=1)
+    return weights
+
+def sweep_weight_configs(table, configs, rows=None):
+    """
+    Evaluate several weighting configurations on a distance table in one call.
+
+    Args:
+        table (DistanceTable): Precomputed distances
+        configs (list[dict]): Keyword arguments for `weights_from_distances`,
+            e.g. [{'method': 'rbf', 'k': 3}, {'method': 'inverse_pow', 'k': 2, 'power': 2.0}]
+        rows (np.ndarray, optional): Subset of table rows (see DistanceTable.rows)
+
+    Returns:
+        np.ndarray: (n_configs, n, c) weights, one slice per configuration
+    """
+    distances = table.distances if rows is None else table.distances[rows]
+    return np.stack([weights_from_distances(distances, **config) for config in configs])
+
+def player_cluster_weights_from_table(player_id, season_year, year, pos, k=2, method='inverse_pow', alpha=None, power=1.5):
+    """
+    Precomputed equivalent of `match_player_to_cluster_weights` (without adaptive k).
+
+    Returns:
+        dict: cluster_id -> weight for the k nearest clusters, nearest first
+    """
+    table = load_distance_table(year, pos)
+    row = table.rows([player_id], [season_year])[0]
+    weights = weights_from_distances(table.distances[row], k=k, method=method, alpha=alpha, power=power)[0]
+    order = np.argsort(table.distances[row])[:min(k, len(weights))]
+    return dict(zip(table.cluster_ids[order].astype(int).tolist(), weights[order]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute player-to-centroid distance tables.")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    written = build_distance_tables(conn)
+    conn.close()
+
+    for (year, pos), n in written.items():
+        print(f"{year} {pos}: {n} player-seasons -> {distances_path(year, pos)}")
+
+if __name__ == '__main__':
+    main()
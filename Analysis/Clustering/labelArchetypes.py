@@ -1,6 +1,7 @@
 import csv
 import pandas as pd
 from Analysis.config import Config
+from Analysis.Helpers.fileCache import load_cached
 
 def team_labels():
     output_path = "Analysis/Clustering/Teams/archetypeInputToGPT.txt"
@@ -53,21 +54,36 @@ def player_labels():
                     for row in reader:
                         fout.write(",".join(row) + "\n")
 
+cluster_info_path = 'Analysis/Testing/CSVs/cluster_info.csv'
+
+def _load_cluster_sample_lengths(path):
+    """Parse cluster_info.csv into {(season_year, pos, team_clu_id, player_clu_id): length}."""
+    info_df = pd.read_csv(path).dropna(subset=['team_clu_id', 'player_clu_id'])
+    keys = zip(info_df['season_year'].astype(int),
+               info_df['pos'],
+               info_df['team_clu_id'].astype(int),
+               info_df['player_clu_id'].astype(int))
+    return dict(zip(keys, info_df['length'].astype(int)))
+
+def cluster_sample_lengths(path=cluster_info_path):
+    """
+    Sample sizes of every (season, position, team cluster, player cluster) cell.
+
+    The table is parsed once and reused until cluster_info.csv is regenerated.
+
+    Returns:
+        dict: (season_year, pos, team_clu_id, player_clu_id) -> number of players
+    """
+    return load_cached(path, _load_cluster_sample_lengths)
+
 def get_sample_length_plyr_team_archeytpe(plyr_cluster_id : int,
                                           team_cluster_id : int,
                                           year : int,
                                           pos : str):
     
-    info_df = pd.read_csv('Analysis/Testing/CSVs/cluster_info.csv')
-
-    line = info_df[
-        (info_df['season_year'] == year) &
-        (info_df['pos'] == pos) &
-        (info_df['team_clu_id'] == team_cluster_id) &
-        (info_df['player_clu_id'] == plyr_cluster_id)
-    ]
+    lengths = cluster_sample_lengths()
 
-    return line.iloc[0]['length']
+    return lengths[(int(year), pos, int(team_cluster_id), int(plyr_cluster_id))]
 
 if __name__ == '__main__':
     team_labels()
@@ -28,15 +28,37 @@ Basketball Statistics Used:
 
 import pandas as pd
 import numpy as np
-import json
-from Analysis.Clustering.pcaPlayers import project_to_pca
+from Analysis.Clustering.pcaPlayers import project_to_pca, project_matrix_to_pca
 from collections.abc import Iterable
 from Analysis.Clustering.labelArchetypes import get_sample_length_plyr_team_archeytpe
+from Analysis.Clustering.archetypeLabelLookup import player_archetype_labels
 from Analysis.config import Config
 
 # Lambda function to generate file paths for cluster profile CSVs by year and position
 profiles_path = lambda year, pos : f"Analysis/Clustering/Players/{year}/KClustering/cluster_profiles_{pos}.csv"
 
+# Clustering features in the order the PCA models were fit on
+PLAYER_FEATURE_COLS = ['ts_percent', 'ast_percent', 'oreb_percent', 'dreb_percent', 'tov_percent',
+                       'ft_percent', 'stl_percent', 'blk_percent', 'usg_percent', 'ftr',
+                       'threeRate', 'rimRate', 'midRate']
+
+player_features_fragment = """
+        ps.ts_percent,                    -- True Shooting Percentage (shooting efficiency)
+        ps.ast_percent,                   -- Assist Percentage (playmaking rate)
+        ps.oreb_percent,                  -- Offensive Rebound Percentage
+        ps.dreb_percent,                  -- Defensive Rebound Percentage  
+        ps.tov_percent,                   -- Turnover Percentage
+        ps.ft_percent,                    -- Free Throw Percentage
+        ps.stl_percent,                   -- Steal Percentage (defensive activity)
+        ps.blk_percent,                   -- Block Percentage (rim protection)
+        ps.usg_percent,                   -- Usage Percentage (offensive involvement)
+        ps.ftr / 100 AS ftr,             -- Free Throw Rate (normalized to 0-1 scale)
+        -- Shot selection metrics (proportion of FGA from each zone)
+        CASE WHEN ps.FGA != 0 THEN (ps.threeA / ps.FGA) ELSE 0.00001 END AS threeRate,
+        -- CASE WHEN ps.FGA != 0 THEN (ps.ast_pg * ps.adj_gp) / ps.FGA ELSE 0.00001 END AS ast_fga,
+        CASE WHEN ps.FGA != 0 THEN (ps.rimA / ps.FGA) ELSE 0.00001 END AS rimRate,
+        CASE WHEN ps.FGA != 0 THEN (ps.midA / ps.FGA) ELSE 0.00001 END AS midRate"""
+
 def get_player_stats(player_id, season_year, conn):
     """
     Retrieve comprehensive statistical profile for a specific player in a given season.
@@ -65,26 +87,12 @@ def get_player_stats(player_id, season_year, conn):
     """
     # SQL query to extract comprehensive player statistics
     # Joins Player_Seasons with Players table to get name and calculated rate stats
-    player_features_query = """
+    player_features_query = f"""
     SELECT
         p.player_name,
         ps.position,
         ps.season_year,
-        ps.ts_percent,                    -- True Shooting Percentage (shooting efficiency)
-        ps.ast_percent,                   -- Assist Percentage (playmaking rate)
-        ps.oreb_percent,                  -- Offensive Rebound Percentage
-        ps.dreb_percent,                  -- Defensive Rebound Percentage  
-        ps.tov_percent,                   -- Turnover Percentage
-        ps.ft_percent,                    -- Free Throw Percentage
-        ps.stl_percent,                   -- Steal Percentage (defensive activity)
-        ps.blk_percent,                   -- Block Percentage (rim protection)
-        ps.usg_percent,                   -- Usage Percentage (offensive involvement)
-        ps.ftr / 100 AS ftr,             -- Free Throw Rate (normalized to 0-1 scale)
-        -- Shot selection metrics (proportion of FGA from each zone)
-        CASE WHEN ps.FGA != 0 THEN (ps.threeA / ps.FGA) ELSE 0.00001 END AS threeRate,
-        -- CASE WHEN ps.FGA != 0 THEN (ps.ast_pg * ps.adj_gp) / ps.FGA ELSE 0.00001 END AS ast_fga,
-        CASE WHEN ps.FGA != 0 THEN (ps.rimA / ps.FGA) ELSE 0.00001 END AS rimRate,
-        CASE WHEN ps.FGA != 0 THEN (ps.midA / ps.FGA) ELSE 0.00001 END AS midRate
+        {player_features_fragment}
     FROM Player_Seasons ps
     JOIN Players p ON ps.player_id = p.player_id
     WHERE ps.player_id = ? and ps.season_year = ?
@@ -92,6 +100,107 @@ def get_player_stats(player_id, season_year, conn):
 
     return pd.read_sql(player_features_query, conn, params=(player_id, season_year)).iloc[0]
 
+def get_all_player_stats(conn, start_year, end_year_exclude):
+    """
+    Retrieve the clustering features for every player-season in a range of seasons.
+
+    Same features as `get_player_stats`, plus the keys needed to write results back
+    to Player_Seasons (player_id, team_name).
+
+    Args:
+        conn: Database connection object
+        start_year (int): First season to include
+        end_year_exclude (int): First season to exclude
+
+    Returns:
+        pd.DataFrame: One row per player-season with metadata + PLAYER_FEATURE_COLS
+    """
+    all_features_query = f"""
+    SELECT
+        p.player_name,
+        ps.player_id,
+        ps.team_name,
+        ps.position,
+        ps.season_year,
+        {player_features_fragment}
+    FROM Player_Seasons ps
+    JOIN Players p ON ps.player_id = p.player_id
+    WHERE ps.season_year >= ? AND ps.season_year < ?
+    """
+
+    return pd.read_sql(all_features_query, conn, params=(start_year, end_year_exclude))
+
+def load_cluster_centroids(year, pos):
+    """
+    Load the cluster IDs and PCA-space centroids for a year and position.
+
+    Returns:
+        tuple: (cluster_ids, centroids) - (n_clusters,) int array and (n_clusters, n_pcs) float array
+    """
+    profiles = pd.read_csv(profiles_path(year, pos), index_col=False)
+    pc_columns = [col for col in profiles.columns if col.startswith('PC')]
+    return profiles['ID'].astype(int).values, profiles[pc_columns].astype(float).values
+
+def cluster_distances(player_matrix, year, pos):
+    """
+    Euclidean distance from many players to every cluster centroid.
+
+    Args:
+        player_matrix (np.ndarray): (n_players, n_features) raw stats in PLAYER_FEATURE_COLS order
+        year (int): Season year for cluster model selection
+        pos (str): Player position ("G", "F", or "C")
+
+    Returns:
+        tuple: (cluster_ids, distances) - distances is (n_players, n_clusters), columns
+            aligned with cluster_ids
+    """
+    cluster_ids, centroids = load_cluster_centroids(year, pos)
+    pca_matrix = project_matrix_to_pca(player_matrix, pos, year)
+    dists = np.linalg.norm(pca_matrix[:, None, :] - centroids[None, :, :], axis=2)
+    return cluster_ids, dists
+
+def similarity_weights(distances, method='inverse_pow', alpha=None, power=1.5):
+    """
+    Transform distances to cluster centroids into weights that sum to 1.
+
+    Works on a single vector of distances or on a (n_players, k) matrix, in which case
+    each row is normalized on its own.
+
+    Args:
+        distances (np.ndarray): Distances to the selected clusters
+        method (str): 'rbf', 'inverse' or 'inverse_pow' (see match_player_to_cluster_weights)
+        alpha (float, optional): RBF kernel parameter (median-distance heuristic if None)
+        power (float): Power parameter for 'inverse_pow'
+
+    Returns:
+        np.ndarray: Weights with the same shape as distances
+    """
+    epsilon = 1e-6  # Small value to prevent division by zero
+    distances = np.asarray(distances, dtype=float)
+
+    if method == 'rbf':
+        # Radial Basis Function (Gaussian) kernel: sim = exp(-alpha * distance)
+        # Alpha controls kernel width - larger alpha = more localized similarity
+        if alpha is None:
+            # Auto-calculate alpha based on median distance
+            alpha = 1.0 / np.maximum(np.median(distances, axis=-1, keepdims=True), epsilon)
+        sim = np.exp(-alpha * distances**2)
+
+    elif method == 'inverse':
+        # Simple inverse distance weighting: sim = 1 / (distance + epsilon)
+        sim = 1.0 / (distances + epsilon)
+
+    elif method == 'inverse_pow':
+        # Inverse distance to a power: sim = 1 / (distance^power + epsilon)
+        # Higher power values make similarity more localized
+        sim = 1.0 / (distances ** power + epsilon)
+
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    # Normalize similarities so they sum to 1.0 (probability distribution)
+    return sim / sim.sum(axis=-1, keepdims=True)
+
 def match_player_to_cluster(player_stats, year, pos):
     """
     Match a player to their closest cluster based on statistical similarity in PCA space.
@@ -173,28 +282,18 @@ def match_player_cluster_to_label(year, pos, ids_or_id, rationale=False):
         match_player_cluster_to_label(2024, "F", [1,2], True) -> 
             [("3&D Wing", "High 3P%, good defense"), ("Stretch 4", "Floor spacing")]
     """
-    # Map position abbreviations to full names used in JSON structure
-    positions_dict = Config.POSITION_DICT
-    year_s = str(year)
-    pos_s  = str(pos)
-
-    # Load archetype labels from JSON file (contains all years/positions/clusters)
-    with open('Analysis/Clustering/Players/archetypeLables.json', 'r') as f:
-        data = json.load(f)
-
-    def _lookup(single_id):
-        """Helper function to lookup a single cluster ID"""
-        clu = data[year_s][pos_s][str(single_id)]
-        if rationale:
-            return clu['label'], clu['rationale']
-        return clu['label']
-
-    # Handle both iterable and scalar inputs
+    # Labels are parsed once and served from memory (see archetypeLabelLookup)
     # Return list for iterable inputs, single value for scalar inputs
-    if isinstance(ids_or_id, Iterable) and not isinstance(ids_or_id, (str, bytes)):
-        return [_lookup(i) for i in ids_or_id]
+    is_iterable = isinstance(ids_or_id, Iterable) and not isinstance(ids_or_id, (str, bytes))
+    ids = list(ids_or_id) if is_iterable else [ids_or_id]
+
+    if rationale:
+        labels, rationales = player_archetype_labels(year, pos, ids, rationale=True)
+        found = list(zip(labels.tolist(), rationales.tolist()))
     else:
-        return _lookup(ids_or_id)
+        found = player_archetype_labels(year, pos, ids).tolist()
+
+    return found if is_iterable else found[0]
 
 
 def get_only_plyr_features(player_stats : pd.Series):
@@ -295,31 +394,7 @@ def match_player_to_cluster_weights(player_stats,
     topK_df = df.head(min(k, len(df))).copy()
 
     # Transform distances to similarity weights using specified method
-    epsilon = 1e-6  # Small value to prevent division by zero
-    distances = topK_df['distance'].values
-    
-    if method == 'rbf':
-        # Radial Basis Function (Gaussian) kernel: sim = exp(-alpha * distance)
-        # Alpha controls kernel width - larger alpha = more localized similarity
-        if alpha is None:
-            # Auto-calculate alpha based on median distance
-            alpha = 1.0 / max(topK_df['distance'].median(), epsilon)
-        sim = np.exp(-alpha * distances**2)
-        
-    elif method == 'inverse':
-        # Simple inverse distance weighting: sim = 1 / (distance + epsilon)
-        sim = 1.0 / (distances + epsilon)
-        
-    elif method == 'inverse_pow':
-        # Inverse distance to a power: sim = 1 / (distance^power + epsilon)
-        # Higher power values make similarity more localized
-        sim = 1.0 / (distances ** power + epsilon)
-        
-    else:
-        raise ValueError(f"Unknown method: {method}")
-    
-    # Normalize similarities so they sum to 1.0 (probability distribution)
-    weights = sim / sim.sum()
+    weights = similarity_weights(topK_df['distance'].values, method=method, alpha=alpha, power=power)
 
     # Return dictionary mapping cluster IDs to their similarity weights
     return dict(zip(topK_df['cluster_id'].astype(int), weights))
\ No newline at end of file
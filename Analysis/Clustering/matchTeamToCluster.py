@@ -1,11 +1,17 @@
 import json
 import pandas as pd
 import numpy as np
+from Analysis.SyntheticRosters.aggregateRosterStats import aggregate_team_stats_from_players_df
+from Analysis.Clustering.archetypeLabelLookup import team_archetype_labels
 
 scaling_path = lambda year: f'Analysis/Clustering/Teams/{year}/PCA/params.json'
 profiles_path = lambda year: f'Analysis/Clustering/Teams/{year}/KClustering/profiles.csv'
 rot_path = lambda year: f'Analysis/Clustering/Teams/{year}/PCA/rotation.json'
 
+# Team clustering features in the order the PCA models were fit on
+TEAM_FEATURE_COLS = ['team_adjoe', 'team_adjde', 'team_stltov_ratio', 'team_oreb_per100',
+                     'team_dreb_per100', 'team_threeRate', 'team_ftr', 'team_eFG']
+
 def scale_center_vector_data(team_stats, year, profiles = None):
     if profiles is None:
         profiles = pd.read_csv(profiles_path(year), index_col=False)
@@ -30,31 +36,36 @@ def scale_center_vector_data(team_stats, year, profiles = None):
 
     return scaled_vec, centroids
 
-def project_to_pca(df_raw, year):
+def load_team_pca_model(year):
     """
-    Project new data into an existing PCA space defined by an R prcomp object.
-    Assumes df_raw is a pandas DataFrame of raw stats matching columns used to fit pca_model.
-    pca_model should have attributes 'center', 'scale', and 'rotation' from prcomp.
+    Load the center, scale and rotation arrays of the team PCA model for a year.
+
+    Returns:
+        tuple: (center, scale, rotation) numpy arrays, rotation is (n_features, n_pcs)
     """
-    # Load PCA parameters (center & scale) from JSON
-    param_path = scaling_path(year)
-    with open(param_path, 'r') as f:
+    with open(scaling_path(year), 'r') as f:
         params = json.load(f)
-    center = pd.Series(params['center'])
-    scale  = pd.Series(params['scale'])
+    center = np.array(params['center'])
+    scale  = np.array(params['scale'])
 
-    # Load rotation matrix from JSON
     with open(rot_path(year), 'r') as f:
         rot_dict = json.load(f)
-    # rot_dict is a mapping from feature name to PC loadings
-    # Convert list of dicts into DataFrame, drop feature names
     rotation_df = pd.DataFrame(rot_dict)
     if 'feature' in rotation_df.columns:
         rotation_df = rotation_df.drop(columns=['feature'])
-    # Ensure PC columns are in numeric order
     pc_cols = sorted([c for c in rotation_df.columns if c.startswith('PC')],
                      key=lambda x: int(x.replace('PC', '')))
-    rotation = rotation_df[pc_cols].values
+    return center, scale, rotation_df[pc_cols].values
+
+def project_to_pca(df_raw, year):
+    """
+    Project new data into an existing PCA space defined by an R prcomp object.
+    Assumes df_raw is a pandas DataFrame of raw stats matching columns used to fit pca_model.
+    pca_model should have attributes 'center', 'scale', and 'rotation' from prcomp.
+    """
+    center, scale, rotation = load_team_pca_model(year)
+    center = pd.Series(center)
+    scale  = pd.Series(scale)
     
     # Reorder columns to match PCA feature order
     df = df_raw
@@ -71,6 +82,63 @@ def project_to_pca(df_raw, year):
     ret = pd.Series(projected, index=pc_names)
     return ret
 
+def team_cluster_distances(team_matrix, year):
+    """
+    Euclidean distance from many teams to every team cluster centroid.
+
+    Args:
+        team_matrix (np.ndarray): (n_teams, n_features) raw team stats in TEAM_FEATURE_COLS order
+        year (int): Season year for cluster model selection
+
+    Returns:
+        tuple: (cluster_ids, distances) - distances is (n_teams, n_clusters), columns
+            aligned with cluster_ids
+    """
+    profiles = pd.read_csv(profiles_path(year), index_col=False)
+    pc_columns = [col for col in profiles.columns if col.startswith('PC')]
+    centroids = profiles[pc_columns].astype(float).values
+
+    center, scale, rotation = load_team_pca_model(year)
+    projected = ((np.asarray(team_matrix, dtype=float) - center) / scale) @ rotation
+    dists = np.linalg.norm(projected[:, None, :] - centroids[None, :, :], axis=2)
+    return profiles['ID'].astype(int).values, dists
+
+def get_all_team_stats(conn, start_year, end_year_exclude):
+    """
+    Aggregate team-level clustering features for every team-season in a range of seasons.
+
+    Uses the same player-to-team aggregation as the synthetic rosters so the team-seasons
+    are placed in the cluster space exactly like a benchmark team would be.
+
+    Returns:
+        pd.DataFrame: team_name, season_year + TEAM_FEATURE_COLS
+    """
+    players_df = pd.read_sql("""
+        SELECT
+            ps.team_name,
+            ps.season_year,
+            ps.FGA,
+            ps.FGM,
+            ps.FTA,
+            ps.threeM AS P3M,
+            ps.threeA AS P3A,
+            ps.adjoe,
+            ps.adrtg AS adjde,
+            ps.TOV,
+            ps.STL,
+            ps.OREB,
+            ps.DREB
+        FROM Player_Seasons ps
+        WHERE ps.season_year >= ? AND ps.season_year < ?
+        """, conn, params=(start_year, end_year_exclude))
+
+    rows = []
+    for (team_name, season_year), team_players_df in players_df.groupby(['team_name', 'season_year']):
+        team_stats = aggregate_team_stats_from_players_df(team_players_df)
+        rows.append({'team_name': team_name, 'season_year': season_year, **team_stats})
+
+    return pd.DataFrame(rows, columns=['team_name', 'season_year'] + TEAM_FEATURE_COLS)
+
 def get_centroid(year):
     profiles = pd.read_csv(profiles_path(year), index_col=False)    
     pc_columns = [col for col in profiles.columns if col.startswith('PC')]
@@ -105,20 +173,35 @@ def match_team_cluster_to_label(year, ids_or_id, rationale=False):
     If ids_or_id is a list/tuple, returns a list of labels (or (label, rationale) tuples).
     Otherwise returns a single label (or tuple).
     """
-    # load lookup once
-    with open('Analysis/Clustering/Teams/archetypeLabels.json') as f:
-        data = json.load(f)
-
-    def _lookup(single_id):
-        single_id = int(single_id)
-        year_s, id_s = str(year), str(single_id)
-        clu = data[year_s][id_s]
-        return (clu['label'], clu['rationale']) if rationale else clu['label']
-
-    if isinstance(ids_or_id, (list, tuple)):
-        return [_lookup(i) for i in ids_or_id]
+    # labels are parsed once and served from memory (see archetypeLabelLookup)
+    is_list = isinstance(ids_or_id, (list, tuple))
+    ids = list(ids_or_id) if is_list else [ids_or_id]
+
+    if rationale:
+        labels, rationales = team_archetype_labels(year, ids, rationale=True)
+        found = list(zip(labels.tolist(), rationales.tolist()))
     else:
-        return _lookup(ids_or_id)
+        found = team_archetype_labels(year, ids).tolist()
+
+    return found if is_list else found[0]
+
+def team_similarity_weights(distances, alpha=1.5):
+    """
+    RBF kernel similarity of team-to-centroid distances, normalised to sum to 1.
+
+    Accepts a single vector of distances or a (n_teams, k) matrix (row-wise normalisation).
+    """
+    epsilon = 1e-6
+    distances = np.asarray(distances, dtype=float)
+    if alpha is None:
+        # Heuristic: inverse of median distance to keep weights well‑behaved
+        alpha = 1.0 / np.maximum(np.median(distances, axis=-1, keepdims=True), epsilon)
+
+    # RBF kernel similarity
+    sim = np.exp(-alpha * distances)
+
+    # Normalise so that the weights sum to 1
+    return sim / sim.sum(axis=-1, keepdims=True)
 
 def match_team_to_cluster_weights(team_stats, year, k = 1):
     team_stats_srs = pd.Series(team_stats)    
@@ -133,18 +216,7 @@ def match_team_to_cluster_weights(team_stats, year, k = 1):
         # labels.append(label)
 
     # ---- similarity transform ---------------------------------------------
-    epsilon = 1e-6
-    alpha = 1.5
-    if 'alpha' not in locals() or alpha is None:
-        print("Calculating alpha")
-        # Heuristic: inverse of median distance to keep weights well‑behaved
-        alpha = 1.0 / max(topK_df['distance'].median(), epsilon)
-
-    # RBF kernel similarity
-    sim = np.exp(-alpha * topK_df['distance'].values)
-
-    # Normalise so that the weights sum to 1
-    weights = sim / sim.sum()
+    weights = team_similarity_weights(topK_df['distance'].values)
     
     # Build and return dictionary
     return dict(zip(topK_df['cluster_id'].astype(int), weights))
\ No newline at end of file
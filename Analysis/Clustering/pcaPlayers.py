@@ -2,22 +2,26 @@ import numpy as np
 import pandas as pd
 import json
 
-def project_to_pca(df_raw, role, year):
+# Lambda functions to generate file paths for the PCA artifacts by year and role
+params_path = lambda year, role : f"Analysis/Clustering/Players/{year}/PCA/pca_params_{role}.json"
+rotation_path = lambda year, role : f"Analysis/Clustering/Players/{year}/PCA/pca_rotation_{role}.json"
+
+def load_pca_model(role, year):
     """
-    Project new data into an existing PCA space defined by an R prcomp object.
-    Assumes df_raw is a pandas DataFrame of raw stats matching columns used to fit pca_model.
-    pca_model should have attributes 'center', 'scale', and 'rotation' from prcomp.
+    Load the center, scale and rotation arrays of an R prcomp model saved as JSON.
+
+    Returns:
+        tuple: (center, scale, rotation) numpy arrays. rotation is (n_features, n_pcs)
+            with the PC columns in numeric order.
     """
     # Load PCA parameters (center & scale) from JSON
-    param_path = f"Analysis/Clustering/Players/{year}/PCA/pca_params_{role}.json"
-    with open(param_path, 'r') as f:
+    with open(params_path(year, role), 'r') as f:
         params = json.load(f)
     center = np.array(params['center'])
     scale  = np.array(params['scale'])
 
     # Load rotation matrix from JSON
-    rot_path = f"Analysis/Clustering/Players/{year}/PCA/pca_rotation_{role}.json"
-    with open(rot_path, 'r') as f:
+    with open(rotation_path(year, role), 'r') as f:
         rot_dict = json.load(f)
     # rot_dict is a mapping from feature name to PC loadings
     # Convert list of dicts into DataFrame, drop feature names
@@ -28,7 +32,17 @@ def project_to_pca(df_raw, role, year):
     pc_cols = sorted([c for c in rotation_df.columns if c.startswith('PC')],
                      key=lambda x: int(x.replace('PC', '')))
     rotation = rotation_df[pc_cols].values
-    
+
+    return center, scale, rotation
+
+def project_to_pca(df_raw, role, year):
+    """
+    Project new data into an existing PCA space defined by an R prcomp object.
+    Assumes df_raw is a pandas DataFrame of raw stats matching columns used to fit pca_model.
+    pca_model should have attributes 'center', 'scale', and 'rotation' from prcomp.
+    """
+    center, scale, rotation = load_pca_model(role, year)
+
     # Prepare data
     df = df_raw.to_frame().T.copy()
     # center and scale
@@ -38,3 +52,19 @@ def project_to_pca(df_raw, role, year):
     projected = np.dot(df.values, rotation)
     pc_names = [f'PC{i+1}' for i in range(rotation.shape[1])]
     return pd.DataFrame(projected, index=df.index, columns=pc_names)
+
+def project_matrix_to_pca(X, role, year):
+    """
+    Project many players at once into an existing PCA space.
+
+    Args:
+        X (np.ndarray): (n_players, n_features) raw stats in the order the PCA was fit on
+        role (str): Player position ("G", "F", or "C")
+        year (int): Season year of the PCA model
+
+    Returns:
+        np.ndarray: (n_players, n_pcs) PCA coordinates
+    """
+    center, scale, rotation = load_pca_model(role, year)
+    X = np.asarray(X, dtype=float)
+    return ((X - center) / scale) @ rotation
@@ -0,0 +1,117 @@
+"""
+Player Comparables Module
+
+Answers "which players look most like this one" with a nearest-neighbor search in the
+per-position PCA spaces used for clustering.
+
+For a (model year, position) every player-season in the database is projected into that
+model's PCA space once and stored in a KD-tree; queries then take well under a millisecond.
+Indexes are kept in memory for the life of the process.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from Analysis.Clustering import matchPlayerToCluster as plyr_clu
+from Analysis.Clustering.pcaPlayers import project_matrix_to_pca
+from Analysis.config import Config
+
+_INDEXES = {}
+
+class ComparablesIndex:
+    """
+    KD-tree over all player-seasons of one position in one model year's PCA space.
+
+    Attributes:
+        model_year (int): PCA model the players were projected with
+        pos (str): Player position
+        meta (pd.DataFrame): player_name, player_id, team_name, season_year of each tree point
+        coords (np.ndarray): (n, n_pcs) PCA coordinates
+    """
+
+    def __init__(self, model_year, pos, players_df):
+        players_df = players_df.dropna(subset=plyr_clu.PLAYER_FEATURE_COLS)
+        self.model_year = model_year
+        self.pos = pos
+        self.meta = players_df[['player_name', 'player_id', 'team_name', 'season_year']].reset_index(drop=True)
+        self.coords = project_matrix_to_pca(players_df[plyr_clu.PLAYER_FEATURE_COLS].values, pos, model_year)
+        self.tree = cKDTree(self.coords)
+
+    def query(self, player_stats, k=10, exclude_player_id=None, before_season=None):
+        """
+        Nearest player-seasons to a raw stat profile.
+
+        Args:
+            player_stats (pd.Series): Raw features (PLAYER_FEATURE_COLS, metadata ignored)
+            k (int): Number of comparables to return
+            exclude_player_id (int, optional): Drop every season of this player
+            before_season (int, optional): Only keep seasons strictly before this one
+
+        Returns:
+            pd.DataFrame: Comparables nearest first, with a 'distance' column (PCA units)
+
+        Raises:
+            ValueError: If a feature of the profile is missing (the index leaves such seasons out too)
+        """
+        features = player_stats[plyr_clu.PLAYER_FEATURE_COLS].astype(float)
+        missing = features.index[~np.isfinite(features.values)]
+        if len(missing):
+            raise ValueError(f"Cannot find comparables for a profile with missing features: {', '.join(missing)}")
+        vec = project_matrix_to_pca(features.values[None, :], self.pos, self.model_year)[0]
+
+        # Over-fetch until enough neighbors survive the filters
+        n_query = k
+        while True:
+            n_query = min(n_query, len(self.meta))
+            dists, idx = self.tree.query(vec, k=n_query)
+            dists, idx = np.atleast_1d(dists), np.atleast_1d(idx)
+            keep = np.ones(len(idx), dtype=bool)
+            if exclude_player_id is not None:
+                keep &= self.meta['player_id'].values[idx] != exclude_player_id
+            if before_season is not None:
+                keep &= self.meta['season_year'].values[idx] < before_season
+            if keep.sum() >= k or n_query == len(self.meta):
+                break
+            n_query *= 4
+
+        idx, dists = idx[keep][:k], dists[keep][:k]
+        result = self.meta.iloc[idx].reset_index(drop=True)
+        result['distance'] = dists
+        return result
+
+    def __len__(self):
+        return len(self.meta)
+
+def get_comparables_index(conn, pos, model_year=Config.END_YEAR_INCLUDE):
+    """Build (once per process) the comparables index of a position and model year."""
+    key = (int(model_year), pos)
+    if key not in _INDEXES:
+        players_df = plyr_clu.get_all_player_stats(conn,
+                                                   Config.START_YEAR - Config.LOOKBACK_YEAR,
+                                                   Config.END_YEAR_EXCLUDE)
+        _INDEXES[key] = ComparablesIndex(model_year, pos, players_df[players_df['position'] == pos])
+    return _INDEXES[key]
+
+def find_comparables(conn, player_id, season_year, k=10, model_year=Config.END_YEAR_INCLUDE, past_only=False):
+    """
+    Top-k most similar player-seasons to a player's season, across all seasons.
+
+    Args:
+        conn: Database connection object
+        player_id (int): Player to find comparables for
+        season_year (int): Season of that player's profile
+        k (int): Number of comparables to return
+        model_year (int): PCA space to search in (default: latest model)
+        past_only (bool): Only return seasons before season_year
+
+    Returns:
+        pd.DataFrame: player_name, player_id, team_name, season_year, distance (nearest first).
+            The player's own seasons are excluded.
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    player_stats = plyr_clu.get_player_stats(player_id, season_year, conn)
+    index = get_comparables_index(conn, player_stats['position'], model_year)
+    return index.query(player_stats,
+                       k=k,
+                       exclude_player_id=player_id,
+                       before_season=season_year if past_only else None)
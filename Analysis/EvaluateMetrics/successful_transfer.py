@@ -11,29 +11,59 @@ IMPACT_WEIGHTS = {
 FLIPPED_STATS_LST = ['tov_percent', 'adjde']
 THRESHOLD = -0.05
 
-def successful_transfer(bmark_plyr, plyr_stats: pd.Series, debug: bool = False) -> tuple[float, bool, float]:
+def successful_transfer_cohort(plyr_stats, bmark_centers, bmark_sigmas, columns) -> tuple[np.ndarray, np.ndarray]:
     """
-    Same aggregation as `successful_transfer`, but pulls the benchmark center and
-    unweighted sigma from a benchmark player object. Uses the **successful_transfer**
-    benchmark pack exposed by `InitBenchmarkPlayer`:
-      - scalar = bmark_plyr.successful_transfer_scalar()
-      - bmark_stats = bmark_plyr.successful_transfer_bmark_srs()
-    Returns (score, is_successful, ess) with ess=0.0 here.
+    Vectorized `successful_transfer` for a whole cohort of transfers sharing one stat layout.
+
+    Each row is scored exactly like the single-player version: per-stat z of the realized stat
+    against its benchmark center (zero / missing sigmas count as 1), flipped where lower is
+    better, then the IMPACT_WEIGHTS-weighted mean over the columns.
+
+    Args:
+        plyr_stats (array-like): (n, k) realized next-season stats, one row per transfer
+        bmark_centers (array-like): (n, k) unscaled benchmark centers (or (k,) shared by every row)
+        bmark_sigmas (array-like): (n, k) benchmark sigmas (or (k,) shared by every row)
+        columns (list): The k stat names, in column order
+
+    Returns:
+        tuple: (scores (n,), is_successful (n,) bool); a missing realized stat gives a NaN
+            score, which is never successful
+    """
+    columns = list(columns)
+    plyr_stats = np.atleast_2d(np.asarray(plyr_stats, dtype=float))
+    if not columns:
+        return np.zeros(len(plyr_stats)), np.zeros(len(plyr_stats), dtype=bool)
+
+    sigmas = np.array(np.broadcast_to(np.asarray(bmark_sigmas, dtype=float), plyr_stats.shape))
+    sigmas[(sigmas == 0.0) | np.isnan(sigmas)] = 1.0
+    z = (plyr_stats - np.asarray(bmark_centers, dtype=float)) / sigmas
+
+    # Flip where lower is better, then the impact-weighted mean
+    signs = np.array([-1.0 if col in FLIPPED_STATS_LST else 1.0 for col in columns])
+    weights = np.array([IMPACT_WEIGHTS.get(col, 1.0) for col in columns])
+    scores = (z * signs * weights).sum(axis=1) / weights.sum()
+
+    return scores, scores > THRESHOLD
+
+def successful_transfer_inputs(bmark_plyr, plyr_stats_index) -> tuple[list, pd.Series, pd.Series]:
+    """
+    Columns, benchmark centers and sigmas `successful_transfer` scores a player on.
+
+    Args:
+        bmark_plyr (InitBenchmarkPlayer): Benchmark of the scenario
+        plyr_stats_index (iterable): Stat names available for the player
+
+    Returns:
+        tuple: (stats_columns, centers, sigmas) with centers and sigmas indexed by stats_columns,
+            ready to stack into `successful_transfer_cohort` rows
     """
     # Extract scaler and benchmark stats from the benchmark player object
     scalar = bmark_plyr.successful_transfer_scalar()
     bmark_stats_unscaled = bmark_plyr.successful_transfer_bmark_unscaled()
 
-    if debug:
-        print("Successful Transfer Benchmark Raw:")
-        print(bmark_stats_unscaled)
-
-        print("Player Success Stats")
-        print(plyr_stats)
-
     # 1) Choose columns (intersection) and stable order (prefer scaler's fit order)
     bm_cols = set(bmark_stats_unscaled.index)
-    pl_cols = set(plyr_stats.index)
+    pl_cols = set(plyr_stats_index)
     if hasattr(scalar, 'feature_names_in_') and getattr(scalar, 'feature_names_in_', None) is not None:
         fit_order = list(scalar.feature_names_in_)
         stats_columns = [c for c in fit_order if c in bm_cols and c in pl_cols]
@@ -47,39 +77,42 @@ def successful_transfer(bmark_plyr, plyr_stats: pd.Series, debug: bool = False)
             sig_arr = np.repeat(sig_arr.item(), len(stats_columns))
         sigmas = pd.Series(sig_arr[:len(stats_columns)], index=stats_columns, dtype=float)
 
-    if not stats_columns:
-        return (0.0, False, 0.0)
+    return stats_columns, bmark_stats_unscaled[stats_columns].astype(float), sigmas
 
-    # 3) Per-stat z using scaler sigma
-    diffs = (plyr_stats[stats_columns].astype(float) - bmark_stats_unscaled[stats_columns].astype(float))
-    sigmas.replace({0.0: 1.0}, inplace=True)
-    sigmas.fillna(1.0, inplace=True)
-    z_series = diffs / sigmas
+def successful_transfer(bmark_plyr, plyr_stats: pd.Series, debug: bool = False) -> tuple[float, bool]:
+    """
+    Score one transfer's realized season against the benchmark pulled from a benchmark player
+    object (the **successful_transfer** benchmark pack exposed by `InitBenchmarkPlayer`):
+      - scalar = bmark_plyr.successful_transfer_scalar()
+      - bmark_stats = bmark_plyr.successful_transfer_bmark_srs()
+    Returns (score, is_successful); see `successful_transfer_cohort` for many transfers at once.
+    """
+    stats_columns, bmark_centers, sigmas = successful_transfer_inputs(bmark_plyr, plyr_stats.index)
 
-    # 4) Flip where lower is better
-    for col in stats_columns:
-        if col in FLIPPED_STATS_LST:
-            z_series[col] = -z_series[col]
+    if debug:
+        print("Successful Transfer Benchmark Raw:")
+        print(bmark_plyr.successful_transfer_bmark_unscaled())
 
-    # 5) Aggregate exactly like successful_transfer
-    score_sum = 0.0
-    weight_sum = 0.0
-    for col in stats_columns:
-        weight = IMPACT_WEIGHTS.get(col, 1.0)
-        score_sum += float(z_series[col]) * weight
-        weight_sum += weight
+        print("Player Success Stats")
+        print(plyr_stats)
+
+    if not stats_columns:
+        return (0.0, False)
 
-    score = score_sum / weight_sum if weight_sum else 0.0
+    scores, is_successful = successful_transfer_cohort(plyr_stats[stats_columns].astype(float).values,
+                                                       bmark_centers.values,
+                                                       sigmas.values,
+                                                       stats_columns)
 
     if debug:
+        sigmas = sigmas.replace({0.0: 1.0}).fillna(1.0)
+        z_series = (plyr_stats[stats_columns].astype(float) - bmark_centers) / sigmas
         for col in stats_columns:
-            dev = float(z_series[col])
+            dev = -float(z_series[col]) if col in FLIPPED_STATS_LST else float(z_series[col])
             if abs(dev) >= 0.75:
                 print(f"{col} deviation: {dev:.2f} SDs from mean")
 
-    
-    is_successful = score > THRESHOLD
-    return (score, is_successful)
+    return (float(scores[0]), bool(is_successful[0]))
 
 
 def testing():
@@ -0,0 +1,91 @@
+"""
+Exact top-k candidate retrieval in the standardized fit-stat space.
+
+Every benchmark standardizes candidates with its own fitted scaler, so the search space changes
+per query and a static tree over pre-normalized vectors would not return exact neighbors.
+The index instead keeps the raw candidate stats as a contiguous float32 matrix and scans it in
+blocks: each block is standardized with the query's scaler, scored by cosine similarity and
+reduced to its k best rows, so memory stays bounded by the block size whatever the pool size.
+Returned scores are float64 scores of the float32-stored stats (within ~1e-7 of the full
+computation); rescore the returned rows from the source frame when exact values matter.
+"""
+
+import numpy as np
+from Analysis.Helpers.similarity import cosine_similarity_to_vector
+
+class CandidateIndex:
+    """
+    Candidate pool prepared for repeated top-k fit queries.
+
+    Rows with any missing stat (which score -1 in the full computation) are left out.
+
+    Attributes:
+        columns (list): Stat columns, in the order of the benchmark vector
+        positions (np.ndarray): Row position in the source frame of each indexed candidate
+        stats (np.ndarray): (n, len(columns)) float32 stat matrix
+    """
+
+    def __init__(self, stats, columns, positions, block_size=65536):
+        self.columns = list(columns)
+        self.positions = np.asarray(positions)
+        self.stats = np.ascontiguousarray(stats, dtype=np.float32)
+        self.block_size = block_size
+
+    @classmethod
+    def from_frame(cls, players_df, columns, block_size=65536):
+        """Index the candidates of a DataFrame (any null in a row excludes it, as in fit scoring)."""
+        valid = ~players_df.isnull().any(axis=1).values
+        stats = players_df.loc[valid, list(columns)].to_numpy(dtype=float)
+        return cls(stats, columns, np.flatnonzero(valid), block_size)
+
+    def top_k(self, scaler, benchmark_vals, k=10):
+        """
+        The k candidates most similar to a benchmark.
+
+        Args:
+            scaler (StandardScaler): The benchmark's fitted scaler (over self.columns)
+            benchmark_vals (np.ndarray): Scaled benchmark vector
+            k (int): Number of candidates to return
+
+        Returns:
+            tuple: (positions, scores) best first; positions index the source frame rows.
+                Candidates are selected on float32 scores, so among candidates tied with the
+                k-th best to within float32 rounding the selection may differ from a float64
+                full ranking.
+        """
+        k = min(k, len(self.stats))
+        if k <= 0:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        means = scaler.mean_.astype(np.float32)
+        inv_scale = (1.0 / scaler.scale_).astype(np.float32)
+        bmark = np.asarray(benchmark_vals, dtype=np.float32).ravel()
+        bmark_unit = bmark / (np.linalg.norm(bmark) or 1.0)
+
+        best_rows = np.empty(0, dtype=int)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.stats), self.block_size):
+            scaled = (self.stats[start:start + self.block_size] - means) * inv_scale
+            norms = np.linalg.norm(scaled, axis=1)
+            norms[norms == 0] = 1.0
+            scores = (scaled @ bmark_unit) / norms
+
+            # Keep only the block's k best before merging with the running best
+            if len(scores) > k:
+                keep = np.argpartition(-scores, k - 1)[:k]
+            else:
+                keep = np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, keep + start])
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        # float64 scores of the selected candidates
+        scaled = (self.stats[best_rows].astype(float) - scaler.mean_) / scaler.scale_
+        scores64 = cosine_similarity_to_vector(scaled, np.asarray(benchmark_vals, dtype=float))
+        order = np.argsort(-scores64, kind='stable')
+        return self.positions[best_rows[order]], scores64[order]
+
+    def __len__(self):
+        return len(self.stats)
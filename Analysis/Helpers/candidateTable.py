@@ -0,0 +1,123 @@
+"""
+Compact candidate tables for the scoring path.
+
+Candidate pools are cached for every season and position, so they are stored compactly:
+stats as one contiguous float64 matrix and player/team names as int32 codes into dictionaries
+shared by every table of the process. Stats keep the exact database values, so every scoring
+path gives the same results as on the source rows; names are only decoded back to strings for
+output frames. Approximate float32 copies are left to consumers that can tolerate them (the
+top-k CandidateIndex).
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+
+class StringDictionary:
+    """Process-wide string <-> int32 code mapping (code -1 stands for a null)."""
+
+    def __init__(self):
+        self._codes = {}
+        self._strings = []
+        self._lock = threading.Lock()
+
+    def encode(self, values):
+        """Codes of an array of strings, adding unseen strings to the dictionary."""
+        codes = np.empty(len(values), dtype=np.int32)
+        with self._lock:
+            for i, value in enumerate(values):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    codes[i] = -1
+                    continue
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._strings)
+                    self._codes[value] = code
+                    self._strings.append(value)
+                codes[i] = code
+        return codes
+
+    def decode(self, codes):
+        """Object array of the strings of codes (None for -1)."""
+        codes = np.asarray(codes)
+        with self._lock:
+            lookup = np.array(self._strings + [None], dtype=object)
+        return lookup[np.where(codes < 0, len(lookup) - 1, codes)]
+
+    def __len__(self):
+        return len(self._strings)
+
+PLAYER_NAMES = StringDictionary()
+TEAM_NAMES = StringDictionary()
+
+class CandidateTable:
+    """
+    Candidates with exact float64 stats and categorical metadata.
+
+    Attributes:
+        player_ids (np.ndarray): (n,) int64
+        season_years (np.ndarray): (n,) int16
+        name_codes, team_codes (np.ndarray): (n,) int32 codes into PLAYER_NAMES / TEAM_NAMES
+        columns (list): Stat column names
+        stats (np.ndarray): (n, len(columns)) contiguous float64 stats
+    """
+
+    def __init__(self, player_ids, season_years, name_codes, team_codes, columns, stats):
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.season_years = np.asarray(season_years, dtype=np.int16)
+        self.name_codes = np.asarray(name_codes, dtype=np.int32)
+        self.team_codes = np.asarray(team_codes, dtype=np.int32)
+        self.columns = list(columns)
+        self.stats = np.ascontiguousarray(stats, dtype=float)
+        self._col_pos = {col: i for i, col in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, df, columns, team_col='prev_team_name'):
+        """Build a table from a candidate DataFrame (player_name, player_id, season_year, team_col + stats)."""
+        return cls(df['player_id'].values,
+                   df['season_year'].values,
+                   PLAYER_NAMES.encode(df['player_name'].values),
+                   TEAM_NAMES.encode(df[team_col].values),
+                   columns,
+                   df[list(columns)].to_numpy(dtype=float))
+
+    def matrix(self, columns, rows=None):
+        """float64 copy of the stats of columns (optionally only rows), for computation."""
+        stats = self.stats if rows is None else self.stats[rows]
+        return stats[:, [self._col_pos[col] for col in columns]]
+
+    def player_names(self, rows=None):
+        return PLAYER_NAMES.decode(self.name_codes if rows is None else self.name_codes[rows])
+
+    def team_names(self, rows=None):
+        return TEAM_NAMES.decode(self.team_codes if rows is None else self.team_codes[rows])
+
+    def missing_metadata(self):
+        """Rows whose player or team name is null."""
+        return (self.name_codes < 0) | (self.team_codes < 0)
+
+    def first_occurrences(self):
+        """Mask keeping the first row of every player_id."""
+        _, first = np.unique(self.player_ids, return_index=True)
+        mask = np.zeros(len(self.player_ids), dtype=bool)
+        mask[first] = True
+        return mask
+
+    def frame(self, columns, team_col='prev_team_name'):
+        """Output DataFrame with decoded strings and float64 stats of columns."""
+        df = pd.DataFrame({
+            'player_name': self.player_names(),
+            'player_id': self.player_ids,
+            'season_year': self.season_years.astype(np.int64),
+            team_col: self.team_names(),
+        })
+        df[list(columns)] = self.matrix(columns)
+        return df
+
+    @property
+    def nbytes(self):
+        return (self.player_ids.nbytes + self.season_years.nbytes + self.name_codes.nbytes +
+                self.team_codes.nbytes + self.stats.nbytes)
+
+    def __len__(self):
+        return len(self.player_ids)
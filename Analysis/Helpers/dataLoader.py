@@ -1,6 +1,7 @@
 import pandas as pd
 from Analysis.Clustering.matchTeamToCluster import project_to_pca, get_centroid
 import numpy as np
+from Analysis.Helpers.queries import scenario_players_query
 
 
 def get_top_k_nearest_teams_in_clusters(cluster_numbers, season_year, connection, k_nearest_teams=25):
@@ -341,3 +342,26 @@ def get_transfers(connection, incoming_season_year, position, player_stats_fragm
     )
     
     return transfers_df
+
+def get_scenario_players(connection, player_seasons):
+    """
+    Prefetch the replaced player of many scenarios in one query.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+        player_seasons (iterable): (player_id, season_year) pairs
+
+    Returns:
+        pd.DataFrame: One row per found pair, indexed by (player_id, season_year), with the
+            columns of `single_player_query` for every position (first Player_Seasons row of a
+            pair, as the per-player queries return)
+    """
+    player_seasons = set((int(pid), int(season)) for pid, season in player_seasons)
+    seasons = sorted({season for _, season in player_seasons})
+    if not seasons:
+        return pd.DataFrame()
+
+    players_df = pd.read_sql(scenario_players_query(len(seasons)), connection, params=seasons)
+    players_df = players_df.drop_duplicates(['player_id', 'season_year'], keep='first')
+    players_df = players_df.set_index(['player_id', 'season_year'], drop=False)
+    return players_df[players_df.index.isin(list(player_seasons))]
@@ -0,0 +1,43 @@
+"""
+In-process cache for artifact files read on the hot path (CSV tables, JSON label maps).
+
+Each entry is keyed by the file path and the loader that parsed it, and is invalidated when
+the file's modification time or size changes, so regenerating an artifact is picked up
+without restarting the process.
+"""
+
+import os
+import threading
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+def load_cached(path, loader):
+    """
+    Return loader(path), parsing the file only when it changed since the last call.
+
+    Args:
+        path (str): File to load (relative paths are resolved against the working directory)
+        loader (callable): Function taking the path and returning the parsed structure
+
+    Returns:
+        The cached result of loader(path). Callers must treat it as read-only.
+    """
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (abs_path, loader)
+
+    entry = _CACHE.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+
+    value = loader(path)
+    with _LOCK:
+        _CACHE[key] = (stamp, value)
+    return value
+
+def clear_cache():
+    """Drop every cached file (used by benchmarks to measure cold runs)."""
+    with _LOCK:
+        _CACHE.clear()
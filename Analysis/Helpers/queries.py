@@ -59,6 +59,30 @@ def single_player_query(pos):
     WHERE ps.season_year = ? AND ps.player_id = ?
             """
 
+def _fragment_columns(fragment):
+    """Column names selected by a stat fragment ("ps.col," lines)."""
+    return [col.strip().split('.')[-1] for col in fragment.split(',') if col.strip()]
+
+def single_player_columns(pos):
+    """Columns of a `single_player_query(pos)` row, in order."""
+    return (['player_name', 'position', 'season_year', 'team_name'] +
+            _fragment_columns(gen_player_stats_query) + _fragment_columns(pos_stat_queries_dict[pos]))
+
+def scenario_players_query(n_seasons):
+    """
+    `single_player_query` rows of every player in n_seasons seasons at once, with the stat columns
+    of every position (select a position's columns with single_player_columns) and player_id.
+    """
+    all_pos_cols = dict.fromkeys(f"ps.{col}" for pos_query in pos_stat_queries_dict.values()
+                                 for col in _fragment_columns(pos_query))
+    all_pos_query = ",\n".join(list(all_pos_cols) + ["ps.player_id"])
+    seasons = ", ".join("?" * n_seasons)
+    return f"""
+    {stats_meta_query(all_pos_query)}
+    WHERE ps.season_year IN ({seasons})
+    ORDER BY ps.rowid
+            """
+
 transfer_query = """ 
 SELECT 
     p.player_name,
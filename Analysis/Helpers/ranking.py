@@ -0,0 +1,80 @@
+"""
+Partial-selection ranking helpers.
+
+Scoring functions often only need the best few candidates, a window of ranks or the rank of one
+candidate, which does not require sorting the whole pool. The helpers follow the order of a stable descending
+sort with NaN last (the order `sort_values(ascending=False, kind='stable')` produces).
+"""
+
+import numpy as np
+
+def _sort_keys(values, descending):
+    keys = np.asarray(values, dtype=float)
+    keys = -keys if descending else keys.copy()
+    keys[np.isnan(keys)] = np.inf  # NaN last
+    return keys
+
+def top_n_indices(values, n, descending=True):
+    """
+    Positions of the n best values, best first, via argpartition-style selection.
+
+    Args:
+        values (array-like): Scores
+        n (int): Number of positions to return
+        descending (bool): Best means largest
+
+    Returns:
+        np.ndarray: Positions, identical to the first n of a stable full sort
+    """
+    keys = _sort_keys(values, descending)
+    n = min(max(int(n), 0), len(keys))
+    if n == 0:
+        return np.empty(0, dtype=int)
+
+    if n < len(keys):
+        # Everything up to the n-th smallest key, ties included so the stable order is kept
+        threshold = np.partition(keys, n - 1)[n - 1]
+        candidates = np.flatnonzero(keys <= threshold)
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.lexsort((candidates, keys[candidates]))][:n]
+
+def ranked_slice(values, start, stop, descending=True):
+    """
+    Positions of the entries ranked start..stop-1, in rank order, without a full sort.
+
+    Args:
+        values (array-like): Scores
+        start (int): First rank (0-based, clipped to the array)
+        stop (int): Rank after the last one
+        descending (bool): Best means largest
+
+    Returns:
+        np.ndarray: Positions, identical to a stable full sort's [start:stop]
+    """
+    keys = _sort_keys(values, descending)
+    start, stop = max(int(start), 0), min(int(stop), len(keys))
+    if start >= stop:
+        return np.empty(0, dtype=int)
+
+    # Entries with keys between the start-th and the (stop-1)-th smallest are consecutive in the
+    # stable order, and `before` entries precede them
+    partitioned = np.partition(keys, [start, stop - 1])
+    low, high = partitioned[start], partitioned[stop - 1]
+    candidates = np.flatnonzero((keys >= low) & (keys <= high))
+    before = np.count_nonzero(keys < low)
+    ordered = candidates[np.lexsort((candidates, keys[candidates]))]
+    return ordered[start - before:stop - before]
+
+def rank_of(values, position, descending=True):
+    """
+    0-based rank of one entry without sorting (its row number after a stable full sort).
+
+    Args:
+        values (array-like): Scores
+        position (int): Position of the entry in values
+        descending (bool): Best means largest
+    """
+    keys = _sort_keys(values, descending)
+    key = keys[position]
+    return int(np.count_nonzero(keys < key) + np.count_nonzero(keys[:position] == key))
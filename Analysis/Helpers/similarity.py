@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics.pairwise import cosine_similarity
@@ -32,4 +33,54 @@ def get_player_similarity_score(
     
     # Compute cosine similarity
     score = float(cosine_similarity(scaled_player_vec, benchmark_vec)[0, 0])
-    return score
\ No newline at end of file
+    return score
+
+def get_players_similarity_scores(
+        players_df: pd.DataFrame,
+        scaler: StandardScaler,
+        columns: list,
+        benchmark_vals
+) -> np.ndarray:
+    """
+    Vectorized get_player_similarity_score for a whole block of players.
+
+    Scales every row with the fitted scaler at once and computes all cosine similarities
+    against the benchmark in a single normalized dot product.
+
+    Args:
+        players_df: One player per row (any row with a null value scores -1)
+        benchmark_vals: Can be either pd.Series or numpy array
+
+    Returns:
+        np.ndarray: Similarity score of each row, in row order
+    """
+    scores = np.full(len(players_df), -1.0)
+    valid = ~players_df.isnull().any(axis=1).values
+    if not valid.any():
+        return scores
+
+    scaled = scaler.transform(players_df.loc[valid, columns])
+    scores[valid] = cosine_similarity_to_vector(scaled, benchmark_vals, columns)
+    return scores
+
+
+def cosine_similarity_to_vector(scaled, benchmark_vals, columns=None) -> np.ndarray:
+    """
+    Cosine similarity of every row of an already-scaled matrix with one benchmark vector.
+
+    Zero-norm vectors get similarity 0, as in sklearn's cosine_similarity.
+
+    Args:
+        scaled: (n, m) array of scaled stats
+        benchmark_vals: Can be either pd.Series (indexed by columns) or numpy array
+    """
+    if isinstance(benchmark_vals, pd.Series):
+        benchmark_vec = benchmark_vals[columns].values.astype(float)
+    else:
+        benchmark_vec = np.asarray(benchmark_vals, dtype=float).ravel()
+
+    row_norms = np.linalg.norm(scaled, axis=1)
+    row_norms[row_norms == 0] = 1.0
+    bmark_norm = np.linalg.norm(benchmark_vec) or 1.0
+
+    return (scaled @ benchmark_vec) / (row_norms * bmark_norm)
@@ -0,0 +1,104 @@
+"""
+Season-wide transfer pool cache.
+
+The transfer candidates of a season only depend on (season, position, minutes cutoff), never on
+the team or the replaced player, so they are loaded once per key with the union of every stat
+fragment that scores them (fit and VOCBP) and handed out as column slices.
+
+The cache assumes one database per process (keys do not include the connection); call
+`clear_transfer_pools` after the underlying tables change.
+"""
+
+import threading
+import numpy as np
+from Analysis.Helpers.candidateIndex import CandidateIndex
+from Analysis.Helpers.candidateTable import CandidateTable
+from Analysis.Helpers.dataLoader import get_transfers
+
+META_COLS = ['player_name', 'player_id', 'season_year', 'prev_team_name']
+
+_POOLS = {}
+_LOCK = threading.Lock()
+
+def fragment_columns(connection, player_stats_fragment):
+    """Output column names of a stat SQL fragment (runs an empty query)."""
+    cursor = connection.execute(f"SELECT {player_stats_fragment} FROM Player_Seasons AS ps LIMIT 0")
+    return [d[0] for d in cursor.description]
+
+class TransferPool:
+    """
+    All transfer candidates of one (incoming season, position, minutes cutoff).
+
+    Attributes:
+        table (CandidateTable): Exact float64 stats (union of the fragments' columns) and
+            categorical player/previous-team names
+        columns (list): Stat columns of the table
+    """
+
+    def __init__(self, connection, incoming_season_year, position, fragments, min_minutes_cutoff=80):
+        self.fragment_cols = {fragment: fragment_columns(connection, fragment) for fragment in fragments}
+
+        # One self-join with the union of every fragment; comments in a fragment end at a newline
+        union_fragment = "\n,".join(fragment.rstrip() for fragment in fragments)
+        transfers_df = get_transfers(connection, incoming_season_year, position, union_fragment, min_minutes_cutoff)
+
+        self.columns = [col for col in transfers_df.columns if col not in META_COLS]
+        self.table = CandidateTable.from_frame(transfers_df, self.columns)
+        self._indexes = {}
+
+    def matrix(self, columns, rows=None):
+        """float64 stat matrix restricted to columns, in that order (optionally only rows)."""
+        return self.table.matrix(columns, rows)
+
+    def frame(self, player_stats_fragment):
+        """
+        Candidates as `get_transfers` would return them for a single fragment.
+
+        Returns:
+            pd.DataFrame: New frame (safe to modify) with the metadata and that fragment's columns
+        """
+        return self.table.frame(self.fragment_cols[player_stats_fragment])
+
+    def candidate_index(self, player_stats_fragment, columns):
+        """
+        Top-k CandidateIndex over the pool (built once per fragment and column order).
+
+        Candidates with a null in the fragment's frame are excluded, and index positions are
+        rows of self.table / self.frame(player_stats_fragment).
+        """
+        key = (player_stats_fragment, tuple(columns))
+        if key not in self._indexes:
+            fragment_stats = self.table.matrix(self.fragment_cols[player_stats_fragment])
+            valid = ~(self.table.missing_metadata() | np.isnan(fragment_stats).any(axis=1))
+            self._indexes[key] = CandidateIndex(self.table.matrix(columns, rows=valid), columns, np.flatnonzero(valid))
+        return self._indexes[key]
+
+    def __len__(self):
+        return len(self.table)
+
+def get_transfer_pool(connection, incoming_season_year, position, fragments, min_minutes_cutoff=80):
+    """
+    Load (once per process) the transfer pool of a season and position.
+
+    Args:
+        connection: Database connection
+        incoming_season_year (int): The season year to check for transfers
+        position (str): Player position to filter by
+        fragments (tuple): Every stat SQL fragment the pool must serve
+        min_minutes_cutoff (int): Minimum minutes played threshold (default: 80)
+
+    Returns:
+        TransferPool: Shared pool; callers must not modify its arrays
+    """
+    key = (int(incoming_season_year), position, min_minutes_cutoff, tuple(fragments))
+    pool = _POOLS.get(key)
+    if pool is None:
+        pool = TransferPool(connection, incoming_season_year, position, fragments, min_minutes_cutoff)
+        with _LOCK:
+            _POOLS[key] = pool
+    return pool
+
+def clear_transfer_pools():
+    """Drop every cached transfer pool."""
+    with _LOCK:
+        _POOLS.clear()
@@ -0,0 +1,445 @@
+"""
+End-to-end load test of the scoring API (Analysis/api.py).
+
+Boots `uvicorn Analysis.api:app` against a local SQLite database (ROSTERIQ_DB_PATH, no Turso),
+replays a seeded mix of scenario requests built from the scenarios CSV at one or more
+concurrency levels (on a freshly booted server each, unless --keep-server) and reports, per level:
+
+    - throughput (requests/s) and error rate, overall and per endpoint
+    - p50 / p95 / p99 / max latency, overall and per endpoint
+    - resident memory (end and peak) of every server process, sampled during the run
+
+The request mix follows how the app is used: /compute on scenarios drawn with a Zipf skew (a few
+teams are looked at far more often than the rest, so repeats hit the scenario cache),
+/compute/rerank with new weights on scenarios computed earlier, and /comparables for the
+replaced players. Clients run closed-loop: each of the --concurrency clients sends its next
+request as soon as the previous one returns.
+
+The server runs in the current directory (the clustering artifacts are read relative to it), so
+run the tool from the repository root or from a generated tree (see syntheticDatabase). Server
+memory is read from /proc and is only reported on Linux when the tool boots the server itself.
+
+Usage:
+    python -m Analysis.Performance.loadTest --concurrency 1 4 16 --requests 300
+    python -m Analysis.Performance.loadTest --workers 4 --duration 60 --json load.json
+    python -m Analysis.Performance.loadTest --url http://127.0.0.1:8000   # already running server
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+SCENARIOS_PATH = 'Analysis/Helpers/CSV/availTransferTeams.csv'
+DEFAULT_MIX = {'compute': 0.55, 'rerank': 0.30, 'comparables': 0.15}
+ENDPOINTS = {'compute': '/compute', 'rerank': '/compute/rerank', 'comparables': '/comparables'}
+FS_WEIGHTS = (0.4, 0.5, 0.6, 0.7, 0.8)
+TOP_N = 25
+ZIPF_EXPONENT = 1.1
+PERCENTILES = (50, 95, 99)
+
+def parse_mix(text):
+    """Parse "compute=0.6,rerank=0.3,comparables=0.1" into normalized endpoint weights."""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in --mix: {name} (expected one of {sorted(ENDPOINTS)})")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("--mix weights must sum to a positive number")
+    return {name: weight / total for name, weight in mix.items()}
+
+def build_schedule(scenarios, n_requests, mix=DEFAULT_MIX, seed=0):
+    """
+    Seeded list of requests to replay.
+
+    Args:
+        scenarios (pd.DataFrame): team_name, season_year, player_id rows
+        n_requests (int): Length of the schedule
+        mix (dict): Endpoint name -> share of the requests
+        seed (int): Random seed
+
+    Returns:
+        list: (endpoint name, path with query string) tuples
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = scenarios.drop_duplicates().reset_index(drop=True)
+    # Zipf popularity over a shuffled scenario order
+    popularity = 1.0 / np.arange(1, len(scenarios) + 1) ** ZIPF_EXPONENT
+    popularity = rng.permutation(popularity / popularity.sum())
+    names = list(mix)
+    kinds = rng.choice(names, size=n_requests, p=[mix[name] for name in names])
+    picks = rng.choice(len(scenarios), size=n_requests, p=popularity)
+
+    schedule, computed = [], []
+    for kind, pick in zip(kinds, picks):
+        if kind == 'rerank' and not computed:
+            kind = 'compute'
+        if kind == 'rerank':
+            pick = computed[rng.integers(len(computed))]
+        row = scenarios.iloc[pick]
+        if kind == 'comparables':
+            # Profile of the replaced player's previous season
+            params = {'player_id': int(row['player_id']), 'season_year': int(row['season_year']) - 1, 'k': 10}
+        else:
+            fs_w = float(rng.choice(FS_WEIGHTS))
+            params = {'team_name': row['team_name'], 'season_year': int(row['season_year']),
+                      'player_id_to_replace': int(row['player_id']),
+                      'fs_w': fs_w, 'v_w': round(1 - fs_w, 2), 'top_n': TOP_N}
+            if kind == 'compute':
+                computed.append(pick)
+        schedule.append((kind, f"{ENDPOINTS[kind]}?{urllib.parse.urlencode(params)}"))
+    return schedule
+
+def send(base_url, path, timeout):
+    """
+    Send one GET request.
+
+    Returns:
+        tuple: (status code or None on a connection error/timeout, latency in seconds)
+    """
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(base_url + path, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, time.perf_counter() - start
+
+def run_level(base_url, schedule, concurrency, duration=None, timeout=60.0):
+    """
+    Replay the schedule with `concurrency` closed-loop clients.
+
+    Without a duration every request of the schedule is sent once; with a duration the schedule
+    is replayed from the start as often as needed until the time is up.
+
+    Returns:
+        tuple: (pd.DataFrame of endpoint, status, latency_s, elapsed wall time in seconds)
+    """
+    deadline = None if duration is None else time.perf_counter() + duration
+    next_job = itertools.count()
+    records, lock = [], threading.Lock()
+
+    def client():
+        while deadline is None or time.perf_counter() < deadline:
+            idx = next(next_job)
+            if deadline is None and idx >= len(schedule):
+                return
+            kind, path = schedule[idx % len(schedule)]
+            status, latency = send(base_url, path, timeout)
+            with lock:
+                records.append((kind, status, latency))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return pd.DataFrame(records, columns=['endpoint', 'status', 'latency_s']), elapsed
+
+def summarize(results, elapsed):
+    """
+    Throughput, error rate and latency percentiles per endpoint plus an 'all' row.
+
+    A request is an error when it got no response or a status of 400 or more.
+    """
+    rows = {}
+    groups = [('all', results)] + list(results.groupby('endpoint', sort=True))
+    for name, df in groups:
+        if df.empty:
+            continue
+        ms = df['latency_s'].values * 1000
+        errors = df['status'].isna() | (df['status'] >= 400)
+        statuses = df['status'].fillna(0).astype(int).value_counts().sort_index()
+        rows[name] = {
+            'requests': len(df),
+            'rps': len(df) / elapsed if elapsed > 0 else float('nan'),
+            'error_rate': float(errors.mean()),
+            **{f'p{p}_ms': float(np.percentile(ms, p)) for p in PERCENTILES},
+            'max_ms': float(ms.max()),
+            'statuses': ' '.join(f"{'conn' if code == 0 else code}:{n}" for code, n in statuses.items()),
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _proc_status_kib(pid, field):
+    """A kB field (VmRSS, VmHWM) of /proc/<pid>/status, None if unavailable."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _is_helper(pid):
+    """True for multiprocessing helper processes (resource tracker, forkserver) of the server."""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            cmdline = f.read()
+    except OSError:
+        return False
+    return b'resource_tracker' in cmdline or b'forkserver' in cmdline
+
+def _process_tree(root_pid):
+    """root_pid and all of its descendants, from /proc (empty outside Linux)."""
+    parents = {}
+    for entry in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # "pid (comm) state ppid ..." - comm may contain spaces, split after the last ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(parents.get(pid, []))
+    return tree
+
+class ApiServer:
+    """
+    uvicorn serving Analysis.api:app on a local SQLite database, with memory sampling.
+
+    Attributes:
+        base_url (str): http://127.0.0.1:<port>
+        peak_rss_kib (dict): pid -> highest resident memory seen while sampling
+    """
+
+    def __init__(self, db_path, workers=1, port=None, sample_interval=0.5):
+        self.db_path = os.path.abspath(db_path)
+        self.workers = workers
+        self.port = port or _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.sample_interval = sample_interval
+        self.peak_rss_kib = {}
+        self.process = None
+        self._sampling = threading.Event()
+
+    def start(self, ready_timeout=120.0):
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Database not found: {self.db_path}")
+        repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, ROSTERIQ_DB_PATH=self.db_path,
+                   PYTHONPATH=os.pathsep.join(filter(None, [repo_root, os.environ.get('PYTHONPATH')])))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'Analysis.api:app', '--host', '127.0.0.1',
+             '--port', str(self.port), '--workers', str(self.workers), '--log-level', 'warning'],
+            env=env)
+
+        deadline = time.monotonic() + ready_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API server exited with status {self.process.returncode}")
+            status, _ = send(self.base_url, '/', timeout=2.0)
+            # With several workers, wait until every worker process has been spawned
+            if status == 200 and (self.workers == 1 or len(self.worker_pids()) == self.workers):
+                break
+            time.sleep(0.25)
+        else:
+            self.stop()
+            raise TimeoutError(f"API server not ready after {ready_timeout:.0f}s")
+
+        self._sampling.set()
+        threading.Thread(target=self._sample, daemon=True).start()
+        return self
+
+    def pids(self):
+        return _process_tree(self.process.pid) if self.process is not None else []
+
+    def worker_pids(self):
+        """Processes serving requests: the uvicorn workers, or the server itself with one worker."""
+        if self.workers == 1:
+            return [self.process.pid]
+        return [pid for pid in self.pids() if pid != self.process.pid and not _is_helper(pid)]
+
+    def _sample(self):
+        while self._sampling.is_set():
+            for pid in self.pids():
+                rss = _proc_status_kib(pid, 'VmRSS')
+                if rss is not None:
+                    self.peak_rss_kib[pid] = max(rss, self.peak_rss_kib.get(pid, 0))
+            time.sleep(self.sample_interval)
+
+    def reset_peaks(self):
+        self.peak_rss_kib = {}
+
+    def memory(self):
+        """
+        Resident memory of every server process.
+
+        Returns:
+            pd.DataFrame: pid, role (master / worker / helper), rss_mib (now), peak_rss_mib (sampled peak
+                since the last reset), hwm_mib (the kernel's lifetime high-water mark)
+        """
+        rows, workers = [], set(self.worker_pids())
+        for pid in self.pids():
+            rss = _proc_status_kib(pid, 'VmRSS')
+            if rss is None:
+                continue
+            if pid in workers:
+                role = 'worker'
+            else:
+                role = 'master' if pid == self.process.pid else 'helper'
+            rows.append({'pid': pid,
+                         'role': role,
+                         'rss_mib': rss / 1024,
+                         'peak_rss_mib': max(rss, self.peak_rss_kib.get(pid, 0)) / 1024,
+                         'hwm_mib': (_proc_status_kib(pid, 'VmHWM') or rss) / 1024})
+        return pd.DataFrame(rows, columns=['pid', 'role', 'rss_mib', 'peak_rss_mib', 'hwm_mib'])
+
+    def stop(self):
+        self._sampling.clear()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def load_level(base_url, schedule, concurrency, duration=None, warmup_schedule=(), timeout=60.0, server=None):
+    """
+    Run one concurrency level.
+
+    Args:
+        base_url (str): Server address
+        schedule (list): Requests from build_schedule
+        concurrency (int): Number of concurrent clients
+        duration (float, optional): Seconds to run instead of one pass over the schedule
+        warmup_schedule (list): Requests sent (unrecorded) before the measured run; a separately
+            seeded schedule, so the measured requests do not start on scenarios it just cached
+        timeout (float): Per-request timeout in seconds
+        server (ApiServer, optional): Booted server whose memory is reported
+
+    Returns:
+        dict: concurrency, elapsed_s, summary (see summarize) and memory (see ApiServer.memory)
+    """
+    if warmup_schedule:
+        run_level(base_url, warmup_schedule, concurrency=1, timeout=timeout)
+    if server is not None:
+        server.reset_peaks()
+    results, elapsed = run_level(base_url, schedule, concurrency, duration, timeout)
+    return {'concurrency': concurrency,
+            'elapsed_s': elapsed,
+            'summary': summarize(results, elapsed),
+            'memory': server.memory() if server is not None else None}
+
+def print_report(report):
+    print(f"\n=== concurrency {report['concurrency']}: {report['summary'].loc['all', 'requests']} requests "
+          f"in {report['elapsed_s']:.1f}s ===")
+    print(report['summary'].round(3).to_string())
+    if report['memory'] is not None and not report['memory'].empty:
+        print(report['memory'].round(1).to_string(index=False))
+
+def save_report(path, args, reports):
+    payload = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {k: v for k, v in vars(args).items() if k != 'json'},
+        'levels': [{'concurrency': r['concurrency'],
+                    'elapsed_s': r['elapsed_s'],
+                    'summary': r['summary'].to_dict(orient='index'),
+                    'memory': None if r['memory'] is None else r['memory'].to_dict(orient='records')}
+                   for r in reports],
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nSaved report to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the scoring API against a local SQLite database.")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database served by the API (default: rosteriq.db)")
+    parser.add_argument('--scenarios', default=SCENARIOS_PATH, help=f"Scenario CSV (default: {SCENARIOS_PATH})")
+    parser.add_argument('--url', default=None, help="Test an already running server instead of booting one")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn worker processes (default: 1)")
+    parser.add_argument('--port', type=int, default=None, help="Port of the booted server (default: a free port)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="Concurrent clients, one run per level (default: 1 4 16)")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per level (default: 200)")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="Seconds per level, replaying the schedule as needed (overrides the request count)")
+    parser.add_argument('--warmup', type=int, default=0,
+                        help="Unrecorded requests sent before each level, from a schedule seeded with --seed + 1")
+    parser.add_argument('--keep-server', action='store_true',
+                        help="Run every level on one booted server (caches stay warm between levels)")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="Endpoint shares, e.g. compute=0.55,rerank=0.3,comparables=0.15")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the request schedule (default: 0)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds (default: 60)")
+    parser.add_argument('--json', default=None, help="Also write the full report to this JSON file")
+    args = parser.parse_args()
+
+    scenarios = pd.read_csv(args.scenarios)[['team_name', 'season_year', 'player_id']]
+    schedule = build_schedule(scenarios, args.requests, args.mix, args.seed)
+    shares = {str(kind): share for kind, share in
+              pd.Series([kind for kind, _ in schedule]).value_counts(normalize=True).round(2).items()}
+    print(f"Schedule: {len(schedule)} requests over {scenarios.drop_duplicates().shape[0]} scenarios {shares}")
+
+    # The warm-up draws its own requests: replaying the measured schedule's prefix would make
+    # the first measured requests guaranteed cache hits
+    warmup_schedule = build_schedule(scenarios, args.warmup, args.mix, args.seed + 1) if args.warmup else []
+    level_args = (args.duration, warmup_schedule, args.timeout)
+    reports = []
+    if args.url:
+        for concurrency in args.concurrency:
+            reports.append(load_level(args.url.rstrip('/'), schedule, concurrency, *level_args))
+    elif args.keep_server:
+        with ApiServer(args.db, args.workers, args.port) as server:
+            print(f"Serving {server.db_path} at {server.base_url} with {args.workers} worker(s)")
+            for concurrency in args.concurrency:
+                reports.append(load_level(server.base_url, schedule, concurrency, *level_args, server))
+    else:
+        # A fresh server per level, so every level starts from the same cold caches
+        for concurrency in args.concurrency:
+            with ApiServer(args.db, args.workers, args.port) as server:
+                print(f"Serving {server.db_path} at {server.base_url} with {args.workers} worker(s)")
+                reports.append(load_level(server.base_url, schedule, concurrency, *level_args, server))
+
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_columns', None)
+    for report in reports:
+        print_report(report)
+    if args.json:
+        save_report(args.json, args, reports)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Micro-benchmarks of the core pipeline stages.
+
+Every stage runs in isolation on fixtures built once from one backtest scenario (the first
+usable scenario of the scenarios CSV unless --team / --season / --player-id are given), so runs
+are repeatable on the same database. Each stage is measured in two variants:
+
+    - warm: after warm-up calls, with every in-process cache populated
+    - cold: the in-process caches (artifact files, transfer pools, scenario rankings) are
+      cleared before every call
+
+and reports min / mean / p50 / p90 / p99 wall time plus the tracemalloc peak of one extra call.
+Results can be saved as a JSON baseline and later runs compared against it; a stage whose p50
+(or memory peak) grows by more than --tolerance is flagged as a regression and the command
+exits with status 1. A missing baseline, or one measured on different fixtures (scenario, pool
+sizes), is refused with status 1 as well.
+
+Usage:
+    python -m Analysis.Performance.microBenchmarks --save-baseline    # record a baseline
+    python -m Analysis.Performance.microBenchmarks --compare          # flag regressions
+    python -m Analysis.Performance.microBenchmarks --only load_players get_benchmark_info --repeat 50
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from Analysis.Benchmark.benchmark import get_benchmark_info
+from Analysis.Benchmark.init import InitBenchmarkPlayer
+from Analysis.CalculateScores.calcCompositeScore import composite_ranking_robust, clear_scenario_rankings
+from Analysis.CalculateScores.calcFitScore import _calculate_fit_scores
+from Analysis.CalculateScores.calcVOCRP import _calculate_vocbp_scores
+from Analysis.Clustering import matchTeamToCluster, pcaPlayers
+from Analysis.Clustering.matchPlayerToCluster import get_only_plyr_features
+from Analysis.Helpers.dataLoader import load_players
+from Analysis.Helpers.fileCache import clear_cache
+from Analysis.Helpers.standardization import standardized_player_rate_stats
+from Analysis.Helpers.transferPool import clear_transfer_pools
+from Analysis.Helpers.weightedMean import weighted_cluster_mean
+from Analysis.config import Config
+
+BASELINE_PATH = 'Analysis/Performance/baseline.json'
+SCENARIOS_PATH = 'Analysis/Helpers/CSV/availTransferTeams.csv'
+VARIANTS = ('warm', 'cold')
+
+def clear_process_caches():
+    """Drop every in-process cache the pipeline keeps (cold-run state)."""
+    clear_cache()
+    clear_transfer_pools()
+    clear_scenario_rankings()
+
+class Fixtures:
+    """
+    Inputs of every micro-benchmark, built once from one scenario.
+
+    Attributes:
+        conn: Database connection
+        team_name, season_year, player_id: The scenario
+        bmark (InitBenchmarkPlayer): Benchmark of the scenario
+        pos (str): Position of the replaced player
+        cluster_df (pd.DataFrame): Standardized benchmark pool (weighted_cluster_mean input)
+        team_stats (pd.Series): Previous-season team clustering features of the scenario's team
+        player_features (pd.Series): Replaced player's clustering features
+        fs_transfers, vocbp_transfers (pd.DataFrame): Transfer candidates of the fit / VOCBP stats
+        fs_df, vocbp_df (pd.DataFrame): Unsorted fit and VOCBP scores (composite inputs)
+    """
+
+    def __init__(self, conn, team_name, season_year, player_id):
+        self.conn = conn
+        self.team_name = team_name
+        self.season_year = int(season_year)
+        self.player_id = int(player_id)
+        self.bmark = InitBenchmarkPlayer(conn, team_name, self.season_year, self.player_id)
+        self.pos = self.bmark.replaced_plyr_pos
+        self.fs_query = InitBenchmarkPlayer.fs_query()
+
+        self.cluster_df, _ = standardized_player_rate_stats(self.fs_query, conn, self.season_year,
+                                                            list(self.bmark.team_clusterID_weights_dict),
+                                                            list(self.bmark.plyr_clusterID_weights_dict),
+                                                            self.pos)
+        self.stat_cols = [col for col in self.cluster_df.columns if col not in Config.NON_STAT_COLS]
+
+        teams_df = matchTeamToCluster.get_all_team_stats(conn, self.season_year - 1, self.season_year)
+        team_rows = teams_df[teams_df['team_name'] == team_name]
+        self.team_stats = (team_rows if len(team_rows) else teams_df).iloc[0][matchTeamToCluster.TEAM_FEATURE_COLS].astype(float)
+        self.player_features = get_only_plyr_features(self.bmark.replaced_plyr_stats)
+
+        pool = self.bmark.transfer_pool()
+        self.fs_transfers = pool.frame(self.fs_query)
+        self.vocbp_transfers = pool.frame(InitBenchmarkPlayer.vocbp_query())
+        self.fs_df = _calculate_fit_scores(self.bmark, self.fs_transfers, False, False)
+        self.vocbp_df = _calculate_vocbp_scores(self.bmark, self.vocbp_transfers, self.season_year - 1, False, False)
+
+    @classmethod
+    def from_scenarios(cls, conn, scenarios_path=SCENARIOS_PATH):
+        """Fixtures of the first scenario of the CSV whose benchmark can be built."""
+        for row in pd.read_csv(scenarios_path).itertuples(index=False):
+            try:
+                return cls(conn, row.team_name, row.season_year, row.player_id)
+            except ValueError as e:
+                print(f"Skipping scenario ({row.team_name}, {row.season_year}, {row.player_id}): {e}")
+        raise ValueError(f"No usable scenario in {scenarios_path}")
+
+    def describe(self):
+        return {'team_name': self.team_name, 'season_year': self.season_year, 'player_id': self.player_id,
+                'position': self.pos, 'transfers': len(self.fs_transfers), 'benchmark_rows': len(self.cluster_df)}
+
+# Stage name -> builder of the zero-argument call to measure
+BENCHMARKS = {
+    'load_players': lambda fx: lambda: load_players(fx.fs_query, fx.conn, fx.season_year, fx.pos),
+    'get_benchmark_info': lambda fx: lambda: get_benchmark_info(fx.fs_query, fx.conn, fx.season_year,
+                                                                fx.bmark.team_clusterID_weights_dict,
+                                                                fx.bmark.plyr_clusterID_weights_dict,
+                                                                fx.pos),
+    'weighted_cluster_mean': lambda fx: lambda: weighted_cluster_mean(fx.cluster_df,
+                                                                      list(fx.bmark.team_clusterID_weights_dict),
+                                                                      list(fx.bmark.plyr_clusterID_weights_dict),
+                                                                      list(fx.bmark.team_clusterID_weights_dict.values()),
+                                                                      list(fx.bmark.plyr_clusterID_weights_dict.values()),
+                                                                      fx.stat_cols),
+    'project_to_pca[team]': lambda fx: lambda: matchTeamToCluster.project_to_pca(fx.team_stats, fx.season_year),
+    'project_to_pca[player]': lambda fx: lambda: pcaPlayers.project_to_pca(fx.player_features, fx.pos, fx.season_year),
+    '_calculate_fit_scores': lambda fx: lambda: _calculate_fit_scores(fx.bmark, fx.fs_transfers, True, False),
+    '_calculate_vocbp_scores': lambda fx: lambda: _calculate_vocbp_scores(fx.bmark, fx.vocbp_transfers,
+                                                                          fx.season_year - 1, True, False),
+    'composite_ranking_robust': lambda fx: lambda: composite_ranking_robust(fx.fs_df, fx.vocbp_df),
+}
+
+def measure(fn, repeat=30, warmup=3, cold=False):
+    """
+    Time repeated calls of fn and the memory peak of one more call.
+
+    Args:
+        fn (callable): Zero-argument call to measure
+        repeat (int): Measured calls
+        warmup (int): Unmeasured calls first (warm variant only)
+        cold (bool): Clear the process caches before every call (outside the timed region)
+
+    Returns:
+        dict: runs, min_ms, mean_ms, p50_ms, p90_ms, p99_ms, peak_kib
+    """
+    if not cold:
+        for _ in range(warmup):
+            fn()
+
+    times = np.empty(repeat)
+    gc_was_enabled = gc.isenabled()
+    try:
+        for i in range(repeat):
+            if cold:
+                clear_process_caches()
+            # Like timeit: keep the garbage collector out of the timed call
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter_ns()
+            fn()
+            times[i] = (time.perf_counter_ns() - start) / 1e6
+            gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if cold:
+        clear_process_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'runs': repeat,
+        'min_ms': float(times.min()),
+        'mean_ms': float(times.mean()),
+        'p50_ms': float(np.percentile(times, 50)),
+        'p90_ms': float(np.percentile(times, 90)),
+        'p99_ms': float(np.percentile(times, 99)),
+        'peak_kib': peak / 1024,
+    }
+
+def run_benchmarks(fixtures, names=None, variants=VARIANTS, repeat=30, warmup=3):
+    """
+    Measure every selected stage and variant.
+
+    Returns:
+        dict: "stage[variant]" -> measure() result
+    """
+    results = {}
+    for name, build in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        fn = build(fixtures)
+        for variant in variants:
+            results[f"{name}[{variant}]"] = measure(fn, repeat, warmup, cold=(variant == 'cold'))
+    return results
+
+def save_baseline(path, results, fixtures):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'scenario': fixtures.describe(),
+            'results': results,
+        }, f, indent=2)
+
+def compare_to_baseline(results, baseline, tolerance=0.15):
+    """
+    Relative change of every benchmark present in both runs.
+
+    Returns:
+        pd.DataFrame: benchmark, p50_ms, baseline_p50_ms, p50_change, peak_kib,
+            baseline_peak_kib, peak_change and regression (change above tolerance)
+    """
+    rows = []
+    for key, current in results.items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        p50_change = current['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        peak_change = current['peak_kib'] / base['peak_kib'] - 1 if base['peak_kib'] else 0.0
+        rows.append({'benchmark': key,
+                     'p50_ms': current['p50_ms'], 'baseline_p50_ms': base['p50_ms'], 'p50_change': p50_change,
+                     'peak_kib': current['peak_kib'], 'baseline_peak_kib': base['peak_kib'], 'peak_change': peak_change,
+                     'regression': p50_change > tolerance or peak_change > tolerance})
+    return pd.DataFrame(rows, columns=['benchmark', 'p50_ms', 'baseline_p50_ms', 'p50_change', 'peak_kib',
+                                       'baseline_peak_kib', 'peak_change', 'regression'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the core pipeline stages.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Stages to run (default: all)")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--repeat', type=int, default=30, help="Measured calls per benchmark (default: 30)")
+    parser.add_argument('--warmup', type=int, default=3, help="Warm-up calls of the warm variant (default: 3)")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    parser.add_argument('--scenarios', default=SCENARIOS_PATH, help=f"Scenario CSV for the fixtures (default: {SCENARIOS_PATH})")
+    parser.add_argument('--team', help="Fixture scenario team (with --season and --player-id)")
+    parser.add_argument('--season', type=int, help="Fixture scenario season")
+    parser.add_argument('--player-id', type=int, help="Fixture scenario replaced player")
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, default=None,
+                        help=f"Save the results as the baseline (default path: {BASELINE_PATH})")
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH, default=None,
+                        help=f"Compare against a saved baseline (default path: {BASELINE_PATH})")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Relative p50 / memory growth flagged as a regression (default: 0.15)")
+    args = parser.parse_args()
+
+    # A missing baseline fails the regression check instead of silently passing it
+    baseline = None
+    if args.compare:
+        if not os.path.exists(args.compare):
+            sys.exit(f"No baseline at {args.compare} (create one with --save-baseline)")
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    conn = sqlite3.connect(args.db)
+    if args.team is not None:
+        fixtures = Fixtures(conn, args.team, args.season, args.player_id)
+    else:
+        fixtures = Fixtures.from_scenarios(conn, args.scenarios)
+    print(f"Fixtures: {fixtures.describe()}")
+
+    # Timings are only comparable on the same inputs
+    if baseline is not None and baseline['scenario'] != fixtures.describe():
+        conn.close()
+        sys.exit(f"Baseline {args.compare} was measured on {baseline['scenario']}, not on these fixtures; "
+                 f"pick its scenario with --team / --season / --player-id or save a new baseline")
+
+    results = run_benchmarks(fixtures, args.only, args.variants, args.repeat, args.warmup)
+    table = pd.DataFrame.from_dict(results, orient='index')
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+        print(table)
+
+    exit_code = 0
+    if baseline is not None:
+        comparison = compare_to_baseline(results, baseline, args.tolerance)
+        print(f"\nAgainst baseline {args.compare} ({baseline['created_at']}):")
+        with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+            print(comparison.to_string(index=False))
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}: {', '.join(regressions['benchmark'])}")
+            exit_code = 1
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, fixtures)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    conn.close()
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
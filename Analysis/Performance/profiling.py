@@ -0,0 +1,293 @@
+"""
+Opt-in profiling of backtest scenarios.
+
+Profiling is switched on with the ROSTERIQ_PROFILE environment variable (or the --profile flag of
+checkSuccessfulTransfer, which sets it for its worker processes):
+
+    ROSTERIQ_PROFILE=cprofile   deterministic profile (cProfile) of every scenario
+    ROSTERIQ_PROFILE=sample     statistical profile: a background thread samples the scenario's
+                                call stack every ROSTERIQ_PROFILE_INTERVAL seconds (default 0.005)
+    ROSTERIQ_PROFILE=all        both (also: 1 / true)
+
+Each profiled region is one scenario (see `ScenarioProfiler.scenario`). Profiles are aggregated
+over every scenario of a run, across worker processes (workers `take` their data after each
+scenario and the parent `merge`s it), and written by `write`:
+
+    profile.pstats   aggregated cProfile stats (python -m pstats, snakeviz, ...)
+    profile.folded   collapsed stacks, "frame;frame;... count" (flamegraph.pl, speedscope, ...)
+    scenarios.csv    wall time of every profiled scenario, slowest first
+    hotspots.txt     top functions by own and cumulative time, and the hottest sampled frames
+
+With profiling off, `get_profiler` returns a profiler whose hooks do nothing.
+"""
+
+import cProfile
+import csv
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_ENV = 'ROSTERIQ_PROFILE'
+INTERVAL_ENV = 'ROSTERIQ_PROFILE_INTERVAL'
+MODES = ('cprofile', 'sample', 'all')
+DEFAULT_INTERVAL = 0.005
+HOTSPOT_ROWS = 30
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def profile_mode(value=None):
+    """
+    Normalize a profiling switch ('cprofile', 'sample', 'all', '1'/'true' or off).
+
+    Args:
+        value (str, optional): Switch value (default: the ROSTERIQ_PROFILE environment variable)
+
+    Returns:
+        str or None: 'cprofile', 'sample', 'all', or None when profiling is off
+    """
+    value = (os.environ.get(PROFILE_ENV, '') if value is None else value).strip().lower()
+    if value in ('', '0', 'false', 'off', 'no'):
+        return None
+    if value in ('1', 'true', 'on', 'yes'):
+        return 'all'
+    if value not in MODES:
+        raise ValueError(f"Unknown {PROFILE_ENV} value {value!r} (expected one of {MODES})")
+    return value
+
+def _frame_label(code):
+    """Flame graph frame name: function (path:first line), paths relative to the repo or site-packages."""
+    path = code.co_filename
+    if path.startswith(_REPO_ROOT + os.sep):
+        path = path[len(_REPO_ROOT) + 1:]
+    elif 'site-packages' + os.sep in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+class _RawStats:
+    """Adapter letting pstats.Stats.add take a plain stats dict (what workers send back)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a time into collapsed-stack counts.
+
+    The stack is recorded from the frame that started sampling (the profiled region) down to the
+    frame running at sample time.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._target = None
+        self._thread = None
+        self._thread_pid = None
+        self._labels = {}
+
+    def start(self, base_frame):
+        """Start sampling the current thread below base_frame."""
+        with self._lock:
+            self._target = (threading.get_ident(), base_frame)
+        # A forked worker inherits the sampler but not its thread
+        if self._thread_pid != os.getpid():
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._target = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if self._target is None:
+                    continue
+                thread_id, base_frame = self._target
+                frame = sys._current_frames().get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(self._label(frame.f_code))
+                    if frame is base_frame:
+                        break
+                    frame = frame.f_back
+                if frame is base_frame:
+                    self.stacks[';'.join(reversed(labels))] += 1
+
+    def take(self):
+        """Counts collected since the last take (and reset)."""
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+        return stacks
+
+class ScenarioProfiler:
+    """
+    Profiles scenarios and aggregates their profiles.
+
+    Attributes:
+        mode (str): 'cprofile', 'sample', 'all' or None (disabled; every hook is a no-op)
+        stats (pstats.Stats): Aggregated cProfile stats (None before the first scenario)
+        stacks (Counter): Aggregated collapsed stacks -> sample count
+        scenario_times (list): (label, seconds) of every profiled scenario
+    """
+
+    def __init__(self, mode=None, interval=DEFAULT_INTERVAL):
+        self.mode = mode
+        self.stats = None
+        self.stacks = Counter()
+        self.scenario_times = []
+        self._sampler = StackSampler(interval) if mode in ('sample', 'all') else None
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    @contextmanager
+    def scenario(self, label):
+        """
+        Profile the body of the `with` block as one scenario.
+
+        Args:
+            label (tuple): Scenario identifier, e.g. (team_name, season_year, player_id)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        profile = cProfile.Profile() if self.mode in ('cprofile', 'all') else None
+        if self._sampler is not None:
+            # Frames: this generator <- _GeneratorContextManager.__enter__ <- the `with` statement
+            self._sampler.start(sys._getframe(2))
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            if self._sampler is not None:
+                self._sampler.stop()
+            self.scenario_times.append((tuple(label), elapsed))
+            if profile is not None:
+                self._add_stats(profile)
+
+    def _add_stats(self, source):
+        if self.stats is None:
+            self.stats = pstats.Stats(source)
+        else:
+            self.stats.add(source)
+
+    def take(self):
+        """
+        Profile data collected since the last take, to be merged into another process's profiler.
+
+        Returns:
+            dict or None: Picklable stats / stacks / scenario_times, None when disabled
+        """
+        if not self.enabled:
+            return None
+        data = {'stats': self.stats.stats if self.stats is not None else None,
+                'stacks': self._sampler.take() if self._sampler is not None else Counter(),
+                'scenario_times': self.scenario_times}
+        self.stats, self.scenario_times = None, []
+        return data
+
+    def merge(self, data):
+        """Add profile data from `take` (e.g. from a worker process)."""
+        if data is None:
+            return
+        if data['stats']:
+            self._add_stats(_RawStats(data['stats']))
+        self.stacks.update(data['stacks'])
+        self.scenario_times.extend(data['scenario_times'])
+
+    def hotspots(self, n=HOTSPOT_ROWS):
+        """Top functions by own time and by cumulative time, and the hottest sampled leaf frames."""
+        out = io.StringIO()
+        out.write(f"Profiled scenarios: {len(self.scenario_times)}, "
+                  f"total {sum(t for _, t in self.scenario_times):.2f}s\n")
+        if self.stats is not None:
+            for sort_key in ('tottime', 'cumulative'):
+                out.write(f"\n=== Top {n} functions by {sort_key} ===\n")
+                self.stats.stream = out
+                self.stats.sort_stats(sort_key).print_stats(n)
+            self.stats.stream = sys.stdout
+        stacks = self._all_stacks()
+        if stacks:
+            total = sum(stacks.values())
+            own = Counter()
+            for stack, count in stacks.items():
+                own[stack.rsplit(';', 1)[-1]] += count
+            out.write(f"\n=== Top {n} sampled frames by own samples ({total} samples) ===\n")
+            for frame, count in own.most_common(n):
+                out.write(f"{count / total:7.1%}  {count:8d}  {frame}\n")
+        return out.getvalue()
+
+    def _all_stacks(self):
+        stacks = Counter(self.stacks)
+        if self._sampler is not None:
+            stacks.update(self._sampler.take())
+            self.stacks = Counter(stacks)
+        return stacks
+
+    def write(self, out_dir):
+        """
+        Write the aggregated profiles.
+
+        Returns:
+            list: Paths of the written files
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        if self.stats is not None:
+            paths.append(os.path.join(out_dir, 'profile.pstats'))
+            self.stats.dump_stats(paths[-1])
+        stacks = self._all_stacks()
+        if stacks:
+            paths.append(os.path.join(out_dir, 'profile.folded'))
+            with open(paths[-1], 'w') as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{stack} {count}\n")
+
+        paths.append(os.path.join(out_dir, 'scenarios.csv'))
+        with open(paths[-1], 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['team_name', 'season_year', 'player_id', 'seconds'])
+            for label, seconds in sorted(self.scenario_times, key=lambda item: -item[1]):
+                writer.writerow([*label, f"{seconds:.6f}"])
+
+        paths.append(os.path.join(out_dir, 'hotspots.txt'))
+        with open(paths[-1], 'w') as f:
+            f.write(self.hotspots())
+        return paths
+
+_PROFILER = None
+
+def get_profiler():
+    """The process's ScenarioProfiler, configured from ROSTERIQ_PROFILE on first use."""
+    global _PROFILER
+    if _PROFILER is None:
+        interval = float(os.environ.get(INTERVAL_ENV, DEFAULT_INTERVAL))
+        _PROFILER = ScenarioProfiler(profile_mode(), interval)
+    return _PROFILER
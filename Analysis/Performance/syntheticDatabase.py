@@ -0,0 +1,593 @@
+"""
+Synthetic rosteriq.db Generator
+
+Builds a self-contained working tree (a schema-compatible rosteriq.db plus the files the
+pipeline reads next to it) for benchmarks, parallel-runner tests and scale tests without the
+real database:
+
+    <out-dir>/rosteriq.db                                   Players, Teams, Player_Seasons,
+                                                            Team_Seasons, HS_Rankings + cluster
+                                                            assignment tables
+    <out-dir>/Analysis/Clustering/...                       the clustering artifacts the cluster
+                                                            columns were computed from
+    <out-dir>/Analysis/Helpers/CSV/availTransferTeams.csv   backtest scenarios
+    <out-dir>/Analysis/CalculateScores/CSV/...              SOS inputs and value adjustment
+    <out-dir>/synthetic_manifest.json                       generation parameters and row counts
+
+Players are drawn from the committed clustering models: each new player gets an archetype
+(a player cluster of the PCA model covering their first season), a feature vector sampled
+around that centroid and mapped back to raw rate stats, and counting stats derived from the
+rates and their minutes. Careers then progress season by season with development, graduation,
+transfers and high-school recruits, and team strength follows a persistent random walk that
+drives barthag_rank. Cluster columns are filled by assignClusters with the same artifacts that
+are copied into the output tree, so the database and artifacts always match. Runs are fully
+determined by --seed.
+
+Run the pipeline against the generated tree from inside it:
+    cd synthetic && PYTHONPATH=.. python -m Analysis.Testing.checkSuccessfulTransfer
+
+Usage:
+    python -m Analysis.Performance.syntheticDatabase                          # real scale
+    python -m Analysis.Performance.syntheticDatabase --teams 3620 --out-dir synthetic10x
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from Analysis.CalculateScores.sosAdjustmentFactor import build_value_sos_adjustment
+from Analysis.Clustering import assignClusters
+from Analysis.Clustering import matchPlayerToCluster as plyr_clu
+from Analysis.Clustering import pcaPlayers
+from Analysis.Clustering.archetypeLabelLookup import player_labels_path, team_labels_path
+from Analysis.config import Config
+
+OUT_DIR = 'synthetic'
+DB_NAME = 'rosteriq.db'
+SCENARIOS_PATH = 'Analysis/Helpers/CSV/availTransferTeams.csv'
+SOS_INPUT_PATH = 'Analysis/CalculateScores/CSV/def_off_factors.csv'
+SOS_OUTPUT_PATH = 'Analysis/CalculateScores/CSV/sos_value_adjustment.csv'
+MANIFEST_NAME = 'synthetic_manifest.json'
+
+# Roster composition and physical profile by position
+POSITION_SHARES = {'G': 0.43, 'F': 0.36, 'C': 0.21}
+HEIGHT_INCHES = {'G': (75.0, 2.0), 'F': (79.0, 1.5), 'C': (82.5, 1.5)}
+
+# Spread of a player around their archetype centroid (PC units) and off the PCA plane
+# (standardized feature units), and the season-to-season wobble of their rates
+ARCHETYPE_SPREAD = 0.7
+RESIDUAL_SPREAD = 0.55
+SEASON_SPREAD = 0.25
+
+# Plausible range of every raw feature, in PLAYER_FEATURE_COLS order
+FEATURE_BOUNDS = np.array([
+    [30.0, 80.0],    # ts_percent
+    [0.0, 50.0],     # ast_percent
+    [0.0, 20.0],     # oreb_percent
+    [3.0, 35.0],     # dreb_percent
+    [4.0, 40.0],     # tov_percent
+    [20.0, 100.0],   # ft_percent
+    [0.0, 8.0],      # stl_percent
+    [0.0, 15.0],     # blk_percent
+    [8.0, 38.0],     # usg_percent
+    [0.0, 1.2],      # ftr (fraction)
+    [0.0, 1.0],      # threeRate
+    [0.0, 1.0],      # rimRate
+    [0.0, 1.0],      # midRate
+])
+FEATURE_INDEX = {col: i for i, col in enumerate(plyr_clu.PLAYER_FEATURE_COLS)}
+SHOT_RATES = [FEATURE_INDEX['threeRate'], FEATURE_INDEX['rimRate'], FEATURE_INDEX['midRate']]
+
+FIRST_NAMES = ['Jalen', 'Marcus', 'Tyrese', 'Caleb', 'Jordan', 'Isaiah', 'Malik', 'Cameron', 'Darius',
+               'Elijah', 'Trey', 'Kobe', 'Jaylen', 'Andre', 'Xavier', 'Devin', 'Terrence', 'Miles',
+               'Keegan', 'Zion', 'Brandon', 'Chris', 'Aaron', 'Noah', 'Tristan', 'Oscar', 'Luka',
+               'Jabari', 'Kendall', 'Reece']
+LAST_NAMES = ['Johnson', 'Williams', 'Brown', 'Jones', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor',
+              'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Thompson', 'Robinson', 'Clark', 'Lewis',
+              'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Green', 'Baker', 'Adams', 'Nelson',
+              'Carter', 'Mitchell', 'Perez', 'Roberts', 'Turner', 'Phillips', 'Campbell', 'Parker']
+
+# Column types of the generated tables (the subset of the real schema the pipeline reads)
+PLAYER_SEASONS_SCHEMA = {
+    'player_id': 'INTEGER', 'team_name': 'VARCHAR(30)', 'season_year': 'INTEGER',
+    'player_year': 'TINYINT', 'games_played': 'TINYINT', 'adj_gp': 'TINYINT',
+    'height_inches': 'TINYINT', 'position': 'VARCHAR(5)', 'min_pg': 'FLOAT', 'MIN': 'FLOAT',
+    'POSS': 'FLOAT', 'pts_pg': 'FLOAT', 'ast_pg': 'FLOAT', 'oreb_pg': 'FLOAT', 'dreb_pg': 'FLOAT',
+    'stl_pg': 'FLOAT', 'efg_percent': 'FLOAT', 'ts_percent': 'FLOAT', 'usg_percent': 'FLOAT',
+    'oreb_percent': 'FLOAT', 'dreb_percent': 'FLOAT', 'ast_percent': 'FLOAT', 'tov_percent': 'FLOAT',
+    'FGM': 'FLOAT', 'FGA': 'FLOAT', 'FTM': 'FLOAT', 'FTA': 'FLOAT', 'ft_percent': 'FLOAT', 'ftr': 'FLOAT',
+    'two_percent': 'FLOAT', 'threeM': 'FLOAT', 'threeA': 'FLOAT', 'three_percent': 'FLOAT',
+    'rimA': 'FLOAT', 'midA': 'FLOAT', 'blk_percent': 'FLOAT', 'stl_percent': 'FLOAT',
+    'TOV': 'FLOAT', 'STL': 'FLOAT', 'OREB': 'FLOAT', 'DREB': 'FLOAT', 'porpag': 'FLOAT', 'dporpag': 'FLOAT',
+    'adjoe': 'FLOAT', 'adrtg': 'FLOAT', 'bpm': 'FLOAT', 'player_cluster': 'INT',
+}
+TEAM_SEASONS_SCHEMA = {
+    'team_name': 'VARCHAR(30)', 'season_year': 'INT', 'games_played': 'INT', 'adjoe': 'FLOAT',
+    'adjde': 'FLOAT', 'barthag': 'FLOAT', 'barthag_rank': 'INT', 'adjt': 'FLOAT', 'POSS': 'FLOAT',
+    'eFG': 'FLOAT', 'three_rate': 'FLOAT', 'ftr': 'FLOAT', 'ast_pg': 'FLOAT', 'stl_pg': 'FLOAT',
+    'oreb_pg': 'FLOAT', 'dreb_pg': 'FLOAT', 'sos': 'FLOAT', 'team_cluster': 'INT',
+}
+HS_RANKINGS_SCHEMA = {
+    'player_name': 'VARCHAR(30)', 'position': 'VARCHAR(5)', 'FGA': 'FLOAT', 'FGM': 'FLOAT', 'FTA': 'FLOAT',
+    'P3M': 'FLOAT', 'P3A': 'FLOAT', 'adjoe': 'FLOAT', 'adjde': 'FLOAT', 'TOV': 'FLOAT', 'OREB': 'FLOAT',
+    'DREB': 'FLOAT', 'bpm': 'FLOAT', 'season_year': 'INT', 'school_committed': 'VARCHAR(30)',
+}
+PLAYERS_SCHEMA = {'player_id': 'INTEGER PRIMARY KEY', 'player_name': 'VARCHAR(30)'}
+TEAMS_SCHEMA = {'team_name': 'VARCHAR(30) PRIMARY KEY'}
+
+def model_year_for(season_year):
+    """Clustering model year used for a season (the earliest model covering it, clipped to the artifacts)."""
+    return int(np.clip(season_year + 1, Config.START_YEAR, Config.END_YEAR_INCLUDE))
+
+def load_player_models():
+    """
+    Load every committed player PCA model with its cluster centroids.
+
+    Returns:
+        dict: (model_year, pos) -> (center, scale, rotation, centroids)
+    """
+    models = {}
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        for pos in Config.POSITIONS:
+            center, scale, rotation = pcaPlayers.load_pca_model(pos, year)
+            _, centroids = plyr_clu.load_cluster_centroids(year, pos)
+            models[(year, pos)] = (center, scale, rotation, centroids)
+    return models
+
+def clip_features(features):
+    """Clip raw features to FEATURE_BOUNDS and renormalize the shot-zone rates to sum to 1."""
+    features = np.clip(features, FEATURE_BOUNDS[:, 0], FEATURE_BOUNDS[:, 1])
+    shots = np.clip(features[:, SHOT_RATES], 0.01, None)
+    features[:, SHOT_RATES] = shots / shots.sum(axis=1, keepdims=True)
+    return features
+
+def sample_archetype_features(rng, model, n):
+    """
+    Sample raw rate stats for n new players of one position from a PCA + k-means model.
+
+    Each player picks a cluster uniformly, is placed around its centroid in PC space and gets
+    independent noise off the PCA plane before being mapped back to raw feature units.
+
+    Returns:
+        np.ndarray: (n, n_features) raw features in PLAYER_FEATURE_COLS order
+    """
+    center, scale, rotation, centroids = model
+    picks = rng.integers(len(centroids), size=n)
+    pcs = centroids[picks] + rng.normal(0.0, ARCHETYPE_SPREAD, size=(n, rotation.shape[1]))
+    residual = rng.normal(0.0, RESIDUAL_SPREAD, size=(n, rotation.shape[0]))
+    residual -= (residual @ rotation) @ rotation.T
+    standardized = pcs @ rotation.T + residual
+    return clip_features(center + scale * standardized)
+
+def derive_counting_stats(features, minutes, tempo, rng):
+    """
+    Counting stats consistent with a matrix of rate stats and minutes played.
+
+    Args:
+        features (np.ndarray): (n, n_features) raw rates in PLAYER_FEATURE_COLS order
+        minutes (np.ndarray): Total minutes of every row
+        tempo (np.ndarray): Possessions per 40 minutes of every row's team
+        rng (np.random.Generator): Random generator
+
+    Returns:
+        dict: Column name -> array (possessions, shot attempts/makes, rebounds, steals, turnovers, assists)
+    """
+    f = {col: features[:, i] for col, i in FEATURE_INDEX.items()}
+    poss = minutes * tempo / 40
+    used = poss * f['usg_percent'] / 100
+    fga = np.rint(used * (1 - f['tov_percent'] / 100) / (1 + 0.44 * f['ftr']))
+    fta = np.rint(fga * f['ftr'])
+    three_a = np.rint(fga * f['threeRate'])
+    three_pct = np.clip(rng.normal(0.34, 0.045, len(fga)), 0.15, 0.5)
+    three_m = np.rint(three_a * three_pct)
+    ftm = np.rint(fta * f['ft_percent'] / 100)
+    # ts% = pts / (2 * (FGA + 0.44 FTA)) and pts = 2 FGM + 3PM + FTM
+    points = f['ts_percent'] / 100 * 2 * (fga + 0.44 * fta)
+    fgm = np.clip(np.rint((points - ftm - three_m) / 2), three_m, fga)
+    return {
+        'POSS': poss,
+        'FGA': fga, 'FGM': fgm, 'FTA': fta, 'FTM': ftm,
+        'threeA': three_a, 'threeM': three_m,
+        'rimA': np.rint(fga * f['rimRate']), 'midA': np.rint(fga * f['midRate']),
+        'TOV': np.rint(used * f['tov_percent'] / 100),
+        'STL': np.rint(poss * 1.3 * f['stl_percent'] / 100),
+        'OREB': np.rint(poss * 0.38 * f['oreb_percent'] / 100),
+        'DREB': np.rint(poss * 0.45 * f['dreb_percent'] / 100),
+        'AST': poss * 0.34 * f['ast_percent'] / 100,
+    }
+
+def player_ratings(features, team_quality, skill, rng):
+    """Offensive / defensive ratings and box plus-minus from rates, team strength and player skill."""
+    f = {col: features[:, i] for col, i in FEATURE_INDEX.items()}
+    n = len(features)
+    adjoe = (101.5 + 1.1 * (f['ts_percent'] - 53) - 0.3 * (f['tov_percent'] - 18)
+             + 6.5 * team_quality + 1.5 * skill + rng.normal(0, 4.0, n))
+    adrtg = (103.5 - 6.0 * team_quality - 0.8 * skill - 0.6 * (f['stl_percent'] - 2)
+             - 0.3 * (f['blk_percent'] - 2) + rng.normal(0, 2.5, n))
+    bpm = (0.3 * (adjoe - 103) + 0.3 * (103 - adrtg) + 0.1 * (f['usg_percent'] - 19)
+           + 1.2 * skill - 1.0 + rng.normal(0, 1.5, n))
+    return adjoe, adrtg, bpm
+
+class LeagueSimulation:
+    """
+    Season-by-season simulation of rosters, careers and team strength.
+
+    Attributes:
+        players (pd.DataFrame): Players table rows
+        player_seasons (pd.DataFrame): Player_Seasons rows
+        team_seasons (pd.DataFrame): Team_Seasons rows
+        hs_rankings (pd.DataFrame): HS_Rankings rows (recruits of the following season)
+    """
+
+    def __init__(self, n_teams, roster_size, start_year, end_year_include, transfer_rate, seed):
+        self.rng = np.random.default_rng(seed)
+        self.models = load_player_models()
+        self.team_names = ['Arizona'] + [f"Team {i:04d}" for i in range(1, n_teams)]
+        self.roster_size = roster_size
+        self.transfer_rate = transfer_rate
+        self.seasons = list(range(start_year, end_year_include + 1))
+        self.targets = self._position_targets(roster_size)
+
+        # Per-player state, indexed by player_id - 1
+        self.names, self.positions, self.heights = [], [], []
+        self.base_features, self.skill, self.class_year = [], [], []
+        self.used_names = {}
+
+        self.team_quality = self.rng.normal(0.0, 1.0, n_teams)
+        self.rosters = [[] for _ in range(n_teams)]
+        self.season_frames, self.team_frames, self.recruit_frames = [], [], []
+
+    @staticmethod
+    def _position_targets(roster_size):
+        targets = {pos: int(round(share * roster_size)) for pos, share in POSITION_SHARES.items()}
+        targets['G'] += roster_size - sum(targets.values())
+        return targets
+
+    def _unique_name(self):
+        name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+        count = self.used_names.get(name, 0)
+        self.used_names[name] = count + 1
+        return name if count == 0 else f"{name} {count + 1}"
+
+    def _new_players(self, pos, n, season_year, quality, class_year):
+        """Create n players of one position entering in season_year; returns their player ids."""
+        features = sample_archetype_features(self.rng, self.models[(model_year_for(season_year), pos)], n)
+        first_id = len(self.names) + 1
+        mean_height, sd_height = HEIGHT_INCHES[pos]
+        for i in range(n):
+            self.names.append(self._unique_name())
+            self.positions.append(pos)
+            self.heights.append(int(round(self.rng.normal(mean_height, sd_height))))
+            self.base_features.append(features[i])
+            self.skill.append(self.rng.normal(0.4 * quality, 0.9))
+            self.class_year.append(class_year if class_year is not None else int(self.rng.integers(1, 5)))
+        return list(range(first_id, first_id + n))
+
+    def run(self):
+        first_season = self.seasons[0]
+        for team_idx, quality in enumerate(self.team_quality):
+            for pos, count in self.targets.items():
+                self.rosters[team_idx] += self._new_players(pos, count, first_season, quality, None)
+
+        for season_year in self.seasons:
+            self._play_season(season_year)
+            if season_year != self.seasons[-1]:
+                self._offseason(season_year)
+
+        self.players = pd.DataFrame({'player_id': np.arange(1, len(self.names) + 1), 'player_name': self.names})
+        self.player_seasons = pd.concat(self.season_frames, ignore_index=True)
+        self.team_seasons = pd.concat(self.team_frames, ignore_index=True)
+        self.hs_rankings = (pd.concat(self.recruit_frames, ignore_index=True) if self.recruit_frames
+                            else pd.DataFrame(columns=list(HS_RANKINGS_SCHEMA)))
+        return self
+
+    def _play_season(self, season_year):
+        rng = self.rng
+        team_idx = np.concatenate([np.full(len(roster), t) for t, roster in enumerate(self.rosters)])
+        player_ids = np.concatenate([np.asarray(roster, dtype=int) for roster in self.rosters])
+        rows = player_ids - 1
+        n = len(rows)
+
+        class_year = np.asarray(self.class_year)[rows]
+        skill = np.asarray(self.skill)[rows] + 0.25 * (class_year - 1)
+        quality = self.team_quality[team_idx]
+        positions = np.asarray(self.positions)[rows]
+
+        # Base archetype + experience (more usage and efficiency) + this season's wobble
+        features = np.stack([self.base_features[r] for r in rows])
+        scale = np.stack([self.models[(model_year_for(season_year), pos)][1] for pos in positions])
+        features = features + SEASON_SPREAD * scale * rng.normal(size=features.shape)
+        features[:, FEATURE_INDEX['usg_percent']] += 1.2 * (class_year - 2.5)
+        features[:, FEATURE_INDEX['ts_percent']] += 0.6 * (class_year - 2.5)
+        features = clip_features(features)
+
+        # Minutes follow the depth chart: better and older players start
+        depth_score = skill + 0.3 * class_year + rng.normal(0, 0.6, n)
+        order = np.lexsort((-depth_score, team_idx))
+        team_start = np.searchsorted(team_idx[order], team_idx[order])
+        depth = np.empty(n, dtype=int)
+        depth[order] = np.arange(n) - team_start
+        team_games = rng.integers(28, 36, len(self.rosters))
+        tempo = rng.normal(68.0, 3.0, len(self.rosters))
+        min_pg = np.clip(33 - 2.4 * depth + rng.normal(0, 2.5, n), 1.5, 38)
+        games = np.minimum(team_games[team_idx],
+                           np.where(depth < 9, rng.integers(24, 36, n), rng.integers(6, 30, n)))
+        minutes = min_pg * games
+
+        counts = derive_counting_stats(features, minutes, tempo[team_idx], rng)
+        adjoe, adrtg, bpm = player_ratings(features, quality, skill, rng)
+        f = {col: features[:, i] for col, i in FEATURE_INDEX.items()}
+        usage_share = f['usg_percent'] / 100 * min_pg / 40
+        two_a = counts['FGA'] - counts['threeA']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            efg = np.where(counts['FGA'] > 0, (counts['FGM'] + 0.5 * counts['threeM']) / counts['FGA'] * 100, np.nan)
+            two_pct = np.where(two_a > 0, (counts['FGM'] - counts['threeM']) / two_a * 100, np.nan)
+            three_pct = np.where(counts['threeA'] > 0, counts['threeM'] / counts['threeA'] * 100, np.nan)
+            ft_pct = np.where(counts['FTA'] > 0, f['ft_percent'], np.nan)
+
+        season_df = pd.DataFrame({
+            'player_id': player_ids,
+            'team_name': np.asarray(self.team_names)[team_idx],
+            'season_year': season_year,
+            'player_year': class_year,
+            'games_played': games,
+            'adj_gp': games,
+            'height_inches': np.asarray(self.heights)[rows],
+            'position': positions,
+            'min_pg': min_pg,
+            'MIN': minutes,
+            'POSS': counts['POSS'],
+            'pts_pg': (2 * counts['FGM'] + counts['threeM'] + counts['FTM']) / games,
+            'ast_pg': counts['AST'] / games,
+            'oreb_pg': counts['OREB'] / games,
+            'dreb_pg': counts['DREB'] / games,
+            'stl_pg': counts['STL'] / games,
+            'efg_percent': efg,
+            'ts_percent': f['ts_percent'],
+            'usg_percent': f['usg_percent'],
+            'oreb_percent': f['oreb_percent'],
+            'dreb_percent': f['dreb_percent'],
+            'ast_percent': f['ast_percent'],
+            'tov_percent': f['tov_percent'],
+            'FGM': counts['FGM'], 'FGA': counts['FGA'],
+            'FTM': counts['FTM'], 'FTA': counts['FTA'],
+            'ft_percent': ft_pct,
+            'ftr': f['ftr'] * 100,
+            'two_percent': two_pct,
+            'threeM': counts['threeM'], 'threeA': counts['threeA'],
+            'three_percent': three_pct,
+            'rimA': counts['rimA'], 'midA': counts['midA'],
+            'blk_percent': f['blk_percent'],
+            'stl_percent': f['stl_percent'],
+            'TOV': counts['TOV'], 'STL': counts['STL'], 'OREB': counts['OREB'], 'DREB': counts['DREB'],
+            'porpag': (adjoe - 88) * usage_share * 0.6,
+            'dporpag': (112 - adrtg) * min_pg / 40 * 0.25,
+            'adjoe': adjoe,
+            'adrtg': adrtg,
+            'bpm': bpm,
+            'player_cluster': None,
+        })
+        self.season_frames.append(season_df)
+        self.team_frames.append(self._team_season(season_df, season_year, team_games, tempo))
+
+    def _team_season(self, season_df, season_year, team_games, tempo):
+        """Team_Seasons rows aggregated from the season's player rows."""
+        df = season_df.assign(poss_used=season_df['FGA'] + 0.44 * season_df['FTA'] + season_df['TOV'] - season_df['OREB'],
+                              AST=season_df['ast_pg'] * season_df['games_played'])
+        df['w_adjoe'] = df['adjoe'] * df['poss_used']
+        df['w_adrtg'] = df['adrtg'] * df['poss_used']
+        totals = df.groupby('team_name', sort=False)[
+            ['FGA', 'FGM', 'FTA', 'threeA', 'threeM', 'AST', 'STL', 'OREB', 'DREB', 'poss_used', 'w_adjoe', 'w_adrtg']].sum()
+        totals = totals.reindex(self.team_names)
+        games = team_games.astype(float)
+
+        adjoe = (totals['w_adjoe'] / totals['poss_used']).values
+        adjde = (totals['w_adrtg'] / totals['poss_used']).values
+        barthag = adjoe ** 11.5 / (adjoe ** 11.5 + adjde ** 11.5)
+        team_df = pd.DataFrame({
+            'team_name': self.team_names,
+            'season_year': season_year,
+            'games_played': team_games,
+            'adjoe': adjoe,
+            'adjde': adjde,
+            'barthag': barthag,
+            'barthag_rank': pd.Series(barthag).rank(ascending=False, method='first').astype(int).values,
+            'adjt': tempo,
+            'POSS': tempo * games,
+            'eFG': ((totals['FGM'] + 0.5 * totals['threeM']) / totals['FGA'] * 100).values,
+            'three_rate': (totals['threeA'] / totals['FGA'] * 100).values,
+            'ftr': (totals['FTA'] / totals['FGA'] * 100).values,
+            'ast_pg': totals['AST'].values / games,
+            'stl_pg': totals['STL'].values / games,
+            'oreb_pg': totals['OREB'].values / games,
+            'dreb_pg': totals['DREB'].values / games,
+            'sos': 0.5 + 0.05 * self.team_quality + self.rng.normal(0, 0.05, len(self.team_names)),
+            'team_cluster': None,
+        })
+        return team_df
+
+    def _offseason(self, season_year):
+        """Graduations, transfers and recruiting between season_year and the next season."""
+        rng = self.rng
+        transfers = []
+        for t, roster in enumerate(self.rosters):
+            staying = []
+            for pid in roster:
+                year = self.class_year[pid - 1]
+                if year >= 5 or (year == 4 and rng.random() > 0.15):
+                    continue
+                if rng.random() < self.transfer_rate:
+                    transfers.append((pid, t))
+                else:
+                    staying.append(pid)
+            self.rosters[t] = staying
+
+        # Transfers land on a different team with room at their position
+        for pid, from_team in transfers:
+            pos = self.positions[pid - 1]
+            for _ in range(10):
+                to_team = int(rng.integers(len(self.rosters)))
+                if to_team != from_team and self._position_count(to_team, pos) < self.targets[pos] + 1:
+                    break
+            self.rosters[to_team].append(pid)
+
+        for pid in range(1, len(self.class_year) + 1):
+            self.class_year[pid - 1] += 1
+        self.team_quality = 0.75 * self.team_quality + rng.normal(0, 0.65, len(self.team_quality))
+
+        # Recruits fill every position back up to its target; they commit during season_year
+        recruits = []
+        for t in range(len(self.rosters)):
+            for pos, target in self.targets.items():
+                missing = target - self._position_count(t, pos)
+                if missing > 0:
+                    new_ids = self._new_players(pos, missing, season_year + 1, self.team_quality[t], 1)
+                    self.rosters[t] += new_ids
+                    recruits += [(pid, t) for pid in new_ids]
+        if recruits:
+            self.recruit_frames.append(self._hs_rankings(recruits, season_year))
+
+    def _position_count(self, team_idx, pos):
+        return sum(self.positions[pid - 1] == pos for pid in self.rosters[team_idx])
+
+    def _hs_rankings(self, recruits, season_year):
+        """HS_Rankings rows of a recruiting class: projected freshman totals at bench minutes."""
+        rows = np.array([pid for pid, _ in recruits]) - 1
+        teams = np.array([t for _, t in recruits])
+        features = np.stack([self.base_features[r] for r in rows])
+        minutes = np.full(len(rows), 14.0 * 30)
+        counts = derive_counting_stats(features, minutes, np.full(len(rows), 68.0), self.rng)
+        adjoe, adrtg, bpm = player_ratings(features, np.zeros(len(rows)), np.asarray(self.skill)[rows], self.rng)
+        return pd.DataFrame({
+            'player_name': np.asarray(self.names)[rows],
+            'position': np.asarray(self.positions)[rows],
+            'FGA': counts['FGA'], 'FGM': counts['FGM'], 'FTA': counts['FTA'],
+            'P3M': counts['threeM'], 'P3A': counts['threeA'],
+            'adjoe': adjoe, 'adjde': adrtg,
+            'TOV': counts['TOV'], 'OREB': counts['OREB'], 'DREB': counts['DREB'],
+            'bpm': bpm,
+            'season_year': season_year,
+            'school_committed': np.asarray(self.team_names)[teams],
+        })
+
+def transfer_scenarios(player_seasons, hs_rankings):
+    """
+    Backtest scenarios, selected like findAvailScoringTeams: every transfer into a team whose
+    incoming roster (returners with 40+ minutes plus recruits) has at least 6 players.
+
+    Returns:
+        pd.DataFrame: team_name, season_year, player_id
+    """
+    frames = []
+    for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+        prev = player_seasons[player_seasons['season_year'] == year - 1]
+        cur = player_seasons[player_seasons['season_year'] == year]
+        moved = cur.merge(prev[['player_id', 'team_name']], on='player_id', suffixes=('', '_prev'))
+        moved = moved[moved['team_name'] != moved['team_name_prev']]
+
+        returners = cur[cur['player_id'].isin(prev.loc[prev['MIN'] >= 40, 'player_id'])]
+        roster_size = returners.groupby('team_name').size().add(
+            hs_rankings[hs_rankings['season_year'] == year - 1].groupby('school_committed').size(), fill_value=0)
+        eligible = roster_size[roster_size >= 6].index
+        frames.append(moved.loc[moved['team_name'].isin(eligible), ['team_name', 'season_year', 'player_id']])
+
+    scenarios = pd.concat(frames, ignore_index=True)
+    return scenarios.sort_values(['team_name', 'season_year'], kind='stable').reset_index(drop=True)
+
+def _create_table(conn, table, schema):
+    columns = ",\n    ".join(f"{col} {decl}" for col, decl in schema.items())
+    conn.execute(f"CREATE TABLE {table} (\n    {columns}\n)")
+
+def write_database(db_path, sim):
+    """Write the simulated tables to a new SQLite database and fill its cluster columns."""
+    conn = sqlite3.connect(db_path)
+    for table, schema, df in (('Players', PLAYERS_SCHEMA, sim.players),
+                              ('Teams', TEAMS_SCHEMA, pd.DataFrame({'team_name': sim.team_names})),
+                              ('Player_Seasons', PLAYER_SEASONS_SCHEMA, sim.player_seasons),
+                              ('Team_Seasons', TEAM_SEASONS_SCHEMA, sim.team_seasons),
+                              ('HS_Rankings', HS_RANKINGS_SCHEMA, sim.hs_rankings)):
+        _create_table(conn, table, schema)
+        df[list(schema)].to_sql(table, conn, if_exists='append', index=False)
+    conn.commit()
+
+    # Temporary indexes keep the per-row cluster UPDATEs linear; the real schema has none,
+    # so they are dropped again to keep query timings comparable
+    conn.execute("CREATE INDEX tmp_ps_key ON Player_Seasons (player_id, season_year)")
+    conn.execute("CREATE INDEX tmp_ts_key ON Team_Seasons (team_name, season_year)")
+    player_df = assignClusters.assign_player_clusters(conn)
+    team_df = assignClusters.assign_team_clusters(conn)
+    assignClusters.write_cluster_assignments(conn, player_df, team_df, assignClusters.artifact_version())
+    conn.execute("DROP INDEX tmp_ps_key")
+    conn.execute("DROP INDEX tmp_ts_key")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return len(player_df), len(team_df)
+
+def copy_artifacts(out_dir):
+    """Copy the clustering artifacts and archetype labels the cluster columns were computed from."""
+    paths = assignClusters.artifact_files() + [player_labels_path, team_labels_path]
+    for path in paths:
+        target = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+    return len(paths)
+
+def main():
+    default_first = Config.START_YEAR - Config.LOOKBACK_YEAR - 1
+    parser = argparse.ArgumentParser(description="Generate a synthetic rosteriq.db and matching working tree.")
+    parser.add_argument('--out-dir', default=OUT_DIR, help=f"Output directory (default: {OUT_DIR})")
+    parser.add_argument('--teams', type=int, default=362, help="Number of teams (default: 362, about Division I)")
+    parser.add_argument('--roster-size', type=int, default=14, help="Players per team (default: 14)")
+    parser.add_argument('--seasons', type=int, default=Config.END_YEAR_INCLUDE - default_first + 1,
+                        help=f"Number of seasons ending in {Config.END_YEAR_INCLUDE} (default: from {default_first})")
+    parser.add_argument('--transfer-rate', type=float, default=0.15,
+                        help="Chance a returning player transfers each offseason (default: 0.15)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('--force', action='store_true', help="Replace an existing database in the output directory")
+    args = parser.parse_args()
+
+    db_path = os.path.join(args.out_dir, DB_NAME)
+    if os.path.exists(db_path):
+        if not args.force:
+            raise FileExistsError(f"{db_path} already exists (use --force to replace it)")
+        os.remove(db_path)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    start_year = Config.END_YEAR_INCLUDE - args.seasons + 1
+    sim = LeagueSimulation(args.teams, args.roster_size, start_year, Config.END_YEAR_INCLUDE,
+                           args.transfer_rate, args.seed).run()
+    player_assignments, team_assignments = write_database(db_path, sim)
+    n_artifacts = copy_artifacts(args.out_dir)
+
+    scenarios = transfer_scenarios(sim.player_seasons, sim.hs_rankings)
+    scenarios_path = os.path.join(args.out_dir, SCENARIOS_PATH)
+    os.makedirs(os.path.dirname(scenarios_path), exist_ok=True)
+    scenarios.to_csv(scenarios_path, index=False)
+
+    sos_input = os.path.join(args.out_dir, SOS_INPUT_PATH)
+    os.makedirs(os.path.dirname(sos_input), exist_ok=True)
+    sim.team_seasons[['team_name', 'season_year', 'sos']].to_csv(sos_input, index=False)
+    build_value_sos_adjustment(sos_input, os.path.join(args.out_dir, SOS_OUTPUT_PATH), verbose=False)
+
+    counts = {'players': len(sim.players), 'player_seasons': len(sim.player_seasons),
+              'team_seasons': len(sim.team_seasons), 'hs_rankings': len(sim.hs_rankings),
+              'player_cluster_assignments': player_assignments, 'team_cluster_assignments': team_assignments,
+              'scenarios': len(scenarios)}
+    with open(os.path.join(args.out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump({'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                   'parameters': {**vars(args), 'start_year': start_year},
+                   'artifact_version': assignClusters.artifact_version(),
+                   'counts': counts}, f, indent=2)
+
+    print(f"Wrote {db_path} ({start_year}-{Config.END_YEAR_INCLUDE}, {args.teams} teams) "
+          f"and {n_artifacts} artifact files")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Checkpointed results store for the transfer backtest (checkSuccessfulTransfer).
+
+Every finished scenario is written (and committed) to a small SQLite database as soon as its
+outcome is known, so an interrupted backtest loses at most the scenarios in flight. A run is
+identified by its run_id: restarting with the same run_id skips the scenarios already stored,
+and the summary below recomputes the accuracy counters from the stored rows alone.
+
+Results live in their own database file, separate from rosteriq.db (which backtest workers
+open read-only).
+
+Usage:
+    python -m Analysis.Testing.backtestResults              # summary of the latest run
+    python -m Analysis.Testing.backtestResults --run-id ID  # summary of one run
+    python -m Analysis.Testing.backtestResults --list       # every stored run
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime, timezone
+from Analysis.config import Config
+
+RESULTS_DB_PATH = 'backtest_results.db'
+
+# Outcome of a scenario counted as a correct prediction, and the counter it feeds
+CORRECT_OUTCOMES = {'succ': 'succ_count', 'unsucc': 'unsucc_count'}
+CLASSIFIED_OUTCOMES = ('succ', 'unsucc', 'incorrect')
+
+def new_run_id():
+    """Run id from the current UTC time (sorts chronologically)."""
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+
+def open_results_db(path=RESULTS_DB_PATH):
+    """
+    Open (and create if needed) the results database.
+
+    Args:
+        path (str): SQLite file for the results (default: backtest_results.db)
+
+    Returns:
+        sqlite3.Connection: Connection with the Backtest_Runs / Backtest_Results tables
+    """
+    conn = sqlite3.connect(path)
+    # WAL keeps per-scenario commits cheap and readable while a backtest is writing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Backtest_Runs (
+            run_id VARCHAR(32) PRIMARY KEY,
+            created_at TEXT,
+            top_percent FLOAT,
+            bottom_percent FLOAT,
+            ess_threshold FLOAT,
+            breakout_number INT,
+            player_name TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Backtest_Results (
+            run_id VARCHAR(32),
+            scenario_idx INT,
+            team_name VARCHAR(30),
+            season_year INTEGER,
+            player_id INTEGER,
+            player_name TEXT,
+            position VARCHAR(5),
+            rank INT,
+            pool_size INT,
+            ess FLOAT,
+            success_score FLOAT,
+            is_succ INT,
+            outcome VARCHAR(12),
+            completed_at TEXT,
+            PRIMARY KEY (run_id, team_name, season_year, player_id)
+        )""")
+    conn.commit()
+    return conn
+
+def start_run(conn, run_id, player_name=None):
+    """
+    Register a run (a no-op when resuming an existing run_id).
+
+    Returns:
+        bool: True when the run already existed (resume)
+    """
+    exists = conn.execute("SELECT 1 FROM Backtest_Runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+    if not exists:
+        conn.execute("""
+            INSERT INTO Backtest_Runs
+            (run_id, created_at, top_percent, bottom_percent, ess_threshold, breakout_number, player_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (run_id, datetime.now(timezone.utc).isoformat(timespec='seconds'),
+             Config.TOP_PERCENT, Config.BOTTOM_PERCENT, Config.ESS_THRESHOLD, Config.BREAKOUT_NUMBER, player_name))
+        conn.commit()
+    return exists
+
+def run_player_name(conn, run_id):
+    """The --player-name filter a run was started with (None for a run over every scenario)."""
+    row = conn.execute("SELECT player_name FROM Backtest_Runs WHERE run_id = ?", (run_id,)).fetchone()
+    return None if row is None else row[0]
+
+def completed_scenarios(conn, run_id):
+    """Set of (team_name, season_year, player_id) already stored for a run."""
+    rows = conn.execute("SELECT team_name, season_year, player_id FROM Backtest_Results WHERE run_id = ?", (run_id,))
+    return {(team, int(season), int(pid)) for team, season, pid in rows}
+
+def record_result(conn, run_id, scenario_idx, scenario, result):
+    """
+    Store (and commit) one finished scenario.
+
+    Args:
+        conn: Results database connection
+        run_id (str): Backtest run
+        scenario_idx (int): Position of the scenario in the run's scenario list
+        scenario (tuple): (team_name, season_year, player_id)
+        result (dict): evaluate_scenario result; 'outcome' is None for skipped scenarios
+    """
+    team_name, season_year, player_id = scenario
+    is_succ = result.get('is_succ')
+    conn.execute("""
+        INSERT OR REPLACE INTO Backtest_Results
+        (run_id, scenario_idx, team_name, season_year, player_id, player_name, position,
+         rank, pool_size, ess, success_score, is_succ, outcome, completed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (run_id, scenario_idx, team_name, int(season_year), int(player_id),
+         result.get('player_name'), result.get('position'),
+         _optional(int, result.get('rank')), _optional(int, result.get('pool_size')),
+         _optional(float, result.get('ess')), _optional(float, result.get('success_score')),
+         None if is_succ is None else int(bool(is_succ)),
+         result.get('outcome') or 'skipped',
+         datetime.now(timezone.utc).isoformat(timespec='seconds')))
+    conn.commit()
+
+def _optional(cast, value):
+    return None if value is None else cast(value)
+
+def summarize_run(conn, run_id):
+    """
+    Accuracy counters of a run, recomputed from its stored rows.
+
+    Returns:
+        dict: correct, total, succ_count, unsucc_count (same meaning as the backtest's STATS),
+            plus scenarios (every stored row) and skipped
+    """
+    counts = dict(conn.execute("SELECT outcome, COUNT(*) FROM Backtest_Results WHERE run_id = ? GROUP BY outcome",
+                               (run_id,)).fetchall())
+    summary = {counter: counts.get(outcome, 0) for outcome, counter in CORRECT_OUTCOMES.items()}
+    summary['correct'] = sum(summary.values())
+    summary['total'] = sum(counts.get(outcome, 0) for outcome in CLASSIFIED_OUTCOMES)
+    summary['scenarios'] = sum(counts.values())
+    summary['skipped'] = counts.get('skipped', 0)
+    return summary
+
+def latest_run_id(conn):
+    row = conn.execute("SELECT run_id FROM Backtest_Runs ORDER BY created_at DESC, run_id DESC LIMIT 1").fetchone()
+    return None if row is None else row[0]
+
+def print_summary(conn, run_id):
+    run = conn.execute("SELECT created_at, top_percent, bottom_percent FROM Backtest_Runs WHERE run_id = ?",
+                       (run_id,)).fetchone()
+    if run is None:
+        print(f"No backtest run {run_id}")
+        return
+    created_at, top_percent, bottom_percent = run
+    summary = summarize_run(conn, run_id)
+
+    print(f"Run {run_id} (started {created_at}): {summary['scenarios']} scenarios stored, {summary['skipped']} skipped")
+    accuracy = summary['correct'] / summary['total'] if summary['total'] > 0 else 0
+    print(f"FINAL RESULTS: {summary['correct']} correct out of {summary['total']} total ({accuracy:.3f} accuracy rate)")
+    print(f"Successful transfers: {summary['succ_count']}")
+    print(f"Unsuccessful transfers: {summary['unsucc_count']}")
+
+    total_succs = summary['succ_count'] + summary['unsucc_count']
+    if total_succs > 0:
+        pSucc = summary['succ_count'] / total_succs
+        pUnscc = summary['unsucc_count'] / total_succs
+        print(f"Success rate: {pSucc:.3f}")
+        print(f"Unsuccessful rate: {pUnscc:.3f}")
+        print(f"Chance percentage: {pSucc * top_percent + pUnscc * bottom_percent:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize stored transfer backtest runs.")
+    parser.add_argument('--run-id', default=None, help="Run to summarize (default: the latest run)")
+    parser.add_argument('--list', action='store_true', help="List every stored run")
+    parser.add_argument('--results-db', default=RESULTS_DB_PATH, help=f"Results database (default: {RESULTS_DB_PATH})")
+    args = parser.parse_args()
+
+    conn = open_results_db(args.results_db)
+    if args.list:
+        for run_id, created_at, player_name in conn.execute(
+                "SELECT run_id, created_at, player_name FROM Backtest_Runs ORDER BY created_at, run_id"):
+            summary = summarize_run(conn, run_id)
+            label = f" [{player_name}]" if player_name else ""
+            print(f"{run_id}{label} {created_at}: {summary['correct']}/{summary['total']} correct, "
+                  f"{summary['scenarios']} scenarios")
+    else:
+        run_id = args.run_id or latest_run_id(conn)
+        if run_id is None:
+            print("No backtest runs stored")
+        else:
+            print_summary(conn, run_id)
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import sqlite3
 import pandas as pd
 import random
@@ -5,12 +6,19 @@ import logging
 import os
 import signal
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Tuple
-from Analysis.CalculateScores.calcCompositeScore import composite_score
+from typing import Dict, Iterator, Optional, Tuple
+from Analysis.Benchmark.init import InitBenchmarkPlayer
+from Analysis.CalculateScores.calcCompositeScore import ScenarioRanking
 from Analysis.EvaluateMetrics.successful_transfer import successful_transfer
 from Analysis.config import Config
-from Analysis.Helpers.queries import single_player_query
+from Analysis.Helpers.dataLoader import get_scenario_players
+from Analysis.Helpers.queries import single_player_columns
+from Analysis.Performance.profiling import PROFILE_ENV, MODES, get_profiler
+from Analysis.Testing.backtestResults import (RESULTS_DB_PATH, open_results_db, new_run_id, start_run,
+                                              completed_scenarios, record_result, summarize_run,
+                                              run_player_name)
 
 
 # Global variables to track results (accessible by signal handler)
@@ -112,8 +120,232 @@ def load_team_data(conn: sqlite3.Connection) -> Tuple[pd.DataFrame, pd.DataFrame
     return avail_team_df, all_teams_barthag, top_teams_df, sampled_teams
 
 
+def evaluate_scenario(conn: sqlite3.Connection, team_name: str, season_year: int, player_id_to_replace: int,
+                      player: Optional[pd.Series], logger: logging.Logger) -> Dict:
+    """
+    Backtest one scenario: rank the transfer pool for the replaced player and check whether the
+    player's rank agrees with their actual success.
+
+    Args:
+        conn: Database connection (read-only is enough)
+        team_name (str): Team of the scenario
+        season_year (int): Season of the scenario
+        player_id_to_replace (int): Player being replaced (whose transfer season is checked)
+        player (pd.Series): The replaced player's prefetched row (see get_scenario_players),
+            None when the player season does not exist
+        logger: Logger for the scenario's analysis output
+
+    Returns:
+        dict: player_name, position, rank, pool_size, ess, success_score, is_succ (None where the
+            scenario stopped before computing them) and outcome: 'succ' / 'unsucc' (correct
+            prediction), 'incorrect', 'unclassified', or None when the scenario was skipped
+    """
+    TOP_PERCENT = Config.TOP_PERCENT
+    BOTTOM_PERCENT = Config.BOTTOM_PERCENT
+
+    player_name = None if player is None else player['player_name']
+    position = None if player is None else player['position']
+    result = {'player_name': player_name, 'position': position, 'rank': None, 'pool_size': None,
+              'ess': None, 'success_score': None, 'is_succ': None, 'outcome': None}
+    if player is None:
+        logger.error(f"No {season_year} season for player {player_id_to_replace} - skipping")
+        return result
+    logger.info(f"Processing: {player_name} ({position}) - {team_name} {season_year} [ID: {player_id_to_replace}]")
+    try:
+        with get_profiler().scenario((team_name, season_year, player_id_to_replace)):
+            bmakr_plyr = InitBenchmarkPlayer(conn, team_name, season_year, player_id_to_replace)
+            ranking = ScenarioRanking(bmakr_plyr)
+    except ValueError as e:
+        logger.error(e)
+        return result
+
+    # Same fields as single_player_query(position)
+    plyr_stats = player[single_player_columns(position)]
+
+    try:
+        score, is_succ = successful_transfer(bmakr_plyr, plyr_stats=plyr_stats, debug=False)
+        ess = bmakr_plyr.ess
+        logger.debug(f"ESS Score: {ess}")
+    except Exception as e:
+        logger.error(f"Error in successful_transfer calculation: {e}", exc_info=True)
+        return result
+    result.update(ess=ess, success_score=score, is_succ=is_succ, pool_size=len(ranking))
+
+    # ESS Cut-off
+    if ess < Config.ESS_THRESHOLD:
+        logger.warning(f"ESS Sample below {Config.ESS_THRESHOLD} - caution")
+        return result
+
+    # Composite rank of the replaced player among the candidates, found by player_id
+    rank = ranking.rank_of(player_id_to_replace)
+    if rank is None:
+        logger.warning("Skipping because player was not here last season")
+        logger.debug("-" * 10)
+        return result
+
+    result['rank'] = rank
+    length = len(ranking)
+    successPercentile = (rank <= length * TOP_PERCENT)
+    unsuccessPercentile = (rank >= length * (1 - BOTTOM_PERCENT))
+    successCond = successPercentile and is_succ
+    unsuccessCond = unsuccessPercentile and not is_succ
+
+    # Log detailed analysis (using DEBUG level for verbose output)
+    logger.info(f"Top 5 players:\n{ranking.rows(0, 5)}")
+    logger.info(f"Player context:\n{ranking.rows(rank - 2, rank + 2)}")
+    
+    logger.info(f"""Analysis Results:
+Position: {position}
+Rank: {rank}/{length}
+B-Mark ESS: {ess}
+Player Archetype(s): {bmakr_plyr.plyr_labels}
+Player Weight(s): {bmakr_plyr.plyr_weights}
+Team Archetype(s): {bmakr_plyr.team_labels}
+Team Weight(s): {bmakr_plyr.team_weights}
+Percentile Rank: {1 - (rank / length):.3f}
+Projected Top {TOP_PERCENT*100}%: {successPercentile}
+Projected Bottom {BOTTOM_PERCENT*100}%: {unsuccessPercentile}
+Considered Success: {is_succ}
+Success Score: {score}""")
+    
+    if successCond:
+        logger.info("✓ CORRECT - Successful and Ranked High")
+        result['outcome'] = 'succ'
+    elif unsuccessCond:
+        logger.info("✓ CORRECT - Unsuccessful and Ranked Low")
+        result['outcome'] = 'unsucc'
+    elif not successPercentile and not is_succ:
+        logger.debug("No classification needed")
+        result['outcome'] = 'unclassified'
+    else:
+        logger.warning("✗ INCORRECT - Prediction mismatch")
+        result['outcome'] = 'incorrect'
+    return result
+
+def record_outcome(outcome: Optional[str]):
+    """Merge one scenario outcome into the global counters."""
+    if outcome in ('succ', 'unsucc'):
+        STATS['total'] += 1
+        STATS['correct'] += 1
+        STATS[f'{outcome}_count'] += 1
+    elif outcome == 'incorrect':
+        STATS['total'] += 1
+
+
+class _RecordBuffer(logging.Handler):
+    """Collects a worker's log records so the parent can emit them in scenario order."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Flatten the record so it pickles back to the parent process
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        self.records.append(record)
+
+# Per-process state of backtest workers
+_WORKER = {'conn': None, 'buffer': None}
+
+def _init_worker(db_path: str):
+    """Open the worker's read-only connection and route its logging into a buffer."""
+    # Only the parent handles Ctrl+C (and prints the final results)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _WORKER['conn'] = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    _WORKER['buffer'] = _RecordBuffer()
+
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_WORKER['buffer'])
+    logger.setLevel(logging.INFO)
+
+def _evaluate_or_log(conn, scenario: Tuple[str, int, int], player: Optional[pd.Series],
+                     logger: logging.Logger) -> Optional[Dict]:
+    """evaluate_scenario, logging unexpected errors instead of raising (None result)."""
+    try:
+        return evaluate_scenario(conn, *scenario, player, logger)
+    except Exception as e:
+        logger.error(f"Unexpected error in scenario {scenario}: {e}", exc_info=True)
+        return None
+
+def _evaluate_in_worker(scenario: Tuple[str, int, int], player: Optional[pd.Series]):
+    """Run one scenario in a worker; returns (result, log records, profile data or None)."""
+    buffer = _WORKER['buffer']
+    buffer.records = []
+    result = _evaluate_or_log(_WORKER['conn'], scenario, player, logging.getLogger())
+    return result, buffer.records, get_profiler().take()
+
+def _scenario_results(scenarios, players: Dict, db_path: str, workers: int,
+                      logger: logging.Logger) -> Iterator[Optional[Dict]]:
+    """
+    Scenario results in scenario order, evaluated on `workers` processes (None on unexpected errors).
+
+    players maps (player_id, season_year) to the prefetched player rows handed to each scenario.
+    When profiling is on, the workers' scenario profiles are merged into this process's profiler.
+    """
+    jobs = ((scenario, players.get((scenario[2], scenario[1]))) for scenario in scenarios)
+    if workers <= 1:
+        conn = sqlite3.connect(db_path)
+        try:
+            for scenario, player in jobs:
+                yield _evaluate_or_log(conn, scenario, player, logger)
+        finally:
+            conn.close()
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,))
+    try:
+        futures = [executor.submit(_evaluate_in_worker, scenario, player) for scenario, player in jobs]
+        for future in futures:
+            result, records, profile_data = future.result()
+            for record in records:
+                logger.handle(record)
+            get_profiler().merge(profile_data)
+            yield result
+    finally:
+        # Stopping early (breakout, Ctrl+C) drops the scenarios not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def write_profile(profiler, out_dir: str, logger: logging.Logger):
+    """Write the run's aggregated scenario profiles (nothing when profiling is off)."""
+    if not profiler.enabled or not profiler.scenario_times:
+        return
+    paths = profiler.write(out_dir)
+    logger.info(f"Profiled {len(profiler.scenario_times)} scenarios; wrote {', '.join(paths)}")
+    if profiler.stats is not None:
+        top = sorted(profiler.stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:5]
+        for (filename, line, func), (_, _, tottime, cumtime, _) in top:
+            where = '' if filename == '~' else f" ({os.path.basename(filename)}:{line})"
+            logger.info(f"  hot spot: {func}{where} own {tottime:.2f}s, cumulative {cumtime:.2f}s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest transfer rankings against actual transfer success.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, each with its own read-only connection (default: CPU count)")
+    parser.add_argument('--player-name', default=None, help="Only backtest scenarios replacing this player")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    parser.add_argument('--run-id', default=None,
+                        help="Backtest run to write to; an existing run is resumed, skipping its stored scenarios (default: new run)")
+    parser.add_argument('--results-db', default=RESULTS_DB_PATH, help=f"Results database (default: {RESULTS_DB_PATH})")
+    parser.add_argument('--profile', choices=MODES, default=None,
+                        help=f"Profile the composite scoring of every scenario (cProfile, stack sampling or both) and write "
+                             f"the aggregated profiles; overrides {PROFILE_ENV} (default: {PROFILE_ENV} or off)")
+    parser.add_argument('--profile-dir', default=None,
+                        help="Directory for the profiles (default: profiles/<run id>)")
+    return parser.parse_args()
+
 def main():
     """Main function to run the transfer success analysis."""
+    args = parse_args()
+    if args.profile is not None:
+        # Set before any worker starts so the workers profile too
+        os.environ[PROFILE_ENV] = args.profile
+
     # Setup logging first
     logger = setup_logging()
     logger.info("Starting transfer success analysis")
@@ -122,104 +354,65 @@ def main():
     STATS['logger'] = logger
     signal.signal(signal.SIGINT, signal_handler)
     
-    conn = sqlite3.connect('rosteriq.db')
+    conn = sqlite3.connect(args.db)
     
-    TOP_PERCENT = Config.TOP_PERCENT
-    BOTTOM_PERCENT = Config.BOTTOM_PERCENT
     BREAKOUT_NUMBER = Config.BREAKOUT_NUMBER
 
     # Update global stats with config values
-    STATS['TOP_PERCENT'] = TOP_PERCENT
-    STATS['BOTTOM_PERCENT'] = BOTTOM_PERCENT
+    STATS['TOP_PERCENT'] = Config.TOP_PERCENT
+    STATS['BOTTOM_PERCENT'] = Config.BOTTOM_PERCENT
     STATS['BREAKOUT_NUMBER'] = BREAKOUT_NUMBER
 
     # Load all data
     avail_team_df, all_teams_barthag, top_teams_df, sampled_teams = load_team_data(conn)
 
-    logger.info("Starting to iterate over transfers")
+    # Each scenario once (results are stored per scenario)
+    scenarios = list(dict.fromkeys((row.team_name, int(row.season_year), int(row.player_id))
+                                   for row in avail_team_df.itertuples(index=False)))
+
+    # Replaced players' names, positions and success stats for every scenario, in one query
+    players_df = get_scenario_players(conn, [(player_id, season_year) for _, season_year, player_id in scenarios])
+    players = dict(players_df.iterrows())
+    conn.close()
+
+    # Every finished scenario is checkpointed; resuming a run starts from its stored counters
+    # and keeps the scenario filter the run was started with
+    results_conn = open_results_db(args.results_db)
+    run_id = args.run_id or new_run_id()
+    player_name = args.player_name
+    if start_run(results_conn, run_id, args.player_name):
+        player_name = run_player_name(results_conn, run_id)
+        if args.player_name is not None and args.player_name != player_name:
+            results_conn.close()
+            started_with = f"--player-name {player_name!r}" if player_name is not None else "no --player-name"
+            sys.exit(f"Run {run_id} was started with {started_with}; resume it without --player-name")
+        done = completed_scenarios(results_conn, run_id)
+        STATS.update({key: value for key, value in summarize_run(results_conn, run_id).items() if key in STATS})
+        logger.info(f"Resuming run {run_id}: {len(done)} scenarios already stored "
+                    f"({STATS['correct']}/{STATS['total']} correct so far)")
+    else:
+        done = set()
+        logger.info(f"Starting run {run_id}")
+
+    if player_name is not None:
+        scenarios = [scenario for scenario in scenarios
+                     if players.get((scenario[2], scenario[1]), {}).get('player_name') == player_name]
+
+    pending = [(idx, scenario) for idx, scenario in enumerate(scenarios) if scenario not in done]
+    logger.info(f"Starting to iterate over {len(pending)} transfers on {args.workers} worker(s)")
     
+    results = _scenario_results([scenario for _, scenario in pending], players, args.db, args.workers, logger)
     try:
-        for idx, avail_team in avail_team_df.iterrows():
-            team_name = avail_team['team_name']
-
-            season_year = avail_team['season_year']
-            player_id_to_replace = avail_team['player_id']  
-            player_name = conn.execute("SELECT player_name FROM Players WHERE player_id = ?", (int(player_id_to_replace),)).fetchone()[0]
-            position = conn.execute("SELECT position FROM Player_Seasons WHERE player_id = ? AND season_year = ?",
-                                    (player_id_to_replace, season_year)).fetchone()[0] 
-            if player_name != "Caleb Love":
-                continue
-            logger.info(f"Processing: {player_name} ({position}) - {team_name} {season_year} [ID: {player_id_to_replace}]")
-            try:
-                bmakr_plyr, cs_df = composite_score(conn, team_name, season_year, player_id_to_replace, specific_name=player_name, debug=False)
-            except ValueError as e:
-                logger.error(e)
-                continue
-            
-            plyr_query = single_player_query(position)
-
-            plyr_stats = pd.read_sql(plyr_query, 
-                                     conn, 
-                                     params = (season_year, player_id_to_replace)).iloc[0]
-            
-            try:
-                score, is_succ = successful_transfer(bmakr_plyr, plyr_stats=plyr_stats, debug=False)
-                ess = bmakr_plyr.ess
-                logger.debug(f"ESS Score: {ess}")
-            except Exception as e:
-                logger.error(f"Error in successful_transfer calculation: {e}", exc_info=True)
-
-            # ESS Cut-off
-            if ess < Config.ESS_THRESHOLD:
-                logger.warning(f"ESS Sample below {Config.ESS_THRESHOLD} - caution")
+        for (scenario_idx, scenario), result in zip(pending, results):
+            if STATS['total'] >= BREAKOUT_NUMBER:
+                logger.info(f"Reached {BREAKOUT_NUMBER} samples, stopping...")
+                break
+            if result is None:
                 continue
-
-            try:
-                rank = cs_df[cs_df['player_name'] == player_name].index[0]
-            except:
-                logger.warning("Skipping because player was not here last season")
-                logger.debug("-" * 10)
+            record_result(results_conn, run_id, scenario_idx, scenario, result)
+            if result['outcome'] is None:
                 continue
-
-            length = len(cs_df)
-            successPercentile = (rank <= length * TOP_PERCENT)
-            unsuccessPercentile = (rank >= length * (1 - BOTTOM_PERCENT))
-            successCond = successPercentile and is_succ
-            unsuccessCond = unsuccessPercentile and not is_succ
-
-            # Log detailed analysis (using DEBUG level for verbose output)
-            logger.info(f"Top 5 players:\n{cs_df.head(5)}")
-            logger.info(f"Player context:\n{cs_df.iloc[rank - 2 : rank + 2]}")
-            
-            logger.info(f"""Analysis Results:
-Position: {position}
-Rank: {rank}/{length}
-B-Mark ESS: {ess}
-Player Archetype(s): {bmakr_plyr.plyr_labels}
-Player Weight(s): {bmakr_plyr.plyr_weights}
-Team Archetype(s): {bmakr_plyr.team_labels}
-Team Weight(s): {bmakr_plyr.team_weights}
-Percentile Rank: {1 - (rank / length):.3f}
-Projected Top {TOP_PERCENT*100}%: {successPercentile}
-Projected Bottom {BOTTOM_PERCENT*100}%: {unsuccessPercentile}
-Considered Success: {is_succ}
-Success Score: {score}""")
-            
-            if successCond:
-                STATS['total'] += 1 
-                STATS['correct'] += 1
-                logger.info("✓ CORRECT - Successful and Ranked High")
-                STATS['succ_count'] += 1
-            elif unsuccessCond:
-                STATS['total'] += 1
-                STATS['correct'] += 1
-                logger.info("✓ CORRECT - Unsuccessful and Ranked Low")
-                STATS['unsucc_count'] += 1
-            elif not successPercentile and not is_succ:
-                logger.debug("No classification needed")
-            else:
-                STATS['total'] += 1
-                logger.warning("✗ INCORRECT - Prediction mismatch")
+            record_outcome(result['outcome'])
 
             if STATS['total'] == BREAKOUT_NUMBER:
                 logger.info(f"Reached {BREAKOUT_NUMBER} samples, stopping...")
@@ -235,13 +428,13 @@ Success Score: {score}""")
     except Exception as e:
         logger.error(f"Unexpected error occurred: {e}", exc_info=True)
     finally:
+        results.close()
+        results_conn.close()
         # Always print final results, regardless of how we got here
+        logger.info(f"Results stored as run {run_id} in {args.results_db}")
+        write_profile(get_profiler(), args.profile_dir or os.path.join('profiles', run_id), logger)
         print_final_results()
 
 
 if __name__ == "__main__":
     main()
-
-
-
-
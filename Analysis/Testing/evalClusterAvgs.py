@@ -1,64 +1,136 @@
+"""
+Cluster BPM Statistics
+
+Builds Analysis/Testing/CSVs/cluster_info.csv: the number of players (length), median and
+standard deviation of BPM in every (model season, position, team cluster, player cluster) cell of
+the stored cluster assignments (see assignClusters). The model of season Y covers the player-seasons
+of its lookback window [Y - LOOKBACK_YEAR, Y). Every combination of the team and player clusters
+seen in a (season, position) is listed, empty ones included (length 0).
+
+All seasons are computed with a single groupby. --season recomputes only the given model seasons
+and keeps the other rows of the existing CSV, e.g. the newest season during the season refresh.
+
+Usage:
+    python -m Analysis.Testing.evalClusterAvgs                 # rebuild every season
+    python -m Analysis.Testing.evalClusterAvgs --season 2024   # refresh one season
+"""
+
+import argparse
+import os
+import sqlite3
 import pandas as pd
+from Analysis.Clustering.assignClusters import load_cluster_assignments
 from Analysis.config import Config
-import sqlite3
-import numpy as np
 
+CLUSTER_INFO_PATH = 'Analysis/Testing/CSVs/cluster_info.csv'
+CLUSTER_INFO_COLUMNS = ['season_year', 'pos', 'team_clu_id', 'player_clu_id', 'length', 'median', 'std']
+
+def load_cluster_bpm(conn, seasons):
+    """
+    Player and team cluster of every player-season in the lookback windows of the given model
+    seasons, with the player's BPM.
+
+    Returns:
+        pd.DataFrame: season_year (model season), pos, team_clu_id, player_clu_id, bpm
+    """
+    frames = []
+    for year in seasons:
+        assignments_df = load_cluster_assignments(conn, year)
+        frames.append(assignments_df.assign(model_year=year))
+    merged_df = pd.concat(frames, ignore_index=True)
+
+    bpm_df = pd.read_sql("""SELECT
+                            player_id,
+                            season_year,
+                            bpm
+                            FROM Player_Seasons
+                            WHERE season_year >= ? AND season_year < ? """,
+                         conn,
+                         params=(min(seasons) - Config.LOOKBACK_YEAR, max(seasons)))
+    merged_df = pd.merge(merged_df, bpm_df, how='left', on=['player_id', 'season_year'])
 
-conn = sqlite3.connect('rosteriq.db')
- 
-cluster_df = pd.DataFrame(columns=['season_year', 'pos', 'team_clu_id', 'player_clu_id', 'length', 'median', 'std'])
-for year in range(Config.START_YEAR, Config.END_YEAR_EXCLUDE):
+    return pd.DataFrame({'season_year': merged_df['model_year'],
+                         'pos': merged_df['position'],
+                         'team_clu_id': merged_df['team_cluster'],
+                         'player_clu_id': merged_df['Cluster'],
+                         'bpm': merged_df['bpm']})
 
-    team_df = pd.read_csv(f'Analysis/Clustering/Teams/{year}/KClustering/labels.csv')
-    for pos in Config.POSITIONS:
-        pos_df = pd.read_csv(f'Analysis/Clustering/Players/{year}/KClustering/player_labels_{pos}.csv')
+def cluster_bpm_stats(cluster_bpm_df):
+    """
+    Length / median / std of BPM per (season, pos, team cluster, player cluster).
 
-        plyr_pos_stats_df = pd.read_sql("""SELECT
-                                        player_id,
-                                        season_year,
-                                        bpm
-                                        FROM Player_Seasons
-                                        WHERE season_year >= ? AND season_year < ? """,
-                                        conn,
-                                        params=(year - Config.LOOKBACK_YEAR , year))
-        
-        # merge to get player's bpm
-        plyr_merged_df = pd.merge(pos_df, plyr_pos_stats_df, how='left', on=['player_id', 'season_year'])
+    Args:
+        cluster_bpm_df (pd.DataFrame): Output of load_cluster_bpm
 
-        # merge to add on team cluster id
-        merged_df = pd.merge(plyr_merged_df, team_df, how='left', on=['team_name', 'season_year'])
+    Returns:
+        pd.DataFrame: CLUSTER_INFO_COLUMNS, one row per team x player cluster combination of every
+            (season, pos), sorted by season, position (Config.POSITIONS order) and cluster ids
+    """
+    cell_keys = ['season_year', 'pos', 'team_clu_id', 'player_clu_id']
+    stats_df = (cluster_bpm_df.dropna(subset=['team_clu_id'])
+                .groupby(cell_keys)['bpm']
+                .agg(length='size', median='median', std='std')
+                .reset_index())
 
-        # get the ids
-        team_cluster_ids = sorted(merged_df['team_cluster'].unique())
-        player_cluster_ids = sorted(merged_df['Cluster'].unique())
+    # Full grid of the team and player clusters seen in each (season, pos); a player-season whose
+    # team has no cluster still lists that (missing) team cluster, with length 0
+    team_ids = cluster_bpm_df[['season_year', 'pos', 'team_clu_id']].drop_duplicates()
+    player_ids = cluster_bpm_df[['season_year', 'pos', 'player_clu_id']].drop_duplicates()
+    grid_df = team_ids.merge(player_ids, on=['season_year', 'pos'])
+    info_df = grid_df.merge(stats_df, how='left', on=cell_keys)
+    info_df['length'] = info_df['length'].fillna(0).astype(int)
 
-        
-        # double for to get bpm on each cluster
-        for team_id in team_cluster_ids:
-            for player_id in player_cluster_ids:
-                filtered_df = merged_df[(merged_df['Cluster'] == player_id) & (merged_df['team_cluster'] == team_id)]
-                bpm = filtered_df['bpm']
-                length = len(bpm)
-                median = bpm.median()  # bpm of player and team cluster
-                std = bpm.std()
+    info_df['pos'] = pd.Categorical(info_df['pos'], categories=Config.POSITIONS, ordered=True)
+    info_df = info_df.sort_values(['season_year', 'pos', 'team_clu_id', 'player_clu_id'],
+                                  na_position='last', kind='stable')
+    info_df['pos'] = info_df['pos'].astype(str)
+    info_df['team_clu_id'] = info_df['team_clu_id'].astype('Int64')
+    info_df['player_clu_id'] = info_df['player_clu_id'].astype('Int64')
+    return info_df[CLUSTER_INFO_COLUMNS].reset_index(drop=True)
 
-                cluster_df.loc[len(cluster_df)] = [year, pos, team_id, player_id, length, median, std]
-        
-        # print(pos)
-        # for player_id in player_cluster_ids:
-        #     plyr_clu = cluster_df[(cluster_df['pos'] == pos) & (cluster_df['team_clu_id'] == 2) & (cluster_df['player_clu_id'] == player_id)].iloc[0]
-        #     print(f"Cluster {player_id}", "Lenght", plyr_clu['length'], "Median", plyr_clu['median'],"STD", plyr_clu['std'])
+def update_cluster_info(conn, path=CLUSTER_INFO_PATH, seasons=None):
+    """
+    Write cluster_info.csv, recomputing only `seasons` when given.
 
-cluster_df.to_csv('Analysis/Testing/CSVs/cluster_info.csv', index=False)
+    Args:
+        conn: Database connection
+        path (str): CSV to write
+        seasons (list, optional): Model seasons to recompute; the rows of other seasons are kept
+            from the existing CSV. All seasons are rebuilt when omitted or when no CSV exists yet.
 
-    
+    Returns:
+        pd.DataFrame: The complete table that was written
+    """
+    all_seasons = list(range(Config.START_YEAR, Config.END_YEAR_EXCLUDE))
+    if seasons is None or not os.path.exists(path):
+        seasons = all_seasons
+    info_df = cluster_bpm_stats(load_cluster_bpm(conn, sorted(seasons)))
 
+    if set(seasons) != set(all_seasons):
+        kept_df = pd.read_csv(path, dtype={'team_clu_id': 'Int64', 'player_clu_id': 'Int64'},
+                              float_precision='round_trip')
+        kept_df = kept_df[~kept_df['season_year'].isin(seasons)]
+        info_df = pd.concat([kept_df, info_df], ignore_index=True)
+        info_df['pos'] = pd.Categorical(info_df['pos'], categories=Config.POSITIONS, ordered=True)
+        info_df = info_df.sort_values(['season_year', 'pos'], kind='stable')
+        info_df['pos'] = info_df['pos'].astype(str)
 
-    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    info_df.to_csv(path, index=False)
+    return info_df
 
-    
-            
+def main():
+    parser = argparse.ArgumentParser(description="Write BPM statistics per team x player cluster cell.")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    parser.add_argument('--out', default=CLUSTER_INFO_PATH, help=f"Output CSV (default: {CLUSTER_INFO_PATH})")
+    parser.add_argument('--season', type=int, nargs='+', default=None,
+                        help="Only recompute these model seasons, keeping the other rows of --out")
+    args = parser.parse_args()
 
-    
-        
+    conn = sqlite3.connect(args.db)
+    info_df = update_cluster_info(conn, args.out, args.season)
+    conn.close()
+    print(f"Wrote {len(info_df)} cluster cells to {args.out}")
 
+if __name__ == '__main__':
+    main()
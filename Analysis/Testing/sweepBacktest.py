@@ -0,0 +1,367 @@
+"""
+Parameter sweep over the transfer backtest (checkSuccessfulTransfer) without rerunning it.
+
+The expensive part of a backtest scenario (benchmark, candidate fit / value scores and the
+replaced player's success score) does not depend on the parameters we tune, so it is computed
+once per scenario and saved as sweep artifacts. A grid of downstream parameters is then
+evaluated on the artifacts with array operations:
+
+    - composite blend: fs_w, v_w, cap, t_scale (re-ranks every scenario's candidates)
+    - classification: TOP_PERCENT, BOTTOM_PERCENT, ESS_THRESHOLD and the success THRESHOLD
+
+Every grid point is classified exactly like evaluate_scenario, over every scenario (the
+backtest's BREAKOUT_NUMBER stop is not applied). The replaced player is located among the
+candidates by player_id. --check-run verifies that the default grid point reproduces the counts
+of a stored, complete backtest run.
+
+Usage:
+    python -m Analysis.Testing.sweepBacktest --fs-w 0.5 0.6 0.7 --top-percent 0.2 0.3 --threshold -0.1 -0.05 0
+    python -m Analysis.Testing.sweepBacktest --check-run <run id>
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import signal
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from Analysis.Benchmark.init import InitBenchmarkPlayer
+from Analysis.CalculateScores.calcCompositeScore import ScenarioRanking
+from Analysis.EvaluateMetrics.successful_transfer import successful_transfer, THRESHOLD
+from Analysis.Helpers.dataLoader import get_scenario_players
+from Analysis.Helpers.queries import single_player_columns
+from Analysis.Testing.backtestResults import RESULTS_DB_PATH, open_results_db, run_player_name, summarize_run
+from Analysis.config import Config
+
+ARTIFACTS_PATH = 'sweep_artifacts.npz'
+SCENARIOS_PATH = 'Analysis/Helpers/CSV/availTransferTeams.csv'
+
+logger = logging.getLogger(__name__)
+
+def scenario_artifacts(conn, team_name, season_year, player_id_to_replace, player):
+    """
+    Parameter-independent artifacts of one backtest scenario.
+
+    Args:
+        conn: Database connection (read-only is enough)
+        team_name (str): Team of the scenario
+        season_year (int): Season of the scenario
+        player_id_to_replace (int): Player being replaced
+        player (pd.Series): The replaced player's prefetched row (see get_scenario_players)
+
+    Returns:
+        dict or None: fit_z / value_z of every candidate, target (the replaced player's
+            candidate position), ess and success_score; None when the backtest would skip the
+            scenario whatever the parameters, or {'error': message} when the scenario failed
+            with a ValueError (which the backtest logs and skips as well)
+    """
+    if player is None:
+        return None
+    try:
+        bmark_plyr = InitBenchmarkPlayer(conn, team_name, season_year, player_id_to_replace)
+        components = ScenarioRanking(bmark_plyr).components
+        matches = np.flatnonzero(components['player_id'] == player_id_to_replace)
+        if not len(matches):
+            return None
+        score, _ = successful_transfer(bmark_plyr, player[single_player_columns(player['position'])])
+        ess = bmark_plyr.ess
+    except ValueError as e:
+        logger.warning(f"Skipping scenario {(team_name, season_year, player_id_to_replace)}: {e}")
+        return {'error': str(e)}
+
+    return {
+        'fit_z': components['fit_z'],
+        'value_z': components['value_z'],
+        'target': int(matches[0]),
+        'ess': float(ess),
+        'success_score': float(score),
+    }
+
+class SweepArtifacts:
+    """
+    Artifacts of every usable scenario, with the candidates of all scenarios concatenated.
+
+    Attributes:
+        scenarios (pd.DataFrame): team_name, season_year, player_id of each usable scenario
+        offsets (np.ndarray): (S + 1,) start of each scenario's candidates in fit_z / value_z
+        fit_z, value_z (np.ndarray): (N,) unclipped robust z-scores of the candidates
+        target (np.ndarray): (S,) replaced player's position within its scenario's candidates
+        ess, success_score (np.ndarray): (S,) benchmark ESS and realized success score
+        n_scenarios (int): Scenarios evaluated, including the ones that are always skipped
+        n_failed (int): Scenarios skipped because they failed with a ValueError
+    """
+
+    def __init__(self, scenarios, offsets, fit_z, value_z, target, ess, success_score, n_scenarios, n_failed=0):
+        self.scenarios = scenarios.reset_index(drop=True)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.fit_z = np.asarray(fit_z, dtype=float)
+        self.value_z = np.asarray(value_z, dtype=float)
+        self.target = np.asarray(target, dtype=np.int64)
+        self.ess = np.asarray(ess, dtype=float)
+        self.success_score = np.asarray(success_score, dtype=float)
+        self.n_scenarios = int(n_scenarios)
+        self.n_failed = int(n_failed)
+
+    @classmethod
+    def from_results(cls, scenarios, results):
+        """Build from scenario_artifacts results aligned with scenarios ((team, season, player_id) tuples)."""
+        kept = [(scenario, result) for scenario, result in zip(scenarios, results)
+                if result is not None and 'error' not in result]
+        lengths = [len(result['fit_z']) for _, result in kept]
+        return cls(pd.DataFrame([scenario for scenario, _ in kept], columns=['team_name', 'season_year', 'player_id']),
+                   np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+                   np.concatenate([result['fit_z'] for _, result in kept]) if kept else np.empty(0),
+                   np.concatenate([result['value_z'] for _, result in kept]) if kept else np.empty(0),
+                   [result['target'] for _, result in kept],
+                   [result['ess'] for _, result in kept],
+                   [result['success_score'] for _, result in kept],
+                   len(scenarios),
+                   sum(result is not None and 'error' in result for result in results))
+
+    def save(self, path):
+        np.savez_compressed(path,
+                            team_name=self.scenarios['team_name'].values.astype(str),
+                            season_year=self.scenarios['season_year'].values,
+                            player_id=self.scenarios['player_id'].values,
+                            offsets=self.offsets, fit_z=self.fit_z, value_z=self.value_z,
+                            target=self.target, ess=self.ess, success_score=self.success_score,
+                            n_scenarios=self.n_scenarios, n_failed=self.n_failed)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            scenarios = pd.DataFrame({'team_name': data['team_name'].astype(object),
+                                      'season_year': data['season_year'],
+                                      'player_id': data['player_id']})
+            return cls(scenarios, data['offsets'], data['fit_z'], data['value_z'], data['target'],
+                       data['ess'], data['success_score'], int(data['n_scenarios']),
+                       int(data['n_failed']) if 'n_failed' in data else 0)
+
+    @property
+    def lengths(self):
+        """Candidate pool size of each scenario."""
+        return np.diff(self.offsets)
+
+    def ranks(self, fs_w=0.6, v_w=0.4, cap=3.5, t_scale=True):
+        """
+        0-based composite rank of every scenario's replaced player for one blend.
+
+        Same values as ScenarioRanking.rank_of (stable descending order, NaN last), for all
+        scenarios at once.
+        """
+        lengths = self.lengths
+        starts = self.offsets[:-1]
+        comp_raw = fs_w * np.clip(self.fit_z, -cap, cap) + v_w * np.clip(self.value_z, -cap, cap)
+
+        sort_vals = comp_raw
+        if t_scale:
+            # Per-scenario T-scaling, with the same reductions as the composite ranking
+            sort_vals = np.empty_like(comp_raw)
+            for start, end in zip(starts, self.offsets[1:]):
+                comp = comp_raw[start:end]
+                mu, sd = np.nanmean(comp), np.nanstd(comp) or 1e-9
+                sort_vals[start:end] = 50 + 10 * (comp - mu) / sd
+
+        # Count the candidates ahead of the target in each scenario (as Helpers.ranking.rank_of)
+        keys = -sort_vals
+        keys[np.isnan(keys)] = np.inf
+        scenario_of = np.repeat(np.arange(len(lengths)), lengths)
+        target_key = np.repeat(keys[starts + self.target], lengths)
+        position = np.arange(len(keys)) - np.repeat(starts, lengths)
+        ahead = (keys < target_key) | ((keys == target_key) & (position < np.repeat(self.target, lengths)))
+        return np.bincount(scenario_of, weights=ahead, minlength=len(lengths)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.target)
+
+def classify(rank, length, ess, success_score, top_percent, bottom_percent, ess_threshold, threshold):
+    """
+    Backtest outcome counts of many parameter settings at once.
+
+    Scenario arguments are (S,) arrays; parameter arguments are (P,) arrays (one entry per
+    setting). Classification follows evaluate_scenario.
+
+    Returns:
+        dict: (P,) arrays succ_count, unsucc_count, incorrect, unclassified, correct, total
+    """
+    col = lambda values: np.asarray(values, dtype=float)[:, None]
+    top_percent, bottom_percent = col(top_percent), col(bottom_percent)
+    ess_threshold, threshold = col(ess_threshold), col(threshold)
+
+    # As evaluate_scenario, which only skips when ess < ESS_THRESHOLD (a NaN ESS is evaluated)
+    evaluated = ~(ess[None, :] < ess_threshold)
+    is_succ = success_score[None, :] > threshold
+    success_pct = rank <= length * top_percent
+    unsuccess_pct = rank >= length * (1 - bottom_percent)
+
+    succ = evaluated & success_pct & is_succ
+    unsucc = evaluated & ~succ & unsuccess_pct & ~is_succ
+    unclassified = evaluated & ~succ & ~unsucc & ~success_pct & ~is_succ
+    incorrect = evaluated & ~succ & ~unsucc & ~unclassified
+
+    counts = {
+        'succ_count': succ.sum(axis=1),
+        'unsucc_count': unsucc.sum(axis=1),
+        'incorrect': incorrect.sum(axis=1),
+        'unclassified': unclassified.sum(axis=1),
+    }
+    counts['correct'] = counts['succ_count'] + counts['unsucc_count']
+    counts['total'] = counts['correct'] + counts['incorrect']
+    return counts
+
+def sweep(artifacts: SweepArtifacts, fs_ws, v_ws, caps, t_scales,
+          top_percents, bottom_percents, ess_thresholds, thresholds) -> pd.DataFrame:
+    """
+    Accuracy table of the full parameter grid.
+
+    Returns:
+        pd.DataFrame: One row per setting with the parameters, the outcome counts, accuracy,
+            chance_percentage (accuracy expected from the success mix alone) and lift over it;
+            sorted by accuracy
+    """
+    classify_grid = pd.DataFrame(list(itertools.product(top_percents, bottom_percents, ess_thresholds, thresholds)),
+                                 columns=['top_percent', 'bottom_percent', 'ess_threshold', 'threshold'])
+    length = artifacts.lengths
+
+    tables = []
+    for fs_w, v_w, cap, t_scale in itertools.product(fs_ws, v_ws, caps, t_scales):
+        rank = artifacts.ranks(fs_w, v_w, cap, t_scale)
+        counts = classify(rank, length, artifacts.ess, artifacts.success_score,
+                          classify_grid['top_percent'].values, classify_grid['bottom_percent'].values,
+                          classify_grid['ess_threshold'].values, classify_grid['threshold'].values)
+        table = classify_grid.copy()
+        table.insert(0, 'fs_w', fs_w)
+        table.insert(1, 'v_w', v_w)
+        table.insert(2, 'cap', cap)
+        table.insert(3, 't_scale', t_scale)
+        for name, values in counts.items():
+            table[name] = values
+        tables.append(table)
+
+    results = pd.concat(tables, ignore_index=True)
+    total = results['total'].replace(0, np.nan)
+    results['accuracy'] = (results['correct'] / total).fillna(0)
+
+    # Chance percentage as in print_final_results
+    total_succs = (results['succ_count'] + results['unsucc_count']).replace(0, np.nan)
+    results['chance_percentage'] = ((results['succ_count'] * results['top_percent'] +
+                                     results['unsucc_count'] * results['bottom_percent']) / total_succs)
+    results['lift'] = results['accuracy'] - results['chance_percentage']
+    return results.sort_values(['accuracy', 'total'], ascending=False, kind='stable').reset_index(drop=True)
+
+CHECKED_COUNTS = ('succ_count', 'unsucc_count', 'correct', 'total')
+
+def check_against_run(artifacts: SweepArtifacts, results_conn, run_id):
+    """
+    Compare the default grid point (Config and composite defaults) with a stored backtest run.
+
+    The run must cover every scenario: no --player-name filter and stopped neither by
+    BREAKOUT_NUMBER nor by an interrupt.
+
+    Returns:
+        pd.DataFrame: counter, sweep, backtest and match for succ_count, unsucc_count, correct, total
+    """
+    if run_player_name(results_conn, run_id) is not None:
+        raise ValueError(f"Run {run_id} was filtered with --player-name; check against an unfiltered run")
+    stored = summarize_run(results_conn, run_id)
+    counts = sweep(artifacts, [0.6], [0.4], [3.5], [True], [Config.TOP_PERCENT], [Config.BOTTOM_PERCENT],
+                   [Config.ESS_THRESHOLD], [THRESHOLD]).iloc[0]
+    return pd.DataFrame([{'counter': counter, 'sweep': int(counts[counter]), 'backtest': int(stored[counter]),
+                          'match': int(counts[counter]) == int(stored[counter])}
+                         for counter in CHECKED_COUNTS])
+
+# Per-process state of artifact workers
+_WORKER = {'conn': None}
+
+def _init_worker(db_path):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _WORKER['conn'] = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+
+def _artifacts_in_worker(job):
+    scenario, player = job
+    return scenario_artifacts(_WORKER['conn'], *scenario, player)
+
+def compute_artifacts(db_path, scenarios_path=SCENARIOS_PATH, workers=1) -> SweepArtifacts:
+    """
+    Compute the artifacts of every scenario in the scenarios CSV.
+
+    Args:
+        db_path (str): SQLite database path
+        scenarios_path (str): Scenario CSV (team_name, season_year, player_id)
+        workers (int): Worker processes, each with its own read-only connection
+    """
+    scenarios_df = pd.read_csv(scenarios_path)
+    scenarios = list(dict.fromkeys((row.team_name, int(row.season_year), int(row.player_id))
+                                   for row in scenarios_df.itertuples(index=False)))
+
+    conn = sqlite3.connect(db_path)
+    players_df = get_scenario_players(conn, [(player_id, season_year) for _, season_year, player_id in scenarios])
+    players = dict(players_df.iterrows())
+    jobs = [(scenario, players.get((scenario[2], scenario[1]))) for scenario in scenarios]
+
+    if workers <= 1:
+        results = [scenario_artifacts(conn, *scenario, player) for scenario, player in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as executor:
+            results = list(executor.map(_artifacts_in_worker, jobs, chunksize=16))
+    conn.close()
+    return SweepArtifacts.from_results(scenarios, results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep backtest parameters over cached per-scenario artifacts.")
+    parser.add_argument('--artifacts', default=ARTIFACTS_PATH,
+                        help=f"Artifact file, computed when missing and reused otherwise (default: {ARTIFACTS_PATH})")
+    parser.add_argument('--recompute', action='store_true', help="Recompute the artifacts even if the file exists")
+    parser.add_argument('--scenarios', default=SCENARIOS_PATH, help=f"Scenario CSV (default: {SCENARIOS_PATH})")
+    parser.add_argument('--db', default='rosteriq.db', help="SQLite database path (default: rosteriq.db)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes for the artifacts")
+    parser.add_argument('--fs-w', type=float, nargs='+', default=[0.6], help="Fit weights")
+    parser.add_argument('--v-w', type=float, nargs='+', default=[0.4], help="Value weights")
+    parser.add_argument('--cap', type=float, nargs='+', default=[3.5], help="Robust z caps")
+    parser.add_argument('--t-scale', type=int, nargs='+', choices=[0, 1], default=[1], help="T-scale the composite (1) or not (0)")
+    parser.add_argument('--top-percent', type=float, nargs='+', default=[Config.TOP_PERCENT])
+    parser.add_argument('--bottom-percent', type=float, nargs='+', default=[Config.BOTTOM_PERCENT])
+    parser.add_argument('--ess-threshold', type=float, nargs='+', default=[Config.ESS_THRESHOLD])
+    parser.add_argument('--threshold', type=float, nargs='+', default=[THRESHOLD], help="Success score thresholds")
+    parser.add_argument('--top', type=int, default=20, help="Rows of the accuracy table to print")
+    parser.add_argument('--out', default=None, help="Write the full accuracy table to this CSV")
+    parser.add_argument('--check-run', default=None,
+                        help="Check that the default grid point reproduces the counts of this stored, complete "
+                             "backtest run (exits with status 1 when they differ)")
+    parser.add_argument('--results-db', default=RESULTS_DB_PATH, help=f"Results database of --check-run (default: {RESULTS_DB_PATH})")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    if args.recompute or not os.path.exists(args.artifacts):
+        print(f"Computing sweep artifacts from {args.scenarios} on {args.workers} worker(s)...")
+        artifacts = compute_artifacts(args.db, args.scenarios, args.workers)
+        artifacts.save(args.artifacts)
+    else:
+        artifacts = SweepArtifacts.load(args.artifacts)
+    usable = f"{len(artifacts)} usable scenarios of {artifacts.n_scenarios}, {artifacts.n_failed} skipped on errors"
+    print(f"{usable} ({args.artifacts})")
+
+    results = sweep(artifacts, args.fs_w, args.v_w, args.cap, [bool(t) for t in args.t_scale],
+                    args.top_percent, args.bottom_percent, args.ess_threshold, args.threshold)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.head(args.top).to_string(index=False))
+    print(usable)
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"{len(results)} settings -> {args.out}")
+
+    if args.check_run:
+        results_conn = open_results_db(args.results_db)
+        check = check_against_run(artifacts, results_conn, args.check_run)
+        results_conn.close()
+        print(f"\nDefault grid point against backtest run {args.check_run}:")
+        print(check.to_string(index=False))
+        if not check['match'].all():
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
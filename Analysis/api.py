@@ -1,16 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 import libsql
 import os
+import sqlite3
 from dotenv import load_dotenv
 import numpy as np
 import pandas as pd
-from Analysis.CalculateScores.calcCompositeScore import composite_score as cs_score
+from Analysis.CalculateScores.calcCompositeScore import get_scenario_ranking
+from Analysis.Clustering.playerComparables import find_comparables
 
 load_dotenv()
 app = FastAPI()
 
+def get_connection():
+    """
+    Open the database for a request.
+
+    Uses the local SQLite file in ROSTERIQ_DB_PATH (read-only) when it is set, e.g. for load
+    tests and offline runs, and the remote Turso database otherwise.
+    """
+    db_path = os.getenv("ROSTERIQ_DB_PATH")
+    if db_path:
+        return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    url = os.getenv("TURSO_URL")
+    auth_token = os.getenv("TURSO_AUTH_TOKEN")
+    if not url or not auth_token:
+        raise HTTPException(status_code=500, detail="Database configuration missing")
+    # remote-only connection (no replica, no sync)
+    return libsql.connect(url, auth_token=auth_token)
+
 @app.get("/")
 def root():
     return {"ok": True}
@@ -30,50 +50,96 @@ def to_jsonable(x):
     if isinstance(x, (np.ndarray,)):
         return x.tolist()
 
-    # libsql connection/cursor → drop/str/null
-    if isinstance(x, libsql.Connection):
+    # libsql/sqlite connection/cursor → drop/str/null
+    if isinstance(x, (libsql.Connection, sqlite3.Connection)):
         return None
 
     # composites
     if isinstance(x, dict):
-        return {k: to_jsonable(v) for k, v in x.items() if not isinstance(v, libsql.Connection)}
+        return {k: to_jsonable(v) for k, v in x.items() if not isinstance(v, (libsql.Connection, sqlite3.Connection))}
     if isinstance(x, (list, tuple, set)):
         return [to_jsonable(v) for v in x]
 
     # primitives
     return x  # str/int/float/bool/None should pass
 
-@app.get("/compute")
-async def composite_score(team_name: str, season_year: int, player_id_to_replace: int):
-    url = os.getenv("TURSO_URL")
-    auth_token = os.getenv("TURSO_AUTH_TOKEN")
-    if not url or not auth_token:
-        raise HTTPException(status_code=500, detail="Database configuration missing")
+def encoded_response(payload):
+    # Extra safety: tell FastAPI how to encode any leftovers
+    encoded = jsonable_encoder(payload, custom_encoder={
+        libsql.Connection: lambda _: None,
+        sqlite3.Connection: lambda _: None,
+        pd.DataFrame: lambda df: df.to_dict(orient="records"),
+        np.integer: int,
+        np.floating: float,
+        np.ndarray: lambda a: a.tolist(),
+    })
+    return JSONResponse(content=encoded)
 
+@app.get("/compute")
+async def composite_score(team_name: str, season_year: int, player_id_to_replace: int,
+                          fs_w: float = 0.6, v_w: float = 0.4, cap: float = 3.5, t_scale: bool = True,
+                          top_n: int | None = None):
+    conn = get_connection()
     try:
-        # remote-only connection (no replica, no sync)
-        conn = libsql.connect(url, auth_token=auth_token)
-
-        bmark_plyr, cs_df = cs_score(conn, team_name, season_year, player_id_to_replace)
+        # Always computed from the database; the components are cached so /compute/rerank can
+        # re-blend them without it
+        ranking = get_scenario_ranking(conn, team_name, season_year, player_id_to_replace, refresh=True)
 
         payload = {
-            "benchmark_player": to_jsonable(bmark_plyr),
-            "composite_scores": to_jsonable(cs_df),
+            "benchmark_player": to_jsonable(ranking.bmark_plyr),
+            "composite_scores": to_jsonable(ranking.rerank(fs_w, v_w, cap, t_scale, top_n)),
         }
-        # Extra safety: tell FastAPI how to encode any leftovers
-        encoded = jsonable_encoder(payload, custom_encoder={
-            libsql.Connection: lambda _: None,
-            pd.DataFrame: lambda df: df.to_dict(orient="records"),
-            np.integer: int,
-            np.floating: float,
-            np.ndarray: lambda a: a.tolist(),
-        })
-        return JSONResponse(content=encoded)
+        return encoded_response(payload)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+@app.get("/compute/rerank")
+async def composite_rerank(team_name: str, season_year: int, player_id_to_replace: int,
+                           fs_w: float = 0.6, v_w: float = 0.4, cap: float = 3.5, t_scale: bool = True,
+                           top_n: int | None = None):
+    # The cache is per process: a worker that has not computed the scenario yet computes it here
+    ranking = get_scenario_ranking(None, team_name, season_year, player_id_to_replace, compute=False)
+    conn = None
+    try:
+        if ranking is None:
+            conn = get_connection()
+            ranking = get_scenario_ranking(conn, team_name, season_year, player_id_to_replace)
+        return encoded_response({"composite_scores": to_jsonable(ranking.rerank(fs_w, v_w, cap, t_scale, top_n))})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+@app.get("/comparables")
+async def comparables(player_id: int, season_year: int, k: int = Query(10, ge=1), past_only: bool = False):
+    conn = get_connection()
+    try:
+        # The per-position index is built on the first request and reused afterwards
+        comps_df = find_comparables(conn, player_id, season_year, k=k, past_only=past_only)
+
+        return JSONResponse(content={"player_id": player_id,
+                                     "season_year": season_year,
+                                     "comparables": to_jsonable(comps_df)})
 
+    except ValueError as e:
+        # e.g. a season with missing features, which has no position in the comparables space
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         try:
             conn.close()
         except Exception:
-            pass
\ No newline at end of file
+            pass